@@ -0,0 +1,362 @@
+# async_database_service.py
+
+import asyncio
+import pymongo
+from typing import AsyncIterator, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from .auth_cache import auth_cache
+from .metrics import instrument_storage_methods, run_in_threadpool
+from .password_hasher import password_hasher
+from .quiz_result_documents import build_quiz_result_document
+from .database_service import (
+    mongo_connection_string,
+    mongo_client_options,
+    bind_collections,
+    build_user_document,
+    build_student_query,
+    build_unit_quizzes_query,
+    build_time_period_query,
+    build_dashboard_grid_pipeline,
+    dashboard_grid_from_counts,
+    build_learner_performance_pipeline,
+    build_history_page_query,
+    HISTORY_SUMMARY_PROJECTION,
+    QUIZ_RESULTS_INDEXES,
+    USERS_INDEXES,
+    index_name,
+    find_missing_indexes,
+    report_index_check,
+    duplicate_user_error,
+)
+from .student_rollup import (
+    ROLLUP_READ_PROJECTION,
+    ROLLUP_HISTORY_PROJECTION,
+    ROLLUP_SOURCE_PROJECTION,
+    ROLLUP_REBUILD_ATTEMPTS,
+    build_rollup_folds,
+    build_rebuilt_rollup,
+    rollup_version_filter,
+    rollup_dashboard_projection,
+    rollup_dashboard_grid,
+    rollup_history_summary,
+)
+
+
+@instrument_storage_methods("motor")
+class AsyncDatabaseService:
+    """
+    Same methods and return values as DatabaseService, on the Motor driver, so endpoints
+    can await MongoDB directly instead of parking a threadpool thread per query. Queries,
+    pipelines and documents come from the helpers in database_service.py; only the driver
+    calls differ.
+
+    The client is created on first use, inside the running event loop. As with
+    DatabaseService, a failed connection leaves `client` as None and every method then
+    returns its "not connected" default. bcrypt hashing is CPU-bound and runs on the
+    password hasher's own executor.
+
+    The synchronous DatabaseService still exists next to this one: the quiz session store
+    and the quiz result writer run in threads and use it. Each worker process therefore
+    keeps two connection pools, one per driver. Given that service (`sync_service`), this
+    one reuses its connection string and, if it connected, its index check instead of
+    running ensure_indexes a second time.
+    """
+
+    def __init__(self, sync_service=None):
+        self._sync_service = sync_service
+        self.connection_string = sync_service.connection_string if sync_service is not None else mongo_connection_string()
+
+        self.client: Optional[AsyncIOMotorClient] = None
+        self._connect_attempted = False
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self.unique_user_indexes = False
+
+    async def connect(self) -> bool:
+        if self._connect_attempted:
+            return self.client is not None
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._connect_attempted:
+                return self.client is not None
+            try:
+                print("Trying to connect to MongoDB (async) with certifi...")
+                client = AsyncIOMotorClient(self.connection_string, **mongo_client_options())
+                bind_collections(self, client)
+                await client.admin.command('ping')  # Force connection check
+                self.client = client
+                print("✅ MongoDB (async) connected successfully.")
+            except Exception as e:
+                print(f"❌ MongoDB (async) connection failed: {e}")
+                self.client = None
+            if self.client is not None:
+                if self._sync_service is not None and self._sync_service.client is not None:
+                    # Same database, already checked when the synchronous service connected
+                    self.unique_user_indexes = self._sync_service.unique_user_indexes
+                else:
+                    await self.ensure_indexes()
+            self._connect_attempted = True
+        return self.client is not None
+
+    async def ensure_indexes(self) -> bool:
+        """Same as DatabaseService.ensure_indexes."""
+        missing = []
+        for collection, declared in ((self.quiz_results_collection, QUIZ_RESULTS_INDEXES), (self.users_collection, USERS_INDEXES)):
+            for spec in declared:
+                try:
+                    await collection.create_index(spec["keys"], unique=spec.get("unique", False))
+                except pymongo.errors.PyMongoError as e:
+                    print(f"Warning: Could not create index {index_name(spec['keys'])} on '{collection.name}': {e}")
+            missing_here = find_missing_indexes(await collection.index_information(), declared)
+            missing += [f"{collection.name}.{name}" for name in missing_here]
+            if collection is self.users_collection:
+                self.unique_user_indexes = not missing_here
+        report_index_check(missing, "MongoDB (async)")
+        return not missing
+
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+
+    async def create_user(self, username: str, email: str, password: str):
+        if not await self.connect():
+            return {"status": "error", "message": "Database not connected."}
+        if not self.unique_user_indexes:
+            if await self.users_collection.find_one({"username": username}):
+                return {"status": "error", "message": "Username already exists."}
+            if await self.users_collection.find_one({"email": email}):
+                return {"status": "error", "message": "Email already registered."}
+
+        hashed_password = await password_hasher.hash(password)
+        try:
+            await self.users_collection.insert_one(build_user_document(username, email, hashed_password))
+            return {"status": "success", "message": "User created successfully."}
+        except pymongo.errors.DuplicateKeyError as e:
+            return duplicate_user_error(e)
+        except Exception:
+            return {"status": "error", "message": "Could not create user."}
+
+    async def authenticate_user(self, username: str, password: str):
+        if not await self.connect():
+            return False
+        user = await self.users_collection.find_one({"username": username})
+        if not user or not await password_hasher.verify(password, user["password_hash"]):
+            return False
+        return user
+
+    async def check_username_exists(self, username: str) -> bool:
+        if not await self.connect():
+            return False
+        return await self.users_collection.find_one({"username": username}) is not None
+
+    async def delete_user(self, username: str) -> bool:
+        if not await self.connect():
+            return False
+        result = await self.users_collection.delete_one({"username": username})
+        auth_cache.invalidate_user(username)
+        return result.deleted_count > 0
+
+    async def check_email_exists(self, email: str) -> bool:
+        if not await self.connect():
+            return False
+        return await self.users_collection.find_one({"email": email}) is not None
+
+    async def get_user_quiz_history_summary(self, username: str) -> dict:
+        if not await self.connect():
+            return {'unique_unit_quizzes_attempted': 0}
+        rollup = await self.student_rollups_collection.find_one({"_id": username}, ROLLUP_HISTORY_PROJECTION)
+        if rollup is not None:
+            return rollup_history_summary(rollup)
+        distinct_quizzes = await self.quiz_results_collection.distinct('quiz_name', build_unit_quizzes_query(username))
+        return {'unique_unit_quizzes_attempted': len(distinct_quizzes)}
+
+    async def save_quiz_result(self, result_data: dict):
+        if not await self.connect():
+            return {"status": "error", "message": "Database not connected."}
+
+        doc_to_store = build_quiz_result_document(result_data)
+
+        try:
+            await self.quiz_results_collection.insert_one(doc_to_store)
+        except Exception as e:
+            print(f"Error saving quiz result: {e}")
+            return {"status": "error", "message": "Could not save quiz result."}
+
+        student_id = doc_to_store["student_id"]
+        fold_filter, fold_update = build_rollup_folds([doc_to_store])[student_id]
+        try:
+            try:
+                update_result = await self.student_rollups_collection.update_one(fold_filter, fold_update, upsert=True)
+                rebuild = update_result.upserted_id is not None and \
+                    await self.quiz_results_collection.count_documents(build_student_query(student_id), limit=2) > 1
+            except pymongo.errors.DuplicateKeyError:
+                rebuild = True
+            if rebuild:
+                await self.rebuild_student_rollup(student_id)
+        except Exception as e:
+            print(f"Error updating student rollup for '{student_id}': {e}. Rebuild it with scripts/backfill_student_rollups.py --student {student_id}.")
+        return {"status": "success", "message": "Quiz result saved with structured path."}
+
+    async def get_student_rollup(self, username: str) -> Optional[Dict]:
+        if not await self.connect():
+            return None
+        return await self.student_rollups_collection.find_one({"_id": username}, ROLLUP_READ_PROJECTION)
+
+    async def rebuild_student_rollup(self, username: str) -> Optional[Dict]:
+        # Same version check as DatabaseService.rebuild_student_rollup
+        for _ in range(ROLLUP_REBUILD_ATTEMPTS):
+            current = await self.student_rollups_collection.find_one({"_id": username}, {"version": 1})
+            cursor = self.quiz_results_collection.find(build_student_query(username), ROLLUP_SOURCE_PROJECTION)
+            rollup = build_rebuilt_rollup(username, await cursor.to_list(length=None), current)
+            if current is None:
+                try:
+                    await self.student_rollups_collection.insert_one(rollup)
+                    return rollup
+                except pymongo.errors.DuplicateKeyError:
+                    continue
+            if (await self.student_rollups_collection.replace_one(rollup_version_filter(username, current), rollup)).matched_count:
+                return rollup
+        print(f"Warning: Could not rebuild the rollup of '{username}': quizzes kept being saved. Re-run scripts/backfill_student_rollups.py --student {username}.")
+        return None
+
+    async def get_full_quiz_history(self, username: str = None) -> List[Dict]:
+        if not await self.connect():
+            return []
+        cursor = self.quiz_results_collection.find(
+            build_student_query(username),
+            {"_id": 0}
+        ).sort("timestamp", pymongo.DESCENDING)
+        return await cursor.to_list(length=None)
+
+    async def get_full_quiz_history_for_unit(self, username: str, unit_name: str) -> List[Dict]:
+        if not await self.connect():
+            return []
+        cursor = self.quiz_results_collection.find(
+            build_history_page_query(username, unit_name),
+            {"_id": 0}
+        ).sort("timestamp", pymongo.DESCENDING)
+        return await cursor.to_list(length=None)
+
+    async def get_quiz_history_page(self, username: str, unit_name: Optional[str] = None, before: Optional[str] = None,
+                                    limit: Optional[int] = None, summary: bool = False) -> List[Dict]:
+        if not await self.connect():
+            return []
+        cursor = self.quiz_results_collection.find(
+            build_history_page_query(username, unit_name, before),
+            HISTORY_SUMMARY_PROJECTION if summary else {"_id": 0}
+        ).sort("timestamp", pymongo.DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def get_quiz_result(self, username: str, path: str) -> Optional[Dict]:
+        if not await self.connect():
+            return None
+        return await self.quiz_results_collection.find_one({"path": path, "student_id": username}, {"_id": 0})
+
+    async def iter_quiz_result_batches(self, username: Optional[str] = None, projection: Optional[Dict] = None,
+                                       batch_size: int = 500) -> AsyncIterator[List[Dict]]:
+        """Same as DatabaseService.iter_quiz_result_batches, as an async generator."""
+        if not await self.connect():
+            return
+        cursor = self.quiz_results_collection.find(
+            build_student_query(username),
+            projection or {"_id": 0},
+            batch_size=batch_size
+        )
+        if username:
+            cursor = cursor.sort("timestamp", pymongo.DESCENDING)
+        try:
+            while True:
+                batch = await cursor.to_list(length=batch_size)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            await cursor.close()
+
+    async def get_dashboard_analytics(self, username: str, time_period_days: int) -> Dict:
+        if not await self.connect():
+            return {}
+        rollup = await self.student_rollups_collection.find_one({"_id": username}, rollup_dashboard_projection(time_period_days))
+        if rollup is not None:
+            return rollup_dashboard_grid(rollup, time_period_days)
+        grouped_counts = await self.quiz_results_collection.aggregate(
+            build_dashboard_grid_pipeline(username, time_period_days)).to_list(length=None)
+        return dashboard_grid_from_counts(grouped_counts)
+
+    async def get_learner_performance_averages(self, username: Optional[str] = None) -> Dict[str, float]:
+        if not await self.connect():
+            return {}
+        cursor = self.quiz_results_collection.aggregate(build_learner_performance_pipeline(username), allowDiskUse=True)
+        return {row["_id"]: row["average"] async for row in cursor}
+
+    async def get_performance_data_for_dashboard(self, username: str, time_period_days: int, projection: Optional[Dict] = None) -> List[Dict]:
+        if not await self.connect():
+            return []
+        query = build_time_period_query(username, time_period_days)
+        return await self.quiz_results_collection.find(query, projection or {"_id": 0}).to_list(length=None)
+
+
+class ThreadpoolDatabaseService:
+    """
+    Awaitable facade over the synchronous DatabaseService (or SQLiteDatabaseService):
+    every method call runs in the Starlette threadpool. Selected with DATABASE_DRIVER=pymongo
+    or STORAGE_BACKEND=sqlite, and used as the baseline by benchmarks/db_driver_load_test.py.
+    """
+
+    def __init__(self, sync_service):
+        self._service = sync_service
+
+    @property
+    def client(self):
+        return self._service.client
+
+    # Only the MongoDB calls of registration and login run in the threadpool; bcrypt goes
+    # to the password hasher, so a login burst cannot occupy every threadpool thread
+    async def create_user(self, username: str, email: str, password: str):
+        if self._service.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        duplicate = await run_in_threadpool(self._service.find_duplicate_user, username, email)
+        if duplicate:
+            return duplicate
+        hashed_password = await password_hasher.hash(password)
+        return await run_in_threadpool(self._service.insert_user, username, email, hashed_password)
+
+    async def authenticate_user(self, username: str, password: str):
+        user = await run_in_threadpool(self._service.get_user, username)
+        if not user or not await password_hasher.verify(password, user["password_hash"]):
+            return False
+        return user
+
+    def iter_quiz_result_batches(self, *args, **kwargs):
+        # Not awaited: returns the synchronous generator itself, which StreamingResponse
+        # iterates in the threadpool
+        return self._service.iter_quiz_result_batches(*args, **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if not callable(attr):
+            return attr
+
+        async def call_in_threadpool(*args, **kwargs):
+            return await run_in_threadpool(attr, *args, **kwargs)
+
+        return call_in_threadpool
+
+
+def create_database_service(driver: str, sync_service=None):
+    """
+    Returns the awaitable database service for DATABASE_DRIVER ("motor" or "pymongo").
+    Storage other than MongoDB (SQLite) always runs behind the threadpool facade.
+    """
+    if sync_service is not None and sync_service.storage_backend != "mongo":
+        return ThreadpoolDatabaseService(sync_service)
+    if driver == "pymongo":
+        if sync_service is None:
+            from .database_service import database_service as sync_service
+        return ThreadpoolDatabaseService(sync_service)
+    if driver != "motor":
+        print(f"Warning: Unknown DATABASE_DRIVER '{driver}'. Using 'motor'.")
+    return AsyncDatabaseService(sync_service)
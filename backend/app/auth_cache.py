@@ -0,0 +1,137 @@
+# backend/app/auth_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire. Each entry can carry its own
+    expiry time, capped by the cache-wide `ttl_seconds`. Counts hits and misses.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None) -> None:
+        cache_expiry = time.time() + self.ttl_seconds
+        expires_at = cache_expiry if expires_at is None else min(expires_at, cache_expiry)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_matching(self, value: Any) -> int:
+        """Removes every entry whose value equals `value`; returns how many were removed."""
+        with self._lock:
+            keys = [key for key, (_, entry_value) in self._entries.items() if entry_value == value]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total_lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total_lookups, 4) if total_lookups else 0.0,
+            }
+
+
+class AuthCache:
+    """
+    Caches the two steps of get_current_user: decoded tokens (keyed by a SHA-256 of the
+    token, never the token itself) and usernames confirmed to exist in MongoDB.
+    Authenticated requests only decode the JWT and query the users collection on a miss.
+
+    Only existing users are cached, so a newly registered user is never served a stale
+    "does not exist". Deleting a user must call invalidate_user(). The cache is per
+    process: with several workers, another worker can still accept a deleted user's
+    tokens for up to AUTH_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.tokens = TTLCache(max_entries, ttl_seconds)
+        self.users = TTLCache(max_entries, ttl_seconds)
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get_token_subject(self, token: str) -> Optional[str]:
+        return self.tokens.get(self._token_key(token))
+
+    def remember_token(self, token: str, username: str, expires_at: Optional[float]) -> None:
+        # A cached token must never outlive its own "exp" claim
+        self.tokens.set(self._token_key(token), username, expires_at)
+
+    def is_known_user(self, username: str) -> bool:
+        return self.users.get(username) is not None
+
+    def remember_user(self, username: str) -> None:
+        self.users.set(username, True)
+
+    def invalidate_user(self, username: str) -> None:
+        self.users.delete(username)
+        self.tokens.delete_matching(username)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"tokens": self.tokens.get_stats(), "users": self.users.get_stats()}
+
+
+auth_cache = AuthCache(max_entries=settings.AUTH_CACHE_MAX_ENTRIES, ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS)
+
+
+# --- Example Usage (for testing this file directly) ---
+if __name__ == "__main__":
+    cache = AuthCache(max_entries=2, ttl_seconds=60)
+    cache.remember_token("token-a", "alice", expires_at=time.time() + 30)
+    cache.remember_token("token-expired", "alice", expires_at=time.time() - 1)
+    cache.remember_user("alice")
+    assert cache.get_token_subject("token-a") == "alice"
+    assert cache.get_token_subject("token-expired") is None, "Tokens must not be served past their exp claim"
+    assert cache.is_known_user("alice")
+
+    cache.invalidate_user("alice")
+    assert not cache.is_known_user("alice")
+    assert cache.get_token_subject("token-a") is None, "Invalidating a user must drop their cached tokens"
+
+    for name in ("u1", "u2", "u3"):
+        cache.remember_user(name)
+    assert not cache.is_known_user("u1"), "The least recently used entry must be evicted"
+    print(cache.get_stats())
+    print("Auth cache checks passed.")
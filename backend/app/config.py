@@ -1,4 +1,5 @@
 import os
+from typing import List
 from dotenv import load_dotenv
 
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
@@ -17,6 +18,11 @@ class AppSettings:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./default_app.db") # Default if not in .env
+    # Where users and quiz results are stored: "mongo", "sqlite" (the DATABASE_URL file) or
+    # "auto" (MongoDB when MONGO_CONNECTION_STRING is set, SQLite otherwise)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "auto").lower()
+    # MongoDB driver used by the API endpoints: "motor" (async) or "pymongo" (sync, run in the threadpool)
+    DATABASE_DRIVER: str = os.getenv("DATABASE_DRIVER", "motor").lower()
 
     # JWT Settings
     # It's crucial that SECRET_KEY is set in your .env file for security.
@@ -32,6 +38,116 @@ class AppSettings:
         print(f"Warning: Invalid ACCESS_TOKEN_EXPIRE_MINUTES value '{_access_token_expire_minutes_str}'. Using default 10080.")
         ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080
 
+    # Question instance pool: ready-made instances kept per template (0 disables the pool)
+    _question_pool_depth_str = os.getenv("QUESTION_POOL_DEPTH", "5")
+    try:
+        QUESTION_POOL_DEPTH: int = int(_question_pool_depth_str)
+    except ValueError:
+        print(f"Warning: Invalid QUESTION_POOL_DEPTH value '{_question_pool_depth_str}'. Using default 5.")
+        QUESTION_POOL_DEPTH: int = 5
+
+    # Server-side quiz sessions: where generated quizzes are kept until submission ("auto", "mongo" or "memory").
+    # "auto" uses MongoDB whenever it is the storage backend; "memory" only suits a single long-lived process.
+    QUIZ_SESSION_BACKEND: str = os.getenv("QUIZ_SESSION_BACKEND", "auto").lower()
+    _quiz_session_ttl_seconds_str = os.getenv("QUIZ_SESSION_TTL_SECONDS", "10800") # Default to 3 hours
+    try:
+        QUIZ_SESSION_TTL_SECONDS: int = int(_quiz_session_ttl_seconds_str)
+    except ValueError:
+        print(f"Warning: Invalid QUIZ_SESSION_TTL_SECONDS value '{_quiz_session_ttl_seconds_str}'. Using default 10800.")
+        QUIZ_SESSION_TTL_SECONDS: int = 10800
+
+    # Authentication cache: decoded tokens and confirmed usernames, so authenticated requests skip MongoDB
+    _auth_cache_ttl_seconds_str = os.getenv("AUTH_CACHE_TTL_SECONDS", "300")
+    try:
+        AUTH_CACHE_TTL_SECONDS: int = int(_auth_cache_ttl_seconds_str)
+    except ValueError:
+        print(f"Warning: Invalid AUTH_CACHE_TTL_SECONDS value '{_auth_cache_ttl_seconds_str}'. Using default 300.")
+        AUTH_CACHE_TTL_SECONDS: int = 300
+    _auth_cache_max_entries_str = os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")
+    try:
+        AUTH_CACHE_MAX_ENTRIES: int = int(_auth_cache_max_entries_str)
+    except ValueError:
+        print(f"Warning: Invalid AUTH_CACHE_MAX_ENTRIES value '{_auth_cache_max_entries_str}'. Using default 10000.")
+        AUTH_CACHE_MAX_ENTRIES: int = 10000
+
+    # Learner-category model (K-Means centers): refitted after this many seconds or new quiz results
+    _learner_model_refresh_seconds_str = os.getenv("LEARNER_MODEL_REFRESH_SECONDS", "3600")
+    try:
+        LEARNER_MODEL_REFRESH_SECONDS: int = int(_learner_model_refresh_seconds_str)
+    except ValueError:
+        print(f"Warning: Invalid LEARNER_MODEL_REFRESH_SECONDS value '{_learner_model_refresh_seconds_str}'. Using default 3600.")
+        LEARNER_MODEL_REFRESH_SECONDS: int = 3600
+    _learner_model_refresh_after_results_str = os.getenv("LEARNER_MODEL_REFRESH_AFTER_RESULTS", "50")
+    try:
+        LEARNER_MODEL_REFRESH_AFTER_RESULTS: int = int(_learner_model_refresh_after_results_str)
+    except ValueError:
+        print(f"Warning: Invalid LEARNER_MODEL_REFRESH_AFTER_RESULTS value '{_learner_model_refresh_after_results_str}'. Using default 50.")
+        LEARNER_MODEL_REFRESH_AFTER_RESULTS: int = 50
+
+    # Allows `?debug=true` on the quiz endpoints to return answers, explanations and generated variables.
+    # Keep this off in production: it hands the answer key to the browser.
+    QUIZ_DEBUG_FIELDS_ENABLED: bool = os.getenv("QUIZ_DEBUG_FIELDS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    # Quiz result export: users allowed to export other students' (or all) results, comma-separated,
+    # and the default number of results per cursor batch / response chunk
+    EXPORT_ALLOWED_USERS: List[str] = [u.strip() for u in os.getenv("EXPORT_ALLOWED_USERS", "").split(",") if u.strip()]
+    _export_batch_size_str = os.getenv("EXPORT_BATCH_SIZE", "500")
+    try:
+        EXPORT_BATCH_SIZE: int = int(_export_batch_size_str)
+    except ValueError:
+        print(f"Warning: Invalid EXPORT_BATCH_SIZE value '{_export_batch_size_str}'. Using default 500.")
+        EXPORT_BATCH_SIZE: int = 500
+
+    # bcrypt runs on its own bounded executor (app/password_hasher.py): "thread", "process" or
+    # "shared" (the Starlette threadpool); calls beyond the pending limit are rejected with 503
+    PASSWORD_HASHER_BACKEND: str = os.getenv("PASSWORD_HASHER_BACKEND", "thread").lower()
+    _password_hasher_workers_str = os.getenv("PASSWORD_HASHER_WORKERS", "2")
+    try:
+        PASSWORD_HASHER_WORKERS: int = int(_password_hasher_workers_str)
+    except ValueError:
+        print(f"Warning: Invalid PASSWORD_HASHER_WORKERS value '{_password_hasher_workers_str}'. Using default 2.")
+        PASSWORD_HASHER_WORKERS: int = 2
+    _password_hasher_max_pending_str = os.getenv("PASSWORD_HASHER_MAX_PENDING", "256")
+    try:
+        PASSWORD_HASHER_MAX_PENDING: int = int(_password_hasher_max_pending_str)
+    except ValueError:
+        print(f"Warning: Invalid PASSWORD_HASHER_MAX_PENDING value '{_password_hasher_max_pending_str}'. Using default 256.")
+        PASSWORD_HASHER_MAX_PENDING: int = 256
+
+    # Quiz result persistence (app/quiz_result_writer.py): "direct" stores each submission before
+    # answering; "write_behind" journals it locally and stores batches in the background
+    QUIZ_RESULT_WRITE_MODE: str = os.getenv("QUIZ_RESULT_WRITE_MODE", "direct").lower()
+    QUIZ_RESULT_JOURNAL_DIR: str = os.getenv("QUIZ_RESULT_JOURNAL_DIR", "./quiz_result_journal")
+    _quiz_result_batch_size_str = os.getenv("QUIZ_RESULT_BATCH_SIZE", "200")
+    try:
+        QUIZ_RESULT_BATCH_SIZE: int = int(_quiz_result_batch_size_str)
+    except ValueError:
+        print(f"Warning: Invalid QUIZ_RESULT_BATCH_SIZE value '{_quiz_result_batch_size_str}'. Using default 200.")
+        QUIZ_RESULT_BATCH_SIZE: int = 200
+    _quiz_result_flush_interval_ms_str = os.getenv("QUIZ_RESULT_FLUSH_INTERVAL_MS", "250")
+    try:
+        QUIZ_RESULT_FLUSH_INTERVAL_MS: int = int(_quiz_result_flush_interval_ms_str)
+    except ValueError:
+        print(f"Warning: Invalid QUIZ_RESULT_FLUSH_INTERVAL_MS value '{_quiz_result_flush_interval_ms_str}'. Using default 250.")
+        QUIZ_RESULT_FLUSH_INTERVAL_MS: int = 250
+    _quiz_result_max_pending_str = os.getenv("QUIZ_RESULT_MAX_PENDING", "10000")
+    try:
+        QUIZ_RESULT_MAX_PENDING: int = int(_quiz_result_max_pending_str)
+    except ValueError:
+        print(f"Warning: Invalid QUIZ_RESULT_MAX_PENDING value '{_quiz_result_max_pending_str}'. Using default 10000.")
+        QUIZ_RESULT_MAX_PENDING: int = 10000
+    # Size at which a journal that never drains completely is rewritten without its stored entries
+    _quiz_result_journal_compact_mb_str = os.getenv("QUIZ_RESULT_JOURNAL_COMPACT_MB", "64")
+    try:
+        QUIZ_RESULT_JOURNAL_COMPACT_MB: int = int(_quiz_result_journal_compact_mb_str)
+    except ValueError:
+        print(f"Warning: Invalid QUIZ_RESULT_JOURNAL_COMPACT_MB value '{_quiz_result_journal_compact_mb_str}'. Using default 64.")
+        QUIZ_RESULT_JOURNAL_COMPACT_MB: int = 64
+
+    # Metrics (GET /metrics). With several API worker processes, a directory shared by the
+    # workers and emptied before each deploy, so /metrics reports all of them; see metrics.py
+    PROMETHEUS_MULTIPROC_DIR: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
 # Create an instance of the settings
 settings = AppSettings()
 
@@ -1,106 +1,324 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, NamedTuple, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
+from itertools import islice
+import threading
+import time
 import numpy as np
-from sklearn.cluster import KMeans
+
+from .metrics import timed_stage
 
 # --- Daily Performance Graph Logic ---
-def get_daily_performance_indices(quiz_history: List[Dict]) -> Dict:
-    daily_data = defaultdict(lambda: {"accuracies": [], "efficiencies": []})
-    IDEAL_TIME_PER_QUESTION = 45.0
-
-    for quiz in quiz_history:
-        date_str = quiz.get("timestamp", "")[:10]
-        summary = quiz.get("scoring_summary", {})
-        total_score = summary.get("total_score")
-        max_score = summary.get("max_score")
-        
-        if total_score is not None and max_score is not None and max_score > 0:
-            accuracy = (total_score / max_score)
-            daily_data[date_str]["accuracies"].append(accuracy)
-
-            time_taken = quiz.get("time_taken_seconds")
-            total_questions = summary.get("total_questions")
-            if time_taken and total_questions:
-                time_per_q = time_taken / total_questions
-                time_ratio = IDEAL_TIME_PER_QUESTION / time_per_q if time_per_q > 0 else 1
-                efficiency = accuracy * time_ratio
-                daily_data[date_str]["efficiencies"].append(efficiency)
-
-    sorted_dates = sorted(daily_data.keys())
-    labels, accuracy_values, efficiency_values = [], [], []
-
-    for date in sorted_dates:
-        labels.append(date)
-        avg_accuracy = np.mean(daily_data[date]["accuracies"]) * 100 if daily_data[date]["accuracies"] else 0
-        avg_efficiency = np.mean(daily_data[date]["efficiencies"]) * 100 if daily_data[date]["efficiencies"] else 0
-        accuracy_values.append(round(avg_accuracy, 1))
-        efficiency_values.append(round(avg_efficiency, 1))
+IDEAL_TIME_PER_QUESTION = 45.0
+
+def quiz_accuracy_and_efficiency(quiz: Dict) -> Tuple[Optional[float], Optional[float]]:
+    """Accuracy (score / max score) and time-weighted efficiency of one quiz result; None where not computable."""
+    summary = quiz.get("scoring_summary", {})
+    total_score = summary.get("total_score")
+    max_score = summary.get("max_score")
+    if total_score is None or max_score is None or max_score <= 0:
+        return None, None
+
+    accuracy = (total_score / max_score)
+    efficiency = None
+    time_taken = quiz.get("time_taken_seconds")
+    total_questions = summary.get("total_questions")
+    if time_taken and total_questions:
+        time_per_q = time_taken / total_questions
+        time_ratio = IDEAL_TIME_PER_QUESTION / time_per_q if time_per_q > 0 else 1
+        efficiency = accuracy * time_ratio
+    return accuracy, efficiency
+
+class QuizColumns(NamedTuple):
+    """
+    Columnar view of a list of quiz results, one array entry per quiz. Missing numbers
+    are NaN and missing or malformed dates are NaT. Columns that were not requested
+    from load_quiz_columns are None.
+    """
+    student_ids: Optional[np.ndarray] = None      # object
+    days: Optional[np.ndarray] = None             # datetime64[D], from the timestamp
+    total_score: Optional[np.ndarray] = None      # float64, scoring_summary.total_score
+    max_score: Optional[np.ndarray] = None        # float64, scoring_summary.max_score
+    correct_answers: Optional[np.ndarray] = None  # float64, scoring_summary.correct_answers_count
+    total_questions: Optional[np.ndarray] = None  # float64, scoring_summary.total_questions
+    time_taken: Optional[np.ndarray] = None       # float64, time_taken_seconds
+
+# Column -> (document field, read from scoring_summary)
+_QUIZ_COLUMN_SOURCES = {
+    "total_score": ("total_score", True),
+    "max_score": ("max_score", True),
+    "correct_answers": ("correct_answers_count", True),
+    "total_questions": ("total_questions", True),
+    "time_taken": ("time_taken_seconds", False),
+}
+
+def _float_column(rows: List[Dict], key: str) -> np.ndarray:
+    return np.array([np.nan if (value := row.get(key)) is None else value for row in rows], dtype=np.float64)
+
+def _day_column(quiz_history: List[Dict]) -> np.ndarray:
+    days = [(quiz.get("timestamp") or "")[:10] for quiz in quiz_history]
+    try:
+        return np.array(days, dtype="datetime64[D]")
+    except ValueError:
+        # Only reached for malformed timestamps; those days become NaT
+        parsed = []
+        for day in days:
+            try:
+                parsed.append(np.datetime64(day, "D"))
+            except ValueError:
+                parsed.append(np.datetime64("NaT", "D"))
+        return np.array(parsed, dtype="datetime64[D]")
+
+def load_quiz_columns(quiz_history: Iterable[Dict], columns: Iterable[str] = QuizColumns._fields) -> QuizColumns:
+    """
+    Reads the scalar fields the dashboard functions need out of quiz result documents,
+    so the calculations on them can run as NumPy array operations. Reading values out
+    of the dicts is most of the cost, so callers name only the `columns` they use.
+    """
+    quiz_history = quiz_history if isinstance(quiz_history, list) else list(quiz_history)
+    columns = set(columns)
+    loaded = {}
+    if "student_ids" in columns:
+        loaded["student_ids"] = np.array([quiz.get("student_id") for quiz in quiz_history], dtype=object)
+    if "days" in columns:
+        loaded["days"] = _day_column(quiz_history)
+    summaries = None
+    for column, (field, in_summary) in _QUIZ_COLUMN_SOURCES.items():
+        if column not in columns:
+            continue
+        if in_summary and summaries is None:
+            summaries = [quiz.get("scoring_summary") or {} for quiz in quiz_history]
+        loaded[column] = _float_column(summaries if in_summary else quiz_history, field)
+    return QuizColumns(**loaded)
+
+def quiz_accuracy_and_efficiency_arrays(columns: QuizColumns) -> Tuple[np.ndarray, np.ndarray]:
+    """quiz_accuracy_and_efficiency for every quiz of `columns` at once; NaN where not computable."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        has_accuracy = ~np.isnan(columns.total_score) & (columns.max_score > 0)
+        accuracy = np.where(has_accuracy, columns.total_score / columns.max_score, np.nan)
+
+        has_timing = has_accuracy & (np.nan_to_num(columns.time_taken) != 0) & (np.nan_to_num(columns.total_questions) != 0)
+        time_per_q = columns.time_taken / columns.total_questions
+        time_ratio = np.where(time_per_q > 0, IDEAL_TIME_PER_QUESTION / time_per_q, 1.0)
+        efficiency = np.where(has_timing, accuracy * time_ratio, np.nan)
+    return accuracy, efficiency
+
+# Columns (and the quiz result fields behind them) the daily graph reads
+DAILY_INDEX_COLUMNS = ("days", "total_score", "max_score", "total_questions", "time_taken")
+DAILY_INDEX_PROJECTION = {
+    "_id": 0, "timestamp": 1, "time_taken_seconds": 1,
+    "scoring_summary.total_score": 1, "scoring_summary.max_score": 1, "scoring_summary.total_questions": 1,
+}
+
+def get_daily_performance_indices(quiz_history: List[Dict], smoothing_window_days: int = 0) -> Dict:
+    columns = load_quiz_columns(quiz_history, DAILY_INDEX_COLUMNS)
+    accuracy, efficiency = quiz_accuracy_and_efficiency_arrays(columns)
+
+    # Group by calendar day: np.unique sorts the day numbers, bincount sums per day in input order
+    keep = ~np.isnan(accuracy) & ~np.isnat(columns.days)
+    day_numbers, day_index = np.unique(columns.days[keep].astype(np.int64), return_inverse=True)
+    days = day_numbers.astype("datetime64[D]")
+    accuracy, efficiency = accuracy[keep], efficiency[keep]
+    timed = ~np.isnan(efficiency)
+
+    return _daily_indices_from_arrays(
+        days,
+        np.bincount(day_index, weights=accuracy, minlength=len(days)),
+        np.bincount(day_index, minlength=len(days)),
+        np.bincount(day_index[timed], weights=efficiency[timed], minlength=len(days)),
+        np.bincount(day_index[timed], minlength=len(days)),
+        smoothing_window_days,
+    )
+
+def daily_performance_indices_from_sums(daily_sums: Dict[str, Dict], smoothing_window_days: int = 0) -> Dict:
+    """
+    Graph data from per-day accuracy / efficiency sums and counts, e.g. the `daily` section
+    of a student rollup. Days without any accuracy value are left out.
+    """
+    dates = sorted(daily_sums)
+    return _daily_indices_from_arrays(
+        np.array(dates, dtype="datetime64[D]"),
+        np.array([daily_sums[date].get("accuracy_sum", 0.0) for date in dates], dtype=np.float64),
+        np.array([daily_sums[date].get("accuracy_count", 0) for date in dates], dtype=np.float64),
+        np.array([daily_sums[date].get("efficiency_sum", 0.0) for date in dates], dtype=np.float64),
+        np.array([daily_sums[date].get("efficiency_count", 0) for date in dates], dtype=np.float64),
+        smoothing_window_days,
+    )
+
+def _daily_indices_from_arrays(days: np.ndarray, accuracy_sum: np.ndarray, accuracy_count: np.ndarray,
+                               efficiency_sum: np.ndarray, efficiency_count: np.ndarray,
+                               smoothing_window_days: int = 0) -> Dict:
+    """
+    Graph data from per-day sums and counts over sorted, distinct days. With a smoothing
+    window of N > 1 days, each day shows the average over the N calendar days ending on
+    it (a trailing rolling window, weighted by the number of quizzes). Only days with
+    quizzes of their own get a point.
+    """
+    has_data = accuracy_count > 0
+    if smoothing_window_days > 1 and len(days):
+        day_numbers = days.astype(np.int64)
+        window_start = np.searchsorted(day_numbers, day_numbers - smoothing_window_days + 1, side="left")
+        def rolling(values):
+            cumulative = np.concatenate(([0], np.cumsum(values)))
+            return cumulative[1:] - cumulative[window_start]
+        accuracy_sum, accuracy_count = rolling(accuracy_sum), rolling(accuracy_count)
+        efficiency_sum, efficiency_count = rolling(efficiency_sum), rolling(efficiency_count)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_accuracy = accuracy_sum[has_data] / accuracy_count[has_data] * 100
+        avg_efficiency = np.where(efficiency_count[has_data] > 0,
+                                  efficiency_sum[has_data] / efficiency_count[has_data] * 100, 0.0)
 
     return {
-        "labels": labels,
-        "accuracy_index": accuracy_values,
-        "efficiency_index": efficiency_values
+        "labels": np.datetime_as_string(days[has_data], unit="D").tolist(),
+        # Python's round, not np.round: the two differ on values such as 14.85
+        "accuracy_index": [round(value, 1) for value in avg_accuracy.tolist()],
+        "efficiency_index": [round(value, 1) for value in avg_efficiency.tolist()]
     }
 
 # --- START OF NEW AIML CODE TO ADD ---
+LEARNER_CATEGORIES = ["Slow Learner", "Average Learner", "Quick Learner"]
+
+def learner_performance_scores(columns: QuizColumns) -> np.ndarray:
+    """Performance score of every quiz of `columns`: 70% accuracy, 30% speed relative to IDEAL_TIME_PER_QUESTION."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accuracy = np.nan_to_num(columns.correct_answers, nan=0.0) / np.nan_to_num(columns.total_questions, nan=1.0)
+
+        has_timing = (np.nan_to_num(columns.time_taken) != 0) & (np.nan_to_num(columns.total_questions) != 0)
+        time_per_q = columns.time_taken / columns.total_questions
+        speed_score = np.where(has_timing, np.minimum(1.5, IDEAL_TIME_PER_QUESTION / time_per_q), 1.0)
+
+    return (accuracy * 0.7) + ((speed_score - 1) * 0.3)
+
+def compute_learner_performance_averages(all_user_histories: Iterable[Dict], chunk_size: int = 10000) -> Dict[str, float]:
+    """
+    Average performance score per student. Reads the results in chunks of `chunk_size`
+    and keeps only a running sum and count per student, so it can consume a streamed
+    cursor without holding the results in memory. The database services compute the
+    same numbers in MongoDB with get_learner_performance_averages.
+    """
+    student_index: Dict[str, int] = {}
+    score_sums = np.zeros(0)
+    quiz_counts = np.zeros(0, dtype=np.int64)
+
+    histories = iter(all_user_histories)
+    while True:
+        chunk = list(islice(histories, chunk_size))
+        if not chunk:
+            break
+        columns = load_quiz_columns(chunk, ("student_ids", "correct_answers", "total_questions", "time_taken"))
+        indices = np.fromiter((student_index.setdefault(student_id, len(student_index)) for student_id in columns.student_ids),
+                              dtype=np.int64, count=len(chunk))
+        if len(student_index) > len(score_sums):
+            new_students = len(student_index) - len(score_sums)
+            score_sums = np.concatenate((score_sums, np.zeros(new_students)))
+            quiz_counts = np.concatenate((quiz_counts, np.zeros(new_students, dtype=np.int64)))
+        # np.add.at adds in input order, the same sums a plain loop would produce
+        np.add.at(score_sums, indices, learner_performance_scores(columns))
+        np.add.at(quiz_counts, indices, 1)
+
+    return {student_id: float(score_sums[i] / quiz_counts[i]) for student_id, i in student_index.items()}
+
+@timed_stage("kmeans_fit")
+def fit_learner_category_centers(user_averages: Dict[str, float]) -> Optional[List[float]]:
+    """
+    Fits K-Means (k=3) on the per-student averages and returns the cluster centers in
+    ascending order, i.e. Slow / Average / Quick. Returns None when there are fewer than
+    3 students, in which case classify_learner falls back to fixed thresholds.
+    """
+    # Sorted so the fit does not depend on the order the students come in (dict from Python or from a $group)
+    X = np.sort(np.array(list(user_averages.values()))).reshape(-1, 1)
+    if len(X) < 3:
+        return None
+
+    # Imported here: scikit-learn takes seconds to import and is only needed by the pathway endpoint
+    from sklearn.cluster import KMeans
+    kmeans = KMeans(n_clusters=3, random_state=42, n_init='auto').fit(X)
+    return sorted(float(center) for center in kmeans.cluster_centers_.flatten())
+
+def classify_learner(avg_score: float, centers: Optional[List[float]]) -> str:
+    """Category of the nearest cluster center (what KMeans.predict does in one dimension), or thresholds without centers."""
+    if centers is None:
+        if avg_score > 0.85: return "Quick Learner"
+        elif avg_score < 0.6: return "Slow Learner"
+        return "Average Learner"
+    nearest = min(range(len(centers)), key=lambda i: abs(avg_score - centers[i]))
+    return LEARNER_CATEGORIES[nearest]
+
 def categorize_learner_profile(all_user_histories: List[Dict]) -> Dict[str, str]:
     """
     Uses K-Means clustering on ALL user data to find performance profiles
     and then maps each user to a profile.
     """
-    user_performance = defaultdict(list)
-
-    for history in all_user_histories:
-        student_id = history.get("student_id")
-        summary = history.get("scoring_summary", {})
-        
-        accuracy = summary.get("correct_answers_count", 0) / summary.get("total_questions", 1)
-        
-        time_taken = history.get("time_taken_seconds")
-        total_questions = summary.get("total_questions")
-        
-        if time_taken and total_questions:
-            time_per_q = time_taken / total_questions
-            speed_score = min(1.5, 45 / time_per_q)
-        else:
-            speed_score = 1.0
-            
-        performance_score = (accuracy * 0.7) + ((speed_score - 1) * 0.3)
-        user_performance[student_id].append(performance_score)
-
-    if not user_performance:
+    user_averages = compute_learner_performance_averages(all_user_histories)
+    if not user_averages:
         return {}
+    centers = fit_learner_category_centers(user_averages)
+    return {user: classify_learner(avg_score, centers) for user, avg_score in user_averages.items()}
 
-    user_averages = {user: np.mean(scores) for user, scores in user_performance.items()}
-    X = np.array(list(user_averages.values())).reshape(-1, 1)
 
-    if len(X) < 3:
-        user_categories = {}
-        for user, avg_score in user_averages.items():
-            if avg_score > 0.85: category = "Quick Learner"
-            elif avg_score < 0.6: category = "Slow Learner"
-            else: category = "Average Learner"
-            user_categories[user] = category
-        return user_categories
+class LearnerCategoryModel:
+    """
+    Cached result of the K-Means fit behind the learner categories, so that a pathway
+    request only classifies one student against the stored centers instead of refitting
+    on every student's history.
 
-    kmeans = KMeans(n_clusters=3, random_state=42, n_init='auto').fit(X)
-    
-    centers = kmeans.cluster_centers_.flatten()
-    sorted_centers = sorted(centers)
-    label_map = {
-        sorted_centers[0]: "Slow Learner",
-        sorted_centers[1]: "Average Learner",
-        sorted_centers[2]: "Quick Learner"
-    }
-    
-    user_categories = {}
-    for user, avg_score in user_averages.items():
-        user_cluster_index = kmeans.predict(np.array([[avg_score]]))[0]
-        cluster_center = kmeans.cluster_centers_[user_cluster_index][0]
-        user_categories[user] = label_map[cluster_center]
+    The model is refitted when it is older than `refresh_seconds` or once
+    `refresh_after_results` new quiz results were recorded since the last fit.
+    """
+
+    def __init__(self, refresh_seconds: float = 3600, refresh_after_results: int = 50):
+        self.refresh_seconds = refresh_seconds
+        self.refresh_after_results = refresh_after_results
+        self.centers: Optional[List[float]] = None
+        self.fitted_at: Optional[float] = None
+        self.students_at_fit = 0
+        self.new_results_since_fit = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def record_new_result(self) -> None:
+        with self._lock:
+            self.new_results_since_fit += 1
 
-    return user_categories
+    def needs_refresh(self) -> bool:
+        with self._lock:
+            return (self.fitted_at is None
+                    or time.time() - self.fitted_at >= self.refresh_seconds
+                    or self.new_results_since_fit >= self.refresh_after_results)
+
+    def refresh(self, user_averages: Dict[str, float]) -> None:
+        """Refits the centers from per-student averages. Concurrent callers wait for the running fit instead of repeating it."""
+        fitted_before = self.fitted_at
+        with self._refresh_lock:
+            if self.fitted_at != fitted_before and not self.needs_refresh():
+                return  # Another request refreshed the model while this one waited
+            centers = fit_learner_category_centers(user_averages) if user_averages else None
+            with self._lock:
+                self.centers = centers
+                self.fitted_at = time.time()
+                self.students_at_fit = len(user_averages)
+                self.new_results_since_fit = 0
+                self.refreshes += 1
+
+    def classify(self, avg_score: float) -> str:
+        with self._lock:
+            centers = self.centers
+        return classify_learner(avg_score, centers)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "centers": self.centers,
+                "fitted_at": datetime.fromtimestamp(self.fitted_at).isoformat() if self.fitted_at else None,
+                "seconds_since_fit": round(time.time() - self.fitted_at, 1) if self.fitted_at else None,
+                "students_at_fit": self.students_at_fit,
+                "new_results_since_fit": self.new_results_since_fit,
+                "refreshes": self.refreshes,
+                "refresh_seconds": self.refresh_seconds,
+                "refresh_after_results": self.refresh_after_results,
+            }
 # --- END OF NEW AIML CODE TO ADD ---
 
 
@@ -127,6 +345,17 @@ def generate_learning_pathway(user_history: List[Dict], syllabus: Dict) -> Dict:
             if question.get("is_correct"):
                 stats['correct'] += 1
 
+    total_correct = sum(q.get('scoring_summary', {}).get('correct_answers_count', 0) for q in user_history)
+    total_qs = sum(q.get('scoring_summary', {}).get('total_questions', 0) for q in user_history)
+    return generate_learning_pathway_from_stats(performance_map, syllabus, total_correct, total_qs)
+
+
+def generate_learning_pathway_from_stats(performance_map: Dict, syllabus: Dict, total_correct: int, total_qs: int) -> Dict:
+    """
+    Same result as generate_learning_pathway, from precomputed statistics:
+    unit -> topic -> subtopic -> {'correct', 'total'} plus the overall answer counts
+    (e.g. from a student rollup).
+    """
     learning_path = []
     
     for unit_name in syllabus.keys():
@@ -149,8 +378,6 @@ def generate_learning_pathway(user_history: List[Dict], syllabus: Dict) -> Dict:
                 learning_path.append({"unit": unit_name, "topics": weak_topics_in_unit})
     
     # This simplified categorization can be replaced by the new AIML function's output
-    total_correct = sum(q.get('scoring_summary', {}).get('correct_answers_count', 0) for q in user_history)
-    total_qs = sum(q.get('scoring_summary', {}).get('total_questions', 0) for q in user_history)
     overall_accuracy = total_correct / total_qs if total_qs > 0 else 0
     
     user_category = "Average Learner"
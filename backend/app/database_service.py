@@ -3,73 +3,313 @@
 import os
 import pymongo
 import certifi
+from bson import ObjectId
 from dotenv import load_dotenv
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-from typing import List, Dict
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+from .auth_cache import auth_cache
+from .metrics import instrument_storage_methods
+from .config import settings
+from .password_hasher import password_hasher
+from .dashboard_engine import IDEAL_TIME_PER_QUESTION
+from .quiz_result_documents import build_quiz_result_document, period_start_timestamp
+from .student_rollup import (
+    ROLLUP_COLLECTION,
+    ROLLUP_READ_PROJECTION,
+    ROLLUP_HISTORY_PROJECTION,
+    ROLLUP_SOURCE_PROJECTION,
+    ROLLUP_REBUILD_ATTEMPTS,
+    DASHBOARD_LEVELS,
+    DASHBOARD_TYPES,
+    build_rollup_folds,
+    build_rebuilt_rollup,
+    rollup_version_filter,
+    rollup_dashboard_projection,
+    rollup_dashboard_grid,
+    rollup_history_summary,
+)
+
+
+# --- Connection and collections: shared with AsyncDatabaseService (async_database_service.py) ---
+
+def mongo_connection_string() -> str:
+    """MONGO_CONNECTION_STRING, from the environment or backend/.env."""
+    # Load .env from 2 levels up (backend/.env)
+    dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+    load_dotenv(dotenv_path)
+
+    connection_string = os.getenv("MONGO_CONNECTION_STRING")
+    if not connection_string:
+        raise ValueError("CRITICAL: MONGO_CONNECTION_STRING environment variable is not set.")
+    return connection_string
+
+def mongo_client_options() -> Dict:
+    """Keyword arguments of both pymongo.MongoClient and Motor's AsyncIOMotorClient."""
+    return {"serverSelectionTimeoutMS": 5000, "tlsCAFile": certifi.where()}
+
+def bind_collections(service, client) -> None:
+    """Sets the database and collection attributes of a MongoDB service from its (pymongo or Motor) client."""
+    service.db = client.educonnect_db
+    service.users_collection = service.db.users
+    service.quiz_results_collection = service.db.quiz_results
+    service.student_rollups_collection = service.db[ROLLUP_COLLECTION]
+
+
+# --- Index declarations: each query of the database services is served by one of these ---
+
+QUIZ_RESULTS_INDEXES = [
+    {"keys": [("path", pymongo.ASCENDING)]},
+    # Full history, dashboard grid and graph data: one student, optional timestamp range, sorted by timestamp
+    {"keys": [("student_id", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)]},
+    # Unit history: one student and one quiz, sorted by timestamp
+    {"keys": [("student_id", pymongo.ASCENDING), ("quiz_name", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)]},
+    # Distinct unit quizzes attempted (quiz availability)
+    {"keys": [("student_id", pymongo.ASCENDING), ("quiz_type", pymongo.ASCENDING), ("quiz_name", pymongo.ASCENDING)]},
+]
+USERS_INDEXES = [
+    {"keys": [("username", pymongo.ASCENDING)], "unique": True},
+    {"keys": [("email", pymongo.ASCENDING)], "unique": True},
+]
+
+def index_name(keys) -> str:
+    """MongoDB's default index name for a key list, e.g. student_id_1_timestamp_-1."""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+def find_missing_indexes(index_information: Dict, declared: List[Dict]) -> List[str]:
+    """Names of the declared indexes that are absent from `collection.index_information()` (or not unique when they should be)."""
+    existing = {
+        tuple((field, int(direction)) for field, direction in info["key"]): info.get("unique", False)
+        for info in index_information.values()
+    }
+    missing = []
+    for spec in declared:
+        keys = tuple(spec["keys"])
+        if keys not in existing or (spec.get("unique") and not existing[keys]):
+            missing.append(index_name(spec["keys"]))
+    return missing
+
+def report_index_check(missing: List[str], label: str = "MongoDB") -> None:
+    """Prints the outcome of ensure_indexes; `missing` holds "<collection>.<index name>" entries."""
+    if missing:
+        print(f"Warning: Missing {label} indexes: {', '.join(missing)}")
+    else:
+        print(f"✅ {label} indexes verified.")
+
+def build_user_document(username: str, email: str, hashed_password: str) -> Dict:
+    return {
+        "username": username,
+        "email": email,
+        "password_hash": hashed_password,
+        "created_at": datetime.now().isoformat()
+    }
+
+def duplicate_user_error(error: pymongo.errors.DuplicateKeyError) -> Dict:
+    """Maps a unique-index violation on the users collection to create_user's error message."""
+    # keyPattern is reported by MongoDB 4.2+; older servers only name the index in the message
+    key_pattern = (error.details or {}).get("keyPattern", {})
+    if "email" in key_pattern or (not key_pattern and "email_1" in str(error)):
+        return {"status": "error", "message": "Email already registered."}
+    return {"status": "error", "message": "Username already exists."}
+
+def build_student_query(username: Optional[str] = None) -> Dict:
+    """Quiz results of one student, or of everyone if `username` is empty."""
+    return {"student_id": username} if username else {}
+
+def build_unit_quizzes_query(username: str) -> Dict:
+    """One student's unit quiz results (their distinct quiz_name values are the units attempted)."""
+    return {'student_id': username, 'quiz_type': 'Unit-Quizzes'}
+
+def build_time_period_query(username: str, time_period_days: int) -> Dict:
+    """Quiz results of one user, limited to the last `time_period_days` days (0 means all time)."""
+    query = {"student_id": username}
+    start_timestamp = period_start_timestamp(time_period_days)
+    if start_timestamp is not None:
+        # '$gte' means "greater than or equal to"; timestamps are stored as ISO strings
+        query["timestamp"] = {"$gte": start_timestamp}
+    return query
+
+def build_dashboard_grid_pipeline(username: str, time_period_days: int) -> List[Dict]:
+    """
+    Aggregation pipeline that counts total / correct answers per (difficulty level,
+    difficulty type) inside MongoDB. It returns at most nine small documents however
+    many quizzes the student has taken.
+    """
+    return [
+        {"$match": build_time_period_query(username, time_period_days)},
+        {"$project": {
+            "_id": 0,
+            "performance_breakdown.difficulty_level": 1,
+            "performance_breakdown.difficulty_type": 1,
+            "performance_breakdown.is_correct": 1,
+        }},
+        {"$unwind": "$performance_breakdown"},
+        # Only the categories tracked by the grid
+        {"$match": {
+            "performance_breakdown.difficulty_level": {"$in": DASHBOARD_LEVELS},
+            "performance_breakdown.difficulty_type": {"$in": DASHBOARD_TYPES},
+        }},
+        {"$group": {
+            "_id": {"level": "$performance_breakdown.difficulty_level", "type": "$performance_breakdown.difficulty_type"},
+            "total": {"$sum": 1},
+            "correct": {"$sum": {"$cond": ["$performance_breakdown.is_correct", 1, 0]}},
+        }},
+    ]
+
+def dashboard_grid_from_counts(grouped_counts) -> Dict:
+    """Turns the output of build_dashboard_grid_pipeline into the 3x3 grid, e.g. dashboard_data['easy']['direct']."""
+    dashboard_data = {level: {type_: {"total": 0, "correct": 0} for type_ in DASHBOARD_TYPES} for level in DASHBOARD_LEVELS}
+    for row in grouped_counts:
+        dashboard_data[row["_id"]["level"]][row["_id"]["type"]] = {"total": row["total"], "correct": row["correct"]}
+    return dashboard_data
+
+# History pages leave out the per-question breakdown unless full documents are requested
+HISTORY_SUMMARY_PROJECTION = {"_id": 0, "performance_breakdown": 0}
+
+def build_history_page_query(username: str, unit_name: Optional[str] = None, before: Optional[str] = None) -> Dict:
+    """
+    One student's quiz results, optionally for one quiz, older than the `before` timestamp.
+    Pages are keyed by timestamp: results are saved with microsecond timestamps, so a
+    student never has two results with the same one. Served by the (student_id, timestamp)
+    and (student_id, quiz_name, timestamp) indexes.
+    """
+    query = {"student_id": username}
+    if unit_name is not None:
+        query["quiz_name"] = unit_name
+    if before:
+        query["timestamp"] = {"$lt": before}
+    return query
+
+# Fields of a quiz result the learner-category feature (dashboard_engine.learner_performance_scores) reads
+LEARNER_FEATURE_PROJECTION = {
+    "_id": 0, "student_id": 1, "time_taken_seconds": 1,
+    "scoring_summary.correct_answers_count": 1, "scoring_summary.total_questions": 1,
+}
+
+def build_learner_performance_pipeline(username: Optional[str] = None) -> List[Dict]:
+    """
+    Aggregation pipeline computing dashboard_engine.learner_performance_scores for every
+    quiz result and averaging it per student inside MongoDB. It returns one small
+    {_id: student_id, average} document per student however many results they have.
+    """
+    total_questions = "$scoring_summary.total_questions"
+    time_taken = "$time_taken_seconds"
+    accuracy = {"$divide": [{"$ifNull": ["$scoring_summary.correct_answers_count", 0]}, {"$ifNull": [total_questions, 1]}]}
+    has_timing = {"$and": [
+        {"$ne": [{"$ifNull": [time_taken, 0]}, 0]},
+        {"$ne": [{"$ifNull": [total_questions, 0]}, 0]},
+    ]}
+    speed_score = {"$cond": [
+        has_timing,
+        {"$min": [1.5, {"$divide": [IDEAL_TIME_PER_QUESTION, {"$divide": [time_taken, total_questions]}]}]},
+        1.0,
+    ]}
+    pipeline = [{"$match": {"student_id": username}}] if username else []
+    return pipeline + [
+        {"$project": LEARNER_FEATURE_PROJECTION},
+        {"$group": {
+            "_id": "$student_id",
+            "average": {"$avg": {"$add": [
+                {"$multiply": [accuracy, 0.7]},
+                {"$multiply": [{"$subtract": [speed_score, 1]}, 0.3]},
+            ]}},
+        }},
+    ]
+
+
+@instrument_storage_methods("mongo")
 class DatabaseService:
-    def __init__(self):
-        # Load .env from 2 levels up (backend/.env)
-        dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
-        load_dotenv(dotenv_path)
+    storage_backend = "mongo"
 
-        self.connection_string = os.getenv("MONGO_CONNECTION_STRING")
-        if not self.connection_string:
-            raise ValueError("CRITICAL: MONGO_CONNECTION_STRING environment variable is not set.")
+    def __init__(self):
+        self.connection_string = mongo_connection_string()
 
         try:
             print("Trying to connect to MongoDB with certifi...")
-            self.client = pymongo.MongoClient(
-                self.connection_string,
-                serverSelectionTimeoutMS=5000,
-                tlsCAFile=certifi.where()
-            )
-            self.db = self.client.educonnect_db
-            self.users_collection = self.db.users
-            self.quiz_results_collection = self.db.quiz_results
+            self.client = pymongo.MongoClient(self.connection_string, **mongo_client_options())
+            bind_collections(self, self.client)
             self.client.admin.command('ping')  # Force connection check
-            self.quiz_results_collection.create_index("path")
             print("✅ MongoDB connected successfully.")
         except Exception as e:
             print(f"❌ MongoDB connection failed: {e}")
             self.client = None
 
+        # create_user relies on the unique username/email indexes; it falls back to
+        # checking with find_one first if they could not be built (e.g. existing duplicates)
+        self.unique_user_indexes = False
+        if self.client is not None:
+            self.ensure_indexes()
+
+    def ensure_indexes(self) -> bool:
+        """Creates the declared indexes if needed and verifies that they all exist. Returns True if none is missing."""
+        missing = []
+        for collection, declared in ((self.quiz_results_collection, QUIZ_RESULTS_INDEXES), (self.users_collection, USERS_INDEXES)):
+            for spec in declared:
+                try:
+                    collection.create_index(spec["keys"], unique=spec.get("unique", False))
+                except pymongo.errors.PyMongoError as e:
+                    print(f"Warning: Could not create index {index_name(spec['keys'])} on '{collection.name}': {e}")
+            missing_here = find_missing_indexes(collection.index_information(), declared)
+            missing += [f"{collection.name}.{name}" for name in missing_here]
+            if collection is self.users_collection:
+                self.unique_user_indexes = not missing_here
+        report_index_check(missing)
+        return not missing
+
     def create_user(self, username: str, email: str, password: str):
         if self.client is None:
             return {"status": "error", "message": "Database not connected."}
+        duplicate = self.find_duplicate_user(username, email)
+        if duplicate:
+            return duplicate
+        return self.insert_user(username, email, password_hasher.hash_sync(password))
+
+    def find_duplicate_user(self, username: str, email: str) -> Optional[Dict]:
+        """The "already exists" error for a taken username or email, checked up front only without the unique indexes."""
+        if self.client is None or self.unique_user_indexes:
+            return None
         if self.users_collection.find_one({"username": username}):
             return {"status": "error", "message": "Username already exists."}
         if self.users_collection.find_one({"email": email}):
             return {"status": "error", "message": "Email already registered."}
+        return None
 
-        hashed_password = pwd_context.hash(password)
-        user_document = {
-            "username": username,
-            "email": email,
-            "password_hash": hashed_password,
-            "created_at": datetime.now().isoformat()
-        }
-
+    def insert_user(self, username: str, email: str, hashed_password: str):
+        """Stores a new user whose password has already been hashed (see password_hasher)."""
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
         try:
-            self.users_collection.insert_one(user_document)
+            self.users_collection.insert_one(build_user_document(username, email, hashed_password))
             return {"status": "success", "message": "User created successfully."}
+        except pymongo.errors.DuplicateKeyError as e:
+            return duplicate_user_error(e)
         except Exception:
             return {"status": "error", "message": "Could not create user."}
 
     def authenticate_user(self, username: str, password: str):
-        user = self.users_collection.find_one({"username": username})
-        if not user or not pwd_context.verify(password, user["password_hash"]):
+        user = self.get_user(username)
+        if not user or not password_hasher.verify_sync(password, user["password_hash"]):
             return False
         return user
 
+    def get_user(self, username: str) -> Optional[Dict]:
+        if self.client is None:
+            return None
+        return self.users_collection.find_one({"username": username})
+
     def check_username_exists(self, username: str) -> bool:
         if self.client is None:
             return False
         return self.users_collection.find_one({"username": username}) is not None
 
+    def delete_user(self, username: str) -> bool:
+        if self.client is None:
+            return False
+        result = self.users_collection.delete_one({"username": username})
+        # Cached logins of this user must stop working right away, not when the cache entry expires
+        auth_cache.invalidate_user(username)
+        return result.deleted_count > 0
+
     def check_email_exists(self, email: str) -> bool:
         if self.client is None:
             return False
@@ -78,82 +318,129 @@ class DatabaseService:
     def get_user_quiz_history_summary(self, username: str) -> dict:
         if self.client is None:
             return {'unique_unit_quizzes_attempted': 0}
-        distinct_quizzes = self.quiz_results_collection.distinct(
-            'quiz_name',
-            {'student_id': username, 'quiz_type': 'Unit-Quizzes'}
-        )
+        rollup = self.student_rollups_collection.find_one({"_id": username}, ROLLUP_HISTORY_PROJECTION)
+        if rollup is not None:
+            return rollup_history_summary(rollup)
+        # No rollup yet (no quiz saved since rollups were introduced and not backfilled)
+        distinct_quizzes = self.quiz_results_collection.distinct('quiz_name', build_unit_quizzes_query(username))
         return {'unique_unit_quizzes_attempted': len(distinct_quizzes)}
 
     def save_quiz_result(self, result_data: dict):
         if self.client is None:
             return {"status": "error", "message": "Database not connected."}
 
-        student_id = result_data.get("student_id")
-        subject = result_data.get("subject")
-        quiz_type = result_data.get("quiz_type")
-        quiz_name = result_data.get("quiz_name")
-        timestamp = result_data.get("timestamp") or datetime.now().isoformat()
-        performance = result_data.get("performance_breakdown")
-        time_taken = result_data.get("time_taken_seconds", None)
-
-        total_score = sum(q.get("marks_obtained", 0) for q in performance)
-        max_score = sum(q.get("marks_possible", 0) for q in performance)
-        correct_answers = sum(1 for q in performance if q.get("is_correct"))
-
-        difficulty_counts = {}
-        type_counts = {}
-        topics = set()
-        subtopics = set()
-
-        for q in performance:
-            difficulty = q.get("difficulty_level", "unknown")
-            dtype = q.get("difficulty_type", "unknown")
-            difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + 1
-            type_counts[dtype] = type_counts.get(dtype, 0) + 1
-            if q.get("topic_name"): topics.add(q["topic_name"])
-            if q.get("subtopic_name"): subtopics.add(q["subtopic_name"])
-
-        scoring_summary = {
-            "total_score": total_score,
-            "max_score": max_score,
-            "correct_answers_count": correct_answers,
-            "total_questions": len(performance),
-            "difficulty_breakdown": difficulty_counts,
-            "type_breakdown": type_counts,
-            "topics_covered": list(topics),
-            "subtopics_covered": list(subtopics)
-        }
-
-        path = f"{student_id}/{subject}/{'Grand-Quiz' if quiz_type == 'Grand-Quiz' else quiz_name}/{timestamp}"
-
-        doc_to_store = {
-            "path": path,
-            "student_id": student_id,
-            "subject": subject,
-            "quiz_type": quiz_type,
-            "quiz_name": quiz_name,
-            "timestamp": timestamp,
-            "performance_breakdown": performance,
-            "time_taken_seconds": time_taken,
-            "scoring_summary": scoring_summary
-        }
+        doc_to_store = build_quiz_result_document(result_data)
 
         try:
             self.quiz_results_collection.insert_one(doc_to_store)
-            return {"status": "success", "message": "Quiz result saved with structured path."}
         except Exception as e:
             print(f"Error saving quiz result: {e}")
             return {"status": "error", "message": "Could not save quiz result."}
 
+        # The result itself is stored at this point; if the rollup update fails, the rollup misses
+        # this result until it is rebuilt (the warning below names the command)
+        student_id = doc_to_store["student_id"]
+        fold_filter, fold_update = build_rollup_folds([doc_to_store])[student_id]
+        try:
+            try:
+                update_result = self.student_rollups_collection.update_one(fold_filter, fold_update, upsert=True)
+                # A freshly created rollup for a student with older results would miss that history
+                rebuild = update_result.upserted_id is not None and \
+                    self.quiz_results_collection.count_documents(build_student_query(student_id), limit=2) > 1
+            except pymongo.errors.DuplicateKeyError:
+                # Already folded in by a rebuild, or another save created the rollup first
+                rebuild = True
+            if rebuild:
+                self.rebuild_student_rollup(student_id)
+        except Exception as e:
+            print(f"Error updating student rollup for '{student_id}': {e}. Rebuild it with scripts/backfill_student_rollups.py --student {student_id}.")
+        return {"status": "success", "message": "Quiz result saved with structured path."}
+
+    def save_quiz_result_documents(self, documents: List[Dict]) -> Dict:
+        """
+        Stores a batch of quiz results already built by build_quiz_result_document (the
+        write-behind writer's journal entries) with one insert_many, then one bulk_write
+        of rollup increments. Results whose path is already stored are skipped, so a batch
+        replayed after a crash is not stored twice; the rollups of those students are
+        rebuilt, since the crash may have come between the insert and the increments.
+        A failed rollup update returns an error status too, so that the batch is retried.
+        """
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        try:
+            stored_paths = {doc["path"] for doc in self.quiz_results_collection.find(
+                {"path": {"$in": [document["path"] for document in documents]}}, {"_id": 0, "path": 1})}
+            new_documents = [document for document in documents if document["path"] not in stored_paths]
+            if new_documents:
+                # insert_many adds an _id to the documents it is given; the journal's copies stay untouched
+                self.quiz_results_collection.insert_many([dict(document) for document in new_documents], ordered=False)
+        except pymongo.errors.PyMongoError as e:
+            print(f"Error saving {len(documents)} quiz results: {e}")
+            return {"status": "error", "message": "Could not save quiz results."}
+
+        replayed_students = {document["student_id"] for document in documents if document["path"] in stored_paths}
+        try:
+            folds = build_rollup_folds(
+                document for document in new_documents if document["student_id"] not in replayed_students)
+            students = list(folds)
+            if students:
+                try:
+                    upserted = self.student_rollups_collection.bulk_write([
+                        pymongo.UpdateOne(*folds[student_id], upsert=True) for student_id in students
+                    ], ordered=False).upserted_ids
+                except pymongo.errors.BulkWriteError as e:
+                    # Duplicate _id: already folded in by a rebuild, or another save created the rollup first
+                    if e.details.get("writeConcernErrors") or any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                        raise
+                    replayed_students.update(students[error["index"]] for error in e.details["writeErrors"])
+                    upserted = {upsert["index"]: upsert["_id"] for upsert in e.details.get("upserted", [])}
+                new_counts = {student_id: folds[student_id][1]["$inc"]["quizzes_taken"] for student_id in students}
+                # Freshly created rollups of students with older results miss that history
+                for index in upserted:
+                    student_id = students[index]
+                    if self.quiz_results_collection.count_documents(build_student_query(student_id), limit=new_counts[student_id] + 1) > new_counts[student_id]:
+                        replayed_students.add(student_id)
+            for student_id in replayed_students:
+                self.rebuild_student_rollup(student_id)
+        except Exception as e:
+            # The results are stored, so the writer's retry takes the replay branch and rebuilds these rollups
+            print(f"Error updating student rollups for a batch of {len(documents)} quiz results: {e}")
+            return {"status": "error", "message": "Quiz results saved, but their student rollups could not be updated."}
+        return {"status": "success", "message": f"{len(new_documents)} quiz results saved.",
+                "inserted": len(new_documents), "skipped": len(documents) - len(new_documents)}
+
+    def get_student_rollup(self, username: str) -> Optional[Dict]:
+        """The student's statistics rollup (see student_rollup.py), or None if there is none yet."""
+        if self.client is None:
+            return None
+        return self.student_rollups_collection.find_one({"_id": username}, ROLLUP_READ_PROJECTION)
+
+    def rebuild_student_rollup(self, username: str) -> Optional[Dict]:
+        """
+        Recomputes a student's rollup from their stored quiz results and replaces it, unless
+        a quiz was folded in since the version was read (see student_rollup.py); retried then.
+        Returns the stored rollup, or None if every attempt lost the version check.
+        """
+        for _ in range(ROLLUP_REBUILD_ATTEMPTS):
+            current = self.student_rollups_collection.find_one({"_id": username}, {"version": 1})
+            cursor = self.quiz_results_collection.find(build_student_query(username), ROLLUP_SOURCE_PROJECTION)
+            rollup = build_rebuilt_rollup(username, cursor, current)
+            if current is None:
+                try:
+                    self.student_rollups_collection.insert_one(rollup)
+                    return rollup
+                except pymongo.errors.DuplicateKeyError:
+                    continue # Created by an increment meanwhile
+            if self.student_rollups_collection.replace_one(rollup_version_filter(username, current), rollup).matched_count:
+                return rollup
+        print(f"Warning: Could not rebuild the rollup of '{username}': quizzes kept being saved. Re-run scripts/backfill_student_rollups.py --student {username}.")
+        return None
+
     def get_full_quiz_history(self, username: str = None) -> List[Dict]:
         if self.client is None:
             return []
-        query = {}
-        if username:
-            query["student_id"] = username
-
         cursor = self.quiz_results_collection.find(
-            query,
+            build_student_query(username),
             {"_id": 0}
         ).sort("timestamp", pymongo.DESCENDING)
         return list(cursor)
@@ -162,12 +449,104 @@ class DatabaseService:
         if self.client is None:
             return []
         cursor = self.quiz_results_collection.find(
-            {"student_id": username, "quiz_name": unit_name},
+            build_history_page_query(username, unit_name),
             {"_id": 0}
         ).sort("timestamp", pymongo.DESCENDING)
         return list(cursor)
     
     
+    def get_quiz_history_page(self, username: str, unit_name: Optional[str] = None, before: Optional[str] = None,
+                              limit: Optional[int] = None, summary: bool = False) -> List[Dict]:
+        """
+        Up to `limit` quiz results of a student (all if None), newest first, older than the
+        `before` timestamp. With summary=True the performance_breakdown is left out.
+        """
+        if self.client is None:
+            return []
+        cursor = self.quiz_results_collection.find(
+            build_history_page_query(username, unit_name, before),
+            HISTORY_SUMMARY_PROJECTION if summary else {"_id": 0}
+        ).sort("timestamp", pymongo.DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+
+    def get_quiz_result(self, username: str, path: str) -> Optional[Dict]:
+        """A single stored quiz result of the student, by its path."""
+        if self.client is None:
+            return None
+        return self.quiz_results_collection.find_one({"path": path, "student_id": username}, {"_id": 0})
+
+
+    def iter_quiz_result_batches(self, username: Optional[str] = None, projection: Optional[Dict] = None,
+                                 batch_size: int = 500) -> Iterator[List[Dict]]:
+        """
+        Streams quiz results (one student's, newest first, or everyone's in natural order)
+        as lists of up to `batch_size` documents, which is also the cursor's batch size.
+        Only one batch is held in memory at a time; used by the export endpoint.
+        """
+        if self.client is None:
+            return
+        cursor = self.quiz_results_collection.find(
+            build_student_query(username),
+            projection or {"_id": 0},
+            batch_size=batch_size
+        )
+        if username:
+            cursor = cursor.sort("timestamp", pymongo.DESCENDING)
+        try:
+            while True:
+                batch = list(islice(cursor, batch_size))
+                if not batch:
+                    break
+                yield batch
+        finally:
+            cursor.close()
+
+    def iter_quiz_results_by_id(self, after_id=None, student_ids: Optional[List[str]] = None,
+                                projection: Optional[Dict] = None, batch_size: int = 500) -> Iterator[List[Dict]]:
+        """
+        Streams quiz results (with their _id) in _id order, as lists of up to `batch_size`.
+        Each batch is its own range query after the previous batch's last _id, so no cursor
+        stays open between batches and a scan can be resumed from any batch's last _id
+        (an ObjectId or its string form). Used by scripts/rescore_quiz_results.py.
+        """
+        if self.client is None:
+            return
+        query = {"student_id": {"$in": student_ids}} if student_ids else {}
+        while True:
+            if after_id is not None:
+                query["_id"] = {"$gt": ObjectId(after_id) if isinstance(after_id, str) else after_id}
+            batch = list(self.quiz_results_collection.find(query, projection).sort("_id", pymongo.ASCENDING).limit(batch_size))
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1]["_id"]
+
+    def update_quiz_result_scores(self, updates: List[Dict]) -> Dict:
+        """
+        Writes recomputed scores back: each update has the result's "_id" and the fields to
+        replace (scoring_summary, and performance_breakdown when it changed). One unordered
+        bulk_write, so a failing update does not hold back the others. Rollups are not touched.
+        """
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        if not updates:
+            return {"status": "success", "modified": 0}
+        requests = [pymongo.UpdateOne({"_id": update["_id"]}, {"$set": {k: v for k, v in update.items() if k != "_id"}})
+                    for update in updates]
+        try:
+            result = self.quiz_results_collection.bulk_write(requests, ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            print(f"Error updating quiz result scores: {len(e.details.get('writeErrors', []))} of {len(updates)} updates failed.")
+            return {"status": "error", "message": "Some quiz result scores could not be updated.",
+                    "modified": e.details.get("nModified", 0)}
+        except pymongo.errors.PyMongoError as e:
+            print(f"Error updating quiz result scores: {e}")
+            return {"status": "error", "message": "Could not update quiz result scores.", "modified": 0}
+        return {"status": "success", "modified": result.modified_count}
+
+
     def get_dashboard_analytics(self, username: str, time_period_days: int) -> Dict:
         """
         Fetches and aggregates user performance data for the dashboard view.
@@ -176,70 +555,61 @@ class DatabaseService:
         if self.client is None:
             return {}
         
-        # --- Date Filtering Logic ---
-        query = {"student_id": username}
-        if time_period_days > 0:
-            # Calculate the date to filter from
-            start_date = datetime.now() - timedelta(days=time_period_days)
-            # Add the date condition to the MongoDB query
-            query["timestamp"] = {"$gte": start_date.isoformat()}
-
-        # Fetch all relevant quiz results within the time period
-        quiz_results = list(self.quiz_results_collection.find(query))
-
-        # --- Aggregation Logic (DAA - Iteration/Counting) ---
-        # This will hold our 3x3 grid data, e.g., dashboard_data['easy']['direct']
-        dashboard_data = {}
-        
-        # Define the categories for the grid
-        levels = ["easy", "medium", "hard"]
-        types = ["direct", "logical reasoning", "aptitude"]
-
-        # Initialize the grid structure
-        for level in levels:
-            dashboard_data[level] = {}
-            for type_ in types:
-                dashboard_data[level][type_] = {"total": 0, "correct": 0}
-
-        # Loop through every question from every fetched quiz
-        for result in quiz_results:
-            for question in result.get("performance_breakdown", []):
-                level = question.get("difficulty_level", "unknown")
-                type_ = question.get("difficulty_type", "unknown")
-
-                # Check if the category is one we are tracking
-                if level in levels and type_ in types:
-                    dashboard_data[level][type_]["total"] += 1
-                    if question.get("is_correct"):
-                        dashboard_data[level][type_]["correct"] += 1
-        
-        return dashboard_data
+        rollup = self.student_rollups_collection.find_one({"_id": username}, rollup_dashboard_projection(time_period_days))
+        if rollup is not None:
+            return rollup_dashboard_grid(rollup, time_period_days)
 
+        # No rollup yet: counted inside MongoDB, only the grid's counters come back
+        grouped_counts = self.quiz_results_collection.aggregate(build_dashboard_grid_pipeline(username, time_period_days))
+        return dashboard_grid_from_counts(grouped_counts)
 
-    def get_performance_data_for_dashboard(self, username: str, time_period_days: int) -> List[Dict]:
+
+    def get_learner_performance_averages(self, username: Optional[str] = None) -> Dict[str, float]:
+        """
+        Average learner performance score per student (for one student if `username` is
+        given), computed by MongoDB. Used to fit and apply the learner-category model
+        without loading everyone's quiz history.
+        """
+        if self.client is None:
+            return {}
+        rows = self.quiz_results_collection.aggregate(build_learner_performance_pipeline(username), allowDiskUse=True)
+        return {row["_id"]: row["average"] for row in rows}
+
+
+    def get_performance_data_for_dashboard(self, username: str, time_period_days: int, projection: Optional[Dict] = None) -> List[Dict]:
             """
             Fetches all quiz results for a user within a specific time period.
-            If time_period_days is 0, it fetches all results.
+            If time_period_days is 0, it fetches all results. `projection` limits the
+            fields returned (default: the whole document without _id).
             """
             if self.client is None:
                 return []
 
-            # The base query always filters by the current user
-            query = {"student_id": username}
-
-            # If a time period is specified (not 'all time'), add a date filter
-            if time_period_days > 0:
-                # Calculate the date to start filtering from
-                start_date = datetime.now() - timedelta(days=time_period_days)
-                # Add the date condition to the MongoDB query.
-                # '$gte' means "greater than or equal to".
-                query["timestamp"] = {"$gte": start_date.isoformat()}
+            # The base query always filters by the current user, plus a date filter unless it is 'all time'
+            query = build_time_period_query(username, time_period_days)
             
             # Execute the query to find all matching documents
-            cursor = self.quiz_results_collection.find(query, {"_id": 0})
+            cursor = self.quiz_results_collection.find(query, projection or {"_id": 0})
             
             return list(cursor)
     
     
+def create_storage_service(backend: str, database_url: str):
+    """
+    Returns the synchronous storage service for STORAGE_BACKEND: DatabaseService for
+    "mongo", SQLiteDatabaseService on the DATABASE_URL file for "sqlite", and for "auto"
+    MongoDB if MONGO_CONNECTION_STRING is set, SQLite otherwise.
+    """
+    if backend == "auto":
+        backend = "mongo" if os.getenv("MONGO_CONNECTION_STRING") else "sqlite"
+    elif backend not in ("mongo", "sqlite"):
+        print(f"Warning: Unknown STORAGE_BACKEND '{backend}'. Using 'mongo'.")
+        backend = "mongo"
+    if backend == "sqlite":
+        from .sqlite_database_service import SQLiteDatabaseService
+        return SQLiteDatabaseService(database_url)
+    return DatabaseService()
+
+
 # Instantiate globally
-database_service = DatabaseService()
+database_service = create_storage_service(settings.STORAGE_BACKEND, settings.DATABASE_URL)
@@ -5,31 +5,47 @@
 from fastapi import FastAPI, HTTPException, status, Query, Depends
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.staticfiles import StaticFiles 
-from fastapi.responses import FileResponse
-from starlette.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from contextlib import asynccontextmanager
 import json
 import os
-import numpy as np
-from sklearn.cluster import KMeans
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel, EmailStr
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 from . import analysis_engine
-from .models import PerformanceBreakdownPayload
+from .models import PerformanceBreakdownPayload, QuizSubmissionPayload, QuizResponse
 from . import dashboard_engine
+from . import student_rollup
+from . import quiz_export
 
 
 from .config import settings
+from .metrics import RequestMetricsMiddleware, METRICS_CONTENT_TYPE, register_stats, render_metrics, run_in_threadpool
 from .question_engine import QuestionEngine
 from .quiz_generator_unit import UnitQuizGenerator
 from .quiz_generator_grand import GrandQuizGenerator
+from .quiz_scoring import score_quiz
 from .syllabus_config import get_unit_names 
 from .database_service import database_service
+from .async_database_service import create_database_service
+from .auth_cache import auth_cache
+from .password_hasher import password_hasher, PasswordHasherBusy
+from .quiz_session_store import create_quiz_session_store
+from .quiz_result_writer import create_quiz_result_writer, QuizResultWriterFull
 from urllib.parse import unquote 
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Write-behind mode replays its journal on start and stores what is still queued on shutdown
+    await run_in_threadpool(quiz_result_writer.start)
+    yield
+    await run_in_threadpool(quiz_result_writer.close)
+    password_hasher.shutdown()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 # --- CORS Middleware ---
 from fastapi.middleware.cors import CORSMiddleware
@@ -44,6 +60,9 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"], # Explicitly list headers
 )
 
+# Added last, so it is the outermost middleware and times the whole request (GET /metrics)
+app.add_middleware(RequestMetricsMiddleware)
+
 
 # --- Pydantic Models ---
 class UserCreate(BaseModel):
@@ -56,6 +75,14 @@ class LoginForm(BaseModel):
     password: str
     remember_me: bool = False
 
+# --- Database ---
+# Endpoints await this service directly: Motor by default, or the synchronous
+# DatabaseService behind the threadpool with DATABASE_DRIVER=pymongo. SQLite storage
+# (STORAGE_BACKEND, DATABASE_URL) always goes through the threadpool. With Motor, the
+# synchronous database_service stays in use by the session store and the result writer,
+# so each worker holds one connection pool per driver (see AsyncDatabaseService).
+db_service = create_database_service(settings.DATABASE_DRIVER, database_service)
+
 # --- JWT and Authentication Helpers ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/login")
 
@@ -72,21 +99,29 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    # Decoded tokens and existing usernames are cached, so most requests skip both jwt.decode and MongoDB
+    username = auth_cache.get_token_subject(token)
+    if username is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        auth_cache.remember_token(token, username, payload.get("exp"))
+
+    if auth_cache.is_known_user(username):
+        return username
 
     # ✅ Check if user still exists in MongoDB (using async-safe threadpool call)
-    user_exists = await run_in_threadpool(database_service.check_username_exists, username=username)
+    user_exists = await db_service.check_username_exists(username=username)
     if not user_exists:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User no longer exists"
         )
+    auth_cache.remember_user(username)
 
     return username
 
@@ -96,9 +131,55 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
 current_script_dir = os.path.dirname(os.path.abspath(__file__))
 backend_dir = os.path.dirname(current_script_dir)
 templates_file_path = os.path.join(backend_dir, 'data_initial', 'question_templates.json')
-question_engine_instance = QuestionEngine(templates_file_path=templates_file_path)
+question_engine_instance = QuestionEngine(templates_file_path=templates_file_path, pool_depth=settings.QUESTION_POOL_DEPTH)
 unit_quiz_generator_instance = UnitQuizGenerator(question_engine=question_engine_instance)
 grand_quiz_generator_instance = GrandQuizGenerator(question_engine=question_engine_instance)
+learner_category_model = dashboard_engine.LearnerCategoryModel(
+    refresh_seconds=settings.LEARNER_MODEL_REFRESH_SECONDS,
+    refresh_after_results=settings.LEARNER_MODEL_REFRESH_AFTER_RESULTS
+)
+quiz_session_store = create_quiz_session_store(settings.QUIZ_SESSION_BACKEND, settings.QUIZ_SESSION_TTL_SECONDS, database_service)
+quiz_result_writer = create_quiz_result_writer(
+    settings.QUIZ_RESULT_WRITE_MODE, db_service, database_service,
+    journal_dir=settings.QUIZ_RESULT_JOURNAL_DIR,
+    batch_size=settings.QUIZ_RESULT_BATCH_SIZE,
+    flush_interval_seconds=settings.QUIZ_RESULT_FLUSH_INTERVAL_MS / 1000,
+    max_pending=settings.QUIZ_RESULT_MAX_PENDING,
+    journal_compact_bytes=settings.QUIZ_RESULT_JOURNAL_COMPACT_MB * 1024 * 1024
+)
+
+# Component statistics, exported on /metrics
+register_stats("question_pool", question_engine_instance.get_pool_stats, counters=("hits", "misses", "refills"))
+register_stats("auth_cache", auth_cache.get_stats, counters=("tokens_hits", "tokens_misses", "users_hits", "users_misses"))
+register_stats("learner_model", learner_category_model.get_stats, counters=("refreshes",))
+register_stats("password_hasher", password_hasher.get_stats, counters=("completed", "rejected"))
+register_stats("quiz_result_writer", quiz_result_writer.get_stats,
+               counters=("queued", "replayed", "stored", "skipped_already_stored", "batches", "journal_compactions",
+                         "failed_batches", "rejected"))
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc: PasswordHasherBusy):
+    # Too many registrations / logins queued for bcrypt: ask the client to retry shortly
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many sign-in requests right now, please retry in a moment."},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(QuizResultWriterFull)
+async def quiz_result_writer_full_handler(request, exc: QuizResultWriterFull):
+    # The write-behind queue is full (the database has been unreachable for a while)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Quiz results cannot be saved right now, please resubmit in a moment."},
+        headers={"Retry-After": "5"}
+    )
+
+# --- Metrics ---
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of the latency histograms in metrics.py (all workers with PROMETHEUS_MULTIPROC_DIR)."""
+    return Response(content=await run_in_threadpool(render_metrics), media_type=METRICS_CONTENT_TYPE)
 
 # --- Root Test HTML ---
 @app.get("/")
@@ -109,7 +190,7 @@ async def read_root_test_html():
 # --- User Management Endpoints ---
 @app.post("/api/v1/users/register", status_code=status.HTTP_201_CREATED)
 async def register_user(user: UserCreate):
-    result = await run_in_threadpool(database_service.create_user, username=user.username, email=user.email, password=user.password)
+    result = await db_service.create_user(username=user.username, email=user.email, password=user.password)
     if result["status"] == "error":
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=result["message"])
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -118,7 +199,7 @@ async def register_user(user: UserCreate):
 
 @app.post("/api/v1/users/login")
 async def login_for_access_token(form_data: LoginForm):
-    user = await run_in_threadpool(database_service.authenticate_user, username=form_data.username, password=form_data.password)
+    user = await db_service.authenticate_user(username=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
     expires_in_minutes = 60 * 24 * 7 if form_data.remember_me else 60
@@ -128,12 +209,12 @@ async def login_for_access_token(form_data: LoginForm):
 
 @app.get("/api/v1/users/check-username/{username}")
 async def check_username_availability(username: str):
-    exists = await run_in_threadpool(database_service.check_username_exists, username=username)
+    exists = await db_service.check_username_exists(username=username)
     return {"username_exists": exists}
 
 @app.get("/api/v1/users/check-email/{email}")
 async def check_email_availability(email: str):
-    exists = await run_in_threadpool(database_service.check_email_exists, email=email)
+    exists = await db_service.check_email_exists(email=email)
     return {"email_exists": exists}
 
 
@@ -142,11 +223,14 @@ async def check_email_availability(email: str):
 @app.get("/api/v1/dashboard/graph-data")
 async def get_dashboard_graph_data(
     current_user: str = Depends(get_current_user), 
-    period: str = "all"
+    period: str = "all",
+    smoothing_days: int = 0
 ):
     """
     Provides aggregated daily performance data for the user's graph.
-    Accepts a 'period' query parameter: '1d', '7d', '30d', or 'all'.
+    Accepts a 'period' query parameter: '1d', '7d', '30d', or 'all'. Periods are whole
+    calendar days: 'Nd' covers today and the N days before it (so '1d' is up to 48 hours).
+    With 'smoothing_days' > 1, each day shows the rolling average over that many days.
     """
     time_map = {
         "1d": 1,
@@ -156,17 +240,26 @@ async def get_dashboard_graph_data(
     }
     time_period_days = time_map.get(period, 0)
     
-    # Step 1: Fetch the raw data from the database for the given time period
-    quiz_history = await run_in_threadpool(
-        database_service.get_performance_data_for_dashboard,
+    # The student's rollup already holds per-day accuracy / efficiency sums
+    rollup = await db_service.get_student_rollup(current_user)
+    if rollup is not None:
+        return dashboard_engine.daily_performance_indices_from_sums(
+            student_rollup.rollup_daily_sums(rollup, time_period_days),
+            smoothing_window_days=smoothing_days
+        )
+
+    # No rollup yet: Step 1: Fetch the raw data from the database for the given time period
+    quiz_history = await db_service.get_performance_data_for_dashboard(
         username=current_user,
-        time_period_days=time_period_days
+        time_period_days=time_period_days,
+        projection=dashboard_engine.DAILY_INDEX_PROJECTION  # only the fields the graph reads
     )
 
     # Step 2: Pass the raw data to the engine to calculate the daily indices
     graph_data = await run_in_threadpool(
         dashboard_engine.get_daily_performance_indices, # Corrected to dashboard_engine
-        quiz_history=quiz_history
+        quiz_history=quiz_history,
+        smoothing_window_days=smoothing_days
     )
     
     return graph_data
@@ -180,29 +273,32 @@ async def generate_user_learning_pathway(current_user: str = Depends(get_current
     """
     # --- START OF EDITED/CORRECTED LOGIC ---
 
-    # 1. Fetch history for the CURRENT user (for their specific pathway)
-    current_user_history = await run_in_threadpool(
-        database_service.get_full_quiz_history,
-        username=current_user
-    )
+    # 1. Fetch the CURRENT user's statistics rollup (for their specific pathway);
+    #    students without a rollup yet fall back to their full history
+    current_user_rollup = await db_service.get_student_rollup(current_user)
+    current_user_history = None
+    if current_user_rollup is None:
+        current_user_history = await db_service.get_full_quiz_history(
+            username=current_user
+        )
 
-    if not current_user_history:
+    if current_user_rollup is not None:
+        has_history = current_user_rollup.get("quizzes_taken", 0) > 0
+    else:
+        has_history = bool(current_user_history)
+    if not has_history:
         return {"user_category": "Not Enough Data", "learning_path": []}
 
-    # 2. Fetch history for ALL users (for the AIML model)
-    all_users_history = await run_in_threadpool(
-        database_service.get_full_quiz_history,
-        username=None  # Pass None to get all users' data
-    )
+    # 2. Refit the AIML K-Means model on ALL users' data only when the cached one is due for a refresh
+    if learner_category_model.needs_refresh():
+        # Per-student averages are computed by MongoDB, not from everyone's full history
+        user_averages = await db_service.get_learner_performance_averages()
+        await run_in_threadpool(learner_category_model.refresh, user_averages)
 
-    # 3. Run AIML K-Means clustering to get categories for all users
-    user_categories = await run_in_threadpool(
-        dashboard_engine.categorize_learner_profile,
-        all_user_histories=all_users_history
-    )
-    
-    # Get the category for our specific current user
-    current_user_category = user_categories.get(current_user, "Not Enough Data")
+    # 3. Classify the current user against the cached cluster centers
+    current_user_average = (await db_service.get_learner_performance_averages(current_user)).get(current_user)
+    current_user_category = (learner_category_model.classify(current_user_average)
+                             if current_user_average is not None else "Not Enough Data")
     
     # 4. Get the structured syllabus to pass to the DAA sorting function
     from .syllabus_config import SYLLABUS_TOPICS
@@ -215,11 +311,20 @@ async def generate_user_learning_pathway(current_user: str = Depends(get_current
             unit_to_topics_map[unit_name].append(topic)
     
     # 5. Run DAA logic to generate the sorted, hierarchical pathway for the current user
-    learning_path = await run_in_threadpool(
-        dashboard_engine.generate_learning_pathway,
-        user_history=current_user_history,
-        syllabus=unit_to_topics_map
-    )
+    if current_user_rollup is not None:
+        totals = current_user_rollup.get("totals", {})
+        learning_path = dashboard_engine.generate_learning_pathway_from_stats(
+            student_rollup.rollup_performance_map(current_user_rollup),
+            unit_to_topics_map,
+            totals.get("correct_answers", 0),
+            totals.get("questions", 0)
+        )
+    else:
+        learning_path = await run_in_threadpool(
+            dashboard_engine.generate_learning_pathway,
+            user_history=current_user_history,
+            syllabus=unit_to_topics_map
+        )
 
     # 6. Combine the results and return
     return {
@@ -235,7 +340,10 @@ async def get_performance_dashboard(
 ):
     """
     Provides aggregated performance data for the user's dashboard.
-    Accepts a 'period' query parameter: '1d', '7d', '30d', or 'all'.
+    Accepts a 'period' query parameter: '1d', '7d', '30d', or 'all'. Periods are whole
+    calendar days, since the student rollups count answers per day: 'Nd' covers today and
+    the N days before it, so '1d' means since midnight yesterday (up to 48 hours), not the
+    last 24 hours.
     """
     time_map = {
         "1d": 1,
@@ -246,8 +354,7 @@ async def get_performance_dashboard(
     time_period_days = time_map.get(period, 0)
     
     # This is the corrected line
-    analytics_data = await run_in_threadpool(
-        database_service.get_dashboard_analytics,
+    analytics_data = await db_service.get_dashboard_analytics(
         username=current_user,
         time_period_days=time_period_days
     )
@@ -262,25 +369,86 @@ async def get_available_units():
 @app.get("/api/v1/quizzes/availability/{subject_name}")
 async def get_quiz_availability(subject_name: str, current_user: str = Depends(get_current_user)):
     all_units = get_unit_names()
-    history = await run_in_threadpool(database_service.get_user_quiz_history_summary, username=current_user)
+    history = await db_service.get_user_quiz_history_summary(username=current_user)
     unique_quizzes_taken = history.get('unique_unit_quizzes_attempted', 0)
     is_grand_quiz_locked = unique_quizzes_taken < len(all_units)
     return {"units": all_units, "is_grand_quiz_locked": is_grand_quiz_locked}
 
+HISTORY_PAGE_DEFAULT_LIMIT = 20
+HISTORY_PAGE_MAX_LIMIT = 100
+
+async def load_history(username: str, unit_name: Optional[str], limit: Optional[int], before: Optional[str], summary: bool):
+    """
+    Without `limit` and `before`, the whole history as a list (the original response).
+    Otherwise one page, newest first: {"items": [...], "next_cursor": <timestamp or null>};
+    pass next_cursor back as `before` to get the next page.
+    """
+    if limit is None and before is None:
+        return await db_service.get_quiz_history_page(username, unit_name, summary=summary)
+
+    limit = limit or HISTORY_PAGE_DEFAULT_LIMIT
+    # One extra result tells whether there is a next page
+    items = await db_service.get_quiz_history_page(username, unit_name, before=before, limit=limit + 1, summary=summary)
+    next_cursor = items[limit - 1]["timestamp"] if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor}
+
 @app.get("/api/v1/performance/history")
-async def get_performance_history(current_user: str = Depends(get_current_user)):
-    history = await run_in_threadpool(database_service.get_full_quiz_history, username=current_user)
-    return history
+async def get_performance_history(
+    current_user: str = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=HISTORY_PAGE_MAX_LIMIT),
+    before: Optional[str] = None,
+    summary: bool = False
+):
+    return await load_history(current_user, None, limit, before, summary)
 
 @app.get("/api/v1/performance/history/{unit_name}")
-async def get_performance_history_for_unit(unit_name: str, current_user: str = Depends(get_current_user)):
+async def get_performance_history_for_unit(
+    unit_name: str,
+    current_user: str = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=HISTORY_PAGE_MAX_LIMIT),
+    before: Optional[str] = None,
+    summary: bool = False
+):
     decoded_unit_name = unquote(unit_name)  # ✅ FIXED: Correctly decode URL
-    history = await run_in_threadpool(
-        database_service.get_full_quiz_history_for_unit,
-        username=current_user,
-        unit_name=decoded_unit_name
+    return await load_history(current_user, decoded_unit_name, limit, before, summary)
+
+@app.get("/api/v1/performance/attempt")
+async def get_performance_attempt(path: str, current_user: str = Depends(get_current_user)):
+    """One full quiz result (with performance_breakdown), e.g. for an item of a summary history page."""
+    attempt = await db_service.get_quiz_result(current_user, path)
+    if attempt is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz attempt not found.")
+    return attempt
+
+@app.get("/api/v1/export/quiz-results")
+async def export_quiz_results(
+    current_user: str = Depends(get_current_user),
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    student: Optional[str] = None,
+    all_students: bool = False,
+    batch_size: Optional[int] = Query(None, ge=1, le=10000)
+):
+    """
+    Streams quiz results as NDJSON (one document per line) or CSV (one row per question of
+    performance_breakdown), chosen by `format`. Exports the current user's results by default; other students'
+    (`student`) or everyone's (`all_students`) need the user to be in EXPORT_ALLOWED_USERS.
+    """
+    username = None if all_students else (student or current_user)
+    if username != current_user and current_user not in settings.EXPORT_ALLOWED_USERS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to export other students' results.")
+
+    batches = db_service.iter_quiz_result_batches(
+        username=username,
+        projection=quiz_export.CSV_PROJECTION if export_format == "csv" else None,
+        batch_size=batch_size or settings.EXPORT_BATCH_SIZE
+    )
+    safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in (username or "all"))
+    filename = f"quiz_results_{safe_name}.{export_format}"
+    return StreamingResponse(
+        quiz_export.export_body(batches, export_format),
+        media_type=quiz_export.EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
-    return history
 
 @app.post("/api/v1/performance/analyze")
 async def analyze_performance_endpoint(payload: PerformanceBreakdownPayload, current_user: str = Depends(get_current_user)):
@@ -296,134 +464,90 @@ async def analyze_performance_endpoint(payload: PerformanceBreakdownPayload, cur
     
     return analysis_result
 
-@app.get("/api/v1/quiz/unit/{unit_name}", response_model=Optional[List[Dict[str, Any]]])
-async def get_unit_quiz_api(unit_name: str):
+def build_quiz_response(quiz_session_id: str, quiz_questions: List[Dict[str, Any]], debug: bool):
+    """
+    Normally filtered through QuizResponse, which drops the answer, explanation and debug
+    fields. With debug=true (only if QUIZ_DEBUG_FIELDS_ENABLED is set) the full instances
+    are returned as generated.
+    """
+    if debug:
+        if not settings.QUIZ_DEBUG_FIELDS_ENABLED:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Quiz debug fields are disabled on this server.")
+        return JSONResponse(content=jsonable_encoder({"quiz_session_id": quiz_session_id, "questions": quiz_questions}))
+    return {"quiz_session_id": quiz_session_id, "questions": quiz_questions}
+
+@app.get("/api/v1/quiz/unit/{unit_name}", response_model=QuizResponse)
+async def get_unit_quiz_api(unit_name: str, debug: bool = False, current_user: str = Depends(get_current_user)):
     decoded_unit_name = unit_name.replace("%20", " ") 
     quiz_questions = await run_in_threadpool(unit_quiz_generator_instance.generate_quiz_for_unit, decoded_unit_name)
     if not quiz_questions:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Could not generate quiz.")
-    return quiz_questions
+    quiz_name = quiz_questions[0].get("unit_name") or decoded_unit_name
+    # The quiz is kept server-side; the submission only sends back the session id and the answers
+    quiz_session_id = await run_in_threadpool(quiz_session_store.create, current_user, "Unit-Quizzes", quiz_name, quiz_questions)
+    return build_quiz_response(quiz_session_id, quiz_questions, debug)
+
+@app.get("/api/v1/quiz/grand", response_model=QuizResponse)
+async def get_grand_quiz_api(debug: bool = False, current_user: str = Depends(get_current_user)):
+    quiz_questions = await run_in_threadpool(grand_quiz_generator_instance.generate_grand_quiz)
+    if not quiz_questions:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Could not generate quiz.")
+    quiz_session_id = await run_in_threadpool(quiz_session_store.create, current_user, "Grand-Quiz", "Grand Quiz", quiz_questions)
+    return build_quiz_response(quiz_session_id, quiz_questions, debug)
 
-@app.get("/api/v1/quiz/grand", response_model=Optional[List[Dict[str, Any]]])
-async def get_grand_quiz_api():
-    return await run_in_threadpool(grand_quiz_generator_instance.generate_grand_quiz)
+async def load_quiz_session(payload: QuizSubmissionPayload, current_user: str, quiz_type: str) -> Dict[str, Any]:
+    """
+    Fetches the stored quiz for a submission and removes it from the store, so each quiz
+    is scored once. The answers are checked against the stored quiz first; a malformed
+    submission leaves the session in place for a retry.
+    """
+    session = await run_in_threadpool(quiz_session_store.get, payload.quiz_session_id, current_user, quiz_type)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz session not found or expired.")
+    if len(payload.student_answers) != len(session["questions"]):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Expected {len(session['questions'])} answers, got {len(payload.student_answers)}.")
+    session = await run_in_threadpool(quiz_session_store.pop, payload.quiz_session_id, current_user, quiz_type)
+    if session is None:
+        # Submitted concurrently by another request
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz session not found or expired.")
+    return session
 
 # --- START OF EDITED FUNCTION ---
 @app.post("/api/v1/quiz/submit/unit")
-async def submit_unit_quiz_api(payload: Dict[str, Any], current_user: str = Depends(get_current_user)):
-    quiz_questions = payload.get("quiz_questions")
-    student_answers = payload.get("student_answers")
-    time_taken = payload.get("time_taken_seconds")
-
-    score_result = await run_in_threadpool(unit_quiz_generator_instance.score_unit_quiz, quiz_questions, student_answers)
-
-    quiz_name = quiz_questions[0].get("unit_name", "Unknown Unit") if quiz_questions and quiz_questions[0] else "Unknown Unit"
-
-    performance_breakdown = []
-    for i, q_data in enumerate(quiz_questions):
-        result_detail = score_result["detailed_results"][i]
-        performance_breakdown.append({
-            "template_id": q_data.get("id"),
-            "topic_name": q_data.get("topic_name"),
-            "subtopic_name": q_data.get("subtopic_name"),
-            "difficulty_level": q_data.get("difficulty_level"),
-            "difficulty_type": q_data.get("difficulty_type"),
-            "is_correct": result_detail.get("is_correct"),
-            "marks_obtained": result_detail.get("marks_obtained"),
-            "marks_possible": result_detail.get("marks_possible")
-        })
-
-    # ✅ Clean scoring_summary without template_ids
-    scoring_summary = {
-        "total_score": score_result.get("total_score"),
-        "max_score": score_result.get("max_score"),
-        "correct_answers_count": score_result.get("correct_answers_count"),
-        "total_questions": score_result.get("total_questions"),
-        "difficulty_breakdown": {},
-        "type_breakdown": {},
-        "topics_covered": [],
-        "subtopics_covered": []
-    }
-
-    topic_set = set()
-    subtopic_set = set()
-    for q in performance_breakdown:
-        lvl = q["difficulty_level"]
-        typ = q["difficulty_type"]
-        scoring_summary["difficulty_breakdown"][lvl] = scoring_summary["difficulty_breakdown"].get(lvl, 0) + 1
-        scoring_summary["type_breakdown"][typ] = scoring_summary["type_breakdown"].get(typ, 0) + 1
-        if q["topic_name"]: topic_set.add(q["topic_name"])
-        if q["subtopic_name"]: subtopic_set.add(q["subtopic_name"])
+async def submit_unit_quiz_api(payload: QuizSubmissionPayload, current_user: str = Depends(get_current_user)):
+    session = await load_quiz_session(payload, current_user, "Unit-Quizzes")
+    quiz_questions = session["questions"]
+    student_answers = payload.student_answers
+    time_taken = payload.time_taken_seconds
 
-    scoring_summary["topics_covered"] = list(topic_set)
-    scoring_summary["subtopics_covered"] = list(subtopic_set)
+    # One pass: the response, the stored breakdown and the scoring_summary (no template_ids)
+    scored = await run_in_threadpool(score_quiz, quiz_questions, student_answers)
 
     final_document_to_save = {
         "student_id": current_user,
         "subject": "Statistics",
         "quiz_type": "Unit-Quizzes",
-        "quiz_name": quiz_name,
+        "quiz_name": session["quiz_name"],
         "timestamp": datetime.now().isoformat(),
         "time_taken_seconds": time_taken,
-        "scoring_summary": scoring_summary,
-        "performance_breakdown": performance_breakdown
+        "scoring_summary": scored.scoring_summary,
+        "performance_breakdown": scored.performance_breakdown
     }
 
-    await run_in_threadpool(database_service.save_quiz_result, final_document_to_save)
-    return score_result
+    await quiz_result_writer.save(final_document_to_save)
+    learner_category_model.record_new_result()
+    return scored.result
 
 
 @app.post("/api/v1/quiz/submit/grand")
-async def submit_grand_quiz_api(payload: Dict[str, Any], current_user: str = Depends(get_current_user)):
-    quiz_questions = payload.get("quiz_questions")
-    student_answers = payload.get("student_answers")
-    time_taken = payload.get("time_taken_seconds")
-
-    score_result = await run_in_threadpool(grand_quiz_generator_instance.score_grand_quiz, quiz_questions, student_answers)
-
-    performance_breakdown = []
-    for i, q_data in enumerate(quiz_questions):
-        result_detail = score_result["detailed_results"][i]
-        performance_breakdown.append({
-            "template_id": q_data.get("id"),
-            "topic_name": q_data.get("topic_name"),
-            "subtopic_name": q_data.get("subtopic_name"),
-            "difficulty_level": q_data.get("difficulty_level"),
-            "difficulty_type": q_data.get("difficulty_type"),
-            "is_correct": result_detail.get("is_correct"),
-            "marks_obtained": result_detail.get("marks_obtained"),
-            "marks_possible": result_detail.get("marks_possible")
-        })
-
-    # Build scoring_summary (no template_ids)
-    total_score = score_result.get("total_score")
-    max_score = score_result.get("max_score")
-    correct_answers = score_result.get("correct_answers_count")
-    total_questions = score_result.get("total_questions")
-
-    difficulty_counts = {}
-    type_counts = {}
-    topics = set()
-    subtopics = set()
-
-    for q in performance_breakdown:
-        lvl = q["difficulty_level"]
-        typ = q["difficulty_type"]
-        difficulty_counts[lvl] = difficulty_counts.get(lvl, 0) + 1
-        type_counts[typ] = type_counts.get(typ, 0) + 1
-        if q["topic_name"]: topics.add(q["topic_name"])
-        if q["subtopic_name"]: subtopics.add(q["subtopic_name"])
-
-    scoring_summary = {
-        "total_score": total_score,
-        "max_score": max_score,
-        "correct_answers_count": correct_answers,
-        "total_questions": total_questions,
-        "difficulty_breakdown": difficulty_counts,
-        "type_breakdown": type_counts,
-        "topics_covered": list(topics),
-        "subtopics_covered": list(subtopics)
-    }
+async def submit_grand_quiz_api(payload: QuizSubmissionPayload, current_user: str = Depends(get_current_user)):
+    session = await load_quiz_session(payload, current_user, "Grand-Quiz")
+    quiz_questions = session["questions"]
+    student_answers = payload.student_answers
+    time_taken = payload.time_taken_seconds
+
+    scored = await run_in_threadpool(score_quiz, quiz_questions, student_answers)
 
     final_document_to_save = {
         "student_id": current_user,
@@ -432,13 +556,13 @@ async def submit_grand_quiz_api(payload: Dict[str, Any], current_user: str = Dep
         "quiz_name": "Grand Quiz",  # ✅ This is used in the path
         "timestamp": datetime.now().isoformat(),
         "time_taken_seconds": time_taken,
-        "scoring_summary": scoring_summary,
-        "performance_breakdown": performance_breakdown
+        "scoring_summary": scored.scoring_summary,
+        "performance_breakdown": scored.performance_breakdown
     }
 
-    await run_in_threadpool(database_service.save_quiz_result, final_document_to_save)
-    return score_result
-
+    await quiz_result_writer.save(final_document_to_save)
+    learner_category_model.record_new_result()
+    return scored.result
 
 # --- END OF EDITED FUNCTION ---
 
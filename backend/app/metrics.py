@@ -0,0 +1,197 @@
+# backend/app/metrics.py
+# Prometheus metrics, exposed by GET /metrics in the text exposition format:
+#
+#   educonnect_http_request_duration_seconds{method, route, status}
+#       every HTTP request, by route template (/api/v1/quiz/unit/{unit_name}), until the
+#       last byte of the response is sent (so streamed exports are timed in full)
+#   educonnect_stage_duration_seconds{stage}
+#       template_selection   TemplateIndex.select_for_quota
+#       question_generation  QuestionEngine.generate_single_question_instance
+#       quiz_scoring         quiz_scoring.score_quiz
+#       kmeans_fit           dashboard_engine.fit_learner_category_centers
+#   educonnect_db_operation_duration_seconds{backend, method}
+#       every public method of DatabaseService ("mongo"), AsyncDatabaseService ("motor")
+#       and SQLiteDatabaseService ("sqlite"); streaming iter_* methods are not timed
+#   educonnect_threadpool_queue_wait_seconds
+#       time between handing a call to the Starlette threadpool (run_in_threadpool
+#       below) and a worker thread starting it; grows when all threads are busy
+#   educonnect_<component>_<stat>
+#       the numbers of a component's get_stats() dict, read when /metrics is scraped
+#       (register_stats below): counters for the monotonic ones, gauges for the rest
+#
+# With several API worker processes, set PROMETHEUS_MULTIPROC_DIR to a directory shared
+# by the workers (emptied before each deploy): every worker then writes its values there
+# and /metrics, whichever worker serves it, reports the sum over all of them. Without it,
+# each process reports its own metrics. Component statistics are per process in any case:
+# in multiprocess mode they carry a pid label and come from the worker serving the scrape.
+import functools
+import inspect
+import os
+import time
+
+from starlette.concurrency import run_in_threadpool as starlette_run_in_threadpool
+
+from .config import settings
+
+# prometheus_client picks its value storage when it is imported, so the directory must exist by then
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(settings.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Requests take milliseconds to seconds; stages and queries down to tens of microseconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_SECONDS = Histogram("educonnect_http_request_duration_seconds", "HTTP request latency by route",
+                                 ["method", "route", "status"], buckets=REQUEST_BUCKETS)
+STAGE_SECONDS = Histogram("educonnect_stage_duration_seconds", "Latency of the quiz and analytics stages",
+                          ["stage"], buckets=STAGE_BUCKETS)
+DB_OPERATION_SECONDS = Histogram("educonnect_db_operation_duration_seconds", "Latency of storage service methods",
+                                 ["backend", "method"], buckets=STAGE_BUCKETS)
+THREADPOOL_QUEUE_WAIT_SECONDS = Histogram("educonnect_threadpool_queue_wait_seconds",
+                                          "Wait for a free threadpool thread", buckets=STAGE_BUCKETS)
+
+
+def timed_stage(stage: str):
+    """Decorator recording each call of the function in educonnect_stage_duration_seconds{stage}."""
+    histogram = STAGE_SECONDS.labels(stage)
+
+    def decorate(function):
+        # A plain wrapper: Histogram.time() as a decorator costs several times more per call
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed
+    return decorate
+
+
+def _timed_storage_method(backend: str, name: str, method):
+    # Labelled on first call, so the backends that are not in use export no series
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                DB_OPERATION_SECONDS.labels(backend, name).observe(time.perf_counter() - start)
+    else:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                DB_OPERATION_SECONDS.labels(backend, name).observe(time.perf_counter() - start)
+    return timed
+
+
+def instrument_storage_methods(backend: str):
+    """Class decorator timing every public method in educonnect_db_operation_duration_seconds{backend, method}."""
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(method) \
+                    or inspect.isgeneratorfunction(method) or inspect.isasyncgenfunction(method):
+                continue
+            setattr(cls, name, _timed_storage_method(backend, name, method))
+        return cls
+    return decorate
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """starlette.concurrency.run_in_threadpool, recording how long the call waited for a thread."""
+    queued_at = time.perf_counter()
+
+    def run():
+        THREADPOOL_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+        return func(*args, **kwargs)
+
+    return await starlette_run_in_threadpool(run)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording educonnect_http_request_duration_seconds for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], getattr(route, "path", "unmatched"), str(status_code)).observe(
+                time.perf_counter() - start)
+
+
+def _numeric_stats(stats: dict, prefix: str = ""):
+    # Nested dicts are flattened into name_subname; strings, lists and None are not exported
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _numeric_stats(value, f"{name}_")
+        elif isinstance(value, (bool, int, float)):
+            yield name, float(value)
+
+
+class StatsCollector:
+    """Collector exporting the numeric values of `get_stats()` as educonnect_<component>_<stat>."""
+
+    def __init__(self, component: str, get_stats, counters=()):
+        self.component = component
+        self.get_stats = get_stats
+        self.counters = set(counters)
+
+    def describe(self):
+        return [] # Keeps the registry from calling get_stats at registration
+
+    def collect(self):
+        labels = {"pid": str(os.getpid())} if "PROMETHEUS_MULTIPROC_DIR" in os.environ else {}
+        for name, value in _numeric_stats(self.get_stats()):
+            family = CounterMetricFamily if name in self.counters else GaugeMetricFamily
+            metric = family(f"educonnect_{self.component}_{name}", f"{self.component} {name}", labels=list(labels))
+            metric.add_metric(list(labels.values()), value)
+            yield metric
+
+
+_stats_collectors = []
+
+def register_stats(component: str, get_stats, counters=()) -> None:
+    """Exports a component's get_stats() on /metrics; `counters` names the monotonic stats."""
+    collector = StatsCollector(component, get_stats, counters)
+    _stats_collectors.append(collector)
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        REGISTRY.register(collector)
+
+
+def render_metrics() -> bytes:
+    """The text exposition of every metric: summed over all workers in multiprocess mode."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _stats_collectors:
+            registry.register(collector)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -1,6 +1,27 @@
 # In backend/app/models.py
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class PerformanceBreakdownPayload(BaseModel):
-    performance_breakdown: List[Dict[str, Any]]
\ No newline at end of file
+    performance_breakdown: List[Dict[str, Any]]
+
+class QuizSubmissionPayload(BaseModel):
+    quiz_session_id: str
+    student_answers: List[Optional[int]]
+    time_taken_seconds: Optional[float] = None
+
+class QuizQuestionOut(BaseModel):
+    """One question as delivered to the student: no answer, explanation or debug fields."""
+    id: str
+    unit_name: Optional[str] = None
+    topic_name: Optional[str] = None
+    subtopic_name: Optional[str] = None
+    difficulty_level: Optional[str] = None
+    difficulty_type: Optional[str] = None
+    question_text: str
+    options: List[str]
+    marks: int = 1
+
+class QuizResponse(BaseModel):
+    quiz_session_id: str
+    questions: List[QuizQuestionOut]
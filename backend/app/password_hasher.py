@@ -0,0 +1,154 @@
+# backend/app/password_hasher.py
+# bcrypt hashing / verification on a dedicated, bounded executor. bcrypt is deliberately
+# slow (~0.25 s per call), so running it in Starlette's shared threadpool lets a burst of
+# logins (everyone signing in at the start of an exam) take every thread and stall the
+# quiz and dashboard requests queued behind them. Here it gets its own workers:
+#
+#   PASSWORD_HASHER_BACKEND=thread   a small thread pool (the bcrypt C code releases the GIL)
+#   PASSWORD_HASHER_BACKEND=process  a process pool, for full isolation from the API process
+#   PASSWORD_HASHER_BACKEND=shared   the previous behaviour (Starlette threadpool), for comparison
+#
+# At most PASSWORD_HASHER_MAX_PENDING calls may be queued or running; beyond that the call
+# fails fast with PasswordHasherBusy (the endpoints answer 503) instead of queueing forever.
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from passlib.context import CryptContext
+
+from .config import settings
+from .metrics import run_in_threadpool
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+PASSWORD_HASHER_BACKENDS = ("thread", "process", "shared")
+
+
+# Module-level so the process pool can pickle them
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return pwd_context.verify(password, password_hash)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when PASSWORD_HASHER_MAX_PENDING calls are already queued or running."""
+
+
+class PasswordHasher:
+    def __init__(self, backend: str = "thread", max_workers: int = 2, max_pending: int = 256, latency_window: int = 1000):
+        if backend not in PASSWORD_HASHER_BACKENDS:
+            print(f"Warning: Unknown PASSWORD_HASHER_BACKEND '{backend}'. Using 'thread'.")
+            backend = "thread"
+        self.backend = backend
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = None  # created on first use, so importing this module never starts processes
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latencies = deque(maxlen=latency_window)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.backend == "process":
+                    # spawn, not fork: the API process has running threads and an event loop
+                    self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="password-hasher")
+            return self._executor
+
+    def _enter(self) -> float:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordHasherBusy(f"{self._pending} password hashing calls already pending")
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+        return time.perf_counter()
+
+    def _leave(self, started: float) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+            self._latencies.append(time.perf_counter() - started)
+
+    def _submit(self, function, *args) -> Future:
+        started = self._enter()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._leave(started)
+            raise
+        future.add_done_callback(lambda _: self._leave(started))
+        return future
+
+    async def _run(self, function, *args):
+        if self.backend == "shared":
+            started = self._enter()
+            try:
+                return await run_in_threadpool(function, *args)
+            finally:
+                self._leave(started)
+        return await asyncio.wrap_future(self._submit(function, *args))
+
+    def _run_sync(self, function, *args):
+        if self.backend == "shared":
+            started = self._enter()
+            try:
+                return function(*args)
+            finally:
+                self._leave(started)
+        return self._submit(function, *args).result()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(verify_password, password, password_hash)
+
+    def hash_sync(self, password: str) -> str:
+        """For synchronous callers (DatabaseService); blocks the calling thread until the hash is ready."""
+        return self._run_sync(hash_password, password)
+
+    def verify_sync(self, password: str, password_hash: str) -> bool:
+        return self._run_sync(verify_password, password, password_hash)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "backend": self.backend,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "peak_pending": self._peak_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+        def percentile(p: float) -> Optional[float]:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+        # Latency includes the time spent waiting for a worker
+        stats["latency_ms"] = {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99), "max": percentile(1.0)}
+        return stats
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    backend=settings.PASSWORD_HASHER_BACKEND,
+    max_workers=settings.PASSWORD_HASHER_WORKERS,
+    max_pending=settings.PASSWORD_HASHER_MAX_PENDING,
+)
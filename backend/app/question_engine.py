@@ -4,10 +4,15 @@ import random
 import math
 import re 
 import os
-from scipy import stats
-from typing import List, Dict, Any, Callable, Tuple, Union
+import threading
+from typing import List, Dict, Any, Callable, Tuple, Union, Optional
 from collections import Counter # For mode calculation
-from scipy.stats import norm, binom, poisson, t # For p-values, critical values, etc.
+import numpy as np
+from .stats_kernels import norm_cdf, norm_sf, norm_ppf, binom_pmf, binom_cdf, poisson_pmf, poisson_cdf # For p-values, critical values, etc.
+
+from .metrics import timed_stage
+from .question_pool import QuestionInstancePool
+from .template_index import TemplateIndex
 
 # --- Utility for Pluralization ---
 _plural_forms = { # Add more as needed for your item_plural choices
@@ -49,6 +54,16 @@ def get_plural(singular_noun: str) -> str:
         return singular_noun + 'es'
     return singular_noun + 's'
 
+# --- Random draws ---
+# The variable generators and answer logic draw through _random(). generate_instances(seed=...)
+# points it at a private random.Random for the duration of the batch, on the calling thread
+# only, so a seeded batch never reseeds the process-wide `random` that the request handlers
+# and the pool refill thread draw from.
+_thread_random = threading.local()
+
+def _random():
+    return getattr(_thread_random, "rng", random)
+
 # --- Helper for Z-values ---
 Z_TABLE_COMMON = {
     90: 1.645,
@@ -61,10 +76,10 @@ Z_TABLE_COMMON = {
 # (already generated vars for the current question instance)
 
 def _vg_random_choice(details: Dict, current_vars: Dict) -> Any:
-    return random.choice(details["choices"])
+    return _random().choice(details["choices"])
 
 def _vg_random_int_range(details: Dict, current_vars: Dict) -> int:
-    return random.randint(details["min"], details["max"])
+    return _random().randint(details["min"], details["max"])
 
 def _vg_lookup_from_options(details: Dict, current_vars: Dict) -> str:
     idx_var_name = details["source_var"] 
@@ -122,7 +137,7 @@ def _vg_square_value(details: Dict, current_vars: Dict) -> Union[int, float]:
     return base_val * base_val
 
 def _vg_random_float_range(details: Dict, current_vars: Dict) -> float:
-    val = random.uniform(details["min"], details["max"])
+    val = _random().uniform(details["min"], details["max"])
     return round(val, details.get("decimals", 2))
 
 def _vg_sum_vars(details: Dict, current_vars: Dict) -> Union[int, float]:
@@ -139,7 +154,7 @@ def _vg_calculate_mean_with_missing(details: Dict, current_vars: Dict) -> float:
 
 def _vg_generate_int_array(details: Dict, current_vars: Dict) -> List[int]:
     size = current_vars.get(details.get("size_var")) if details.get("size_var") else details["size"]
-    return [random.randint(details["min_val"], details["max_val"]) for _ in range(size)]
+    return [_random().randint(details["min_val"], details["max_val"]) for _ in range(size)]
 
 def _vg_array_to_string(details: Dict, current_vars: Dict) -> str:
     arr = current_vars[details["source_var"]]
@@ -154,9 +169,9 @@ def _vg_generate_p_value_relative_to_alpha(details: Dict, current_vars: Dict) ->
     alpha = current_vars[details["alpha_var"]]
     scenario = current_vars[details["scenario_var"]]
     if scenario == "less_than_alpha":
-        return round(random.uniform(0.0001, alpha * 0.9), 4)
+        return round(_random().uniform(0.0001, alpha * 0.9), 4)
     else: # greater_than_alpha
-        return round(random.uniform(alpha * 1.1, alpha + 0.2), 4)
+        return round(_random().uniform(alpha * 1.1, alpha + 0.2), 4)
 
 def _vg_calculate_x_from_z(details: Dict, current_vars: Dict) -> Union[int, float]:
     mean = current_vars[details["mean_var"]]
@@ -173,36 +188,36 @@ def _vg_random_int_range_dependent_max(details: Dict, current_vars: Dict) -> int
     max_val = current_vars[details["max_var"]]
     min_val = details.get("min", 0)
     if min_val > max_val : min_val = max_val # ensure min <= max
-    return random.randint(min_val, max_val)
+    return _random().randint(min_val, max_val)
 
 def _vg_generate_perfect_square(details: Dict, current_vars: Dict) -> int: # Added
-    base = random.randint(details["min_base"], details["max_base"])
+    base = _random().randint(details["min_base"], details["max_base"])
     return base * base
 
 def _vg_generate_int_array_with_mode(details: Dict, current_vars: Dict) -> List[int]:
     size = details["size"]
-    mode_val = current_vars.get(details.get("mode_val_var"), random.randint(details["min_val"],details["max_val"]))
-    mode_freq = current_vars.get(details.get("mode_freq_var"), random.randint(details.get("mode_freq_min",2), size // 2 if size > 2 else 2))
+    mode_val = current_vars.get(details.get("mode_val_var"), _random().randint(details["min_val"],details["max_val"]))
+    mode_freq = current_vars.get(details.get("mode_freq_var"), _random().randint(details.get("mode_freq_min",2), size // 2 if size > 2 else 2))
     mode_freq = min(mode_freq, size -1 if size > 1 else 1) # Ensure mode_freq < size
 
     arr = [mode_val] * mode_freq
     remaining_size = size - mode_freq
     for _ in range(remaining_size):
-        val = random.randint(details["min_val"], details["max_val"])
+        val = _random().randint(details["min_val"], details["max_val"])
         # Avoid making another value equally or more frequent than the intended mode
         # This is a simplification; true guarantee is harder.
         temp_counts = Counter(arr + [val])
         while temp_counts[val] > mode_freq or (val != mode_val and temp_counts[val] == mode_freq and len(set(arr + [val])) == len(set(arr))): # Avoid creating multiple modes unintentionally
-             val = random.randint(details["min_val"], details["max_val"])
+             val = _random().randint(details["min_val"], details["max_val"])
              temp_counts = Counter(arr + [val])
         arr.append(val)
-    random.shuffle(arr)
+    _random().shuffle(arr)
     return arr[:size]
 
 
 def _vg_shuffle_array(details: Dict, current_vars: Dict) -> List[any]:
     arr = list(current_vars[details["source_var"]])
-    random.shuffle(arr)
+    _random().shuffle(arr)
     return arr
 
 def _vg_singular_form(details: Dict, current_vars: Dict) -> str: # Simple version
@@ -218,7 +233,7 @@ def _vg_calculate_n_from_N_ratio_int(details: Dict, current_vars: Dict) -> int:
 
 def _vg_random_int_range_step(details: Dict, current_vars: Dict) -> int:
     step = details.get("step", 1)
-    return random.randrange(details["min"], details["max"] + step, step)
+    return _random().randrange(details["min"], details["max"] + step, step)
 
 
 def _vg_multiply_vars_float(details: Dict, current_vars: Dict) -> float:
@@ -257,7 +272,7 @@ def _vg_random_int_range_dependent_max_strict(details: Dict, current_vars: Dict)
         #Default to min_val or raise an error, or swap
         return min_val 
     if min_val == max_val: return min_val
-    return random.randint(min_val, max_val)
+    return _random().randint(min_val, max_val)
 
 def _vg_random_int_near_lambda(details: Dict, current_vars: Dict) -> int:
     lambda_val = float(current_vars[details["lambda_var"]])
@@ -265,7 +280,7 @@ def _vg_random_int_near_lambda(details: Dict, current_vars: Dict) -> int:
     min_k = max(0, int(round(lambda_val - range_around)))
     max_k = int(round(lambda_val + range_around))
     if min_k > max_k : min_k = max_k  # Prevent errors in random.randint
-    return random.randint(min_k, max_k)
+    return _random().randint(min_k, max_k)
 
 
 def _vg_plural_form(details: Dict, current_vars: Dict) -> str:
@@ -274,7 +289,7 @@ def _vg_plural_form(details: Dict, current_vars: Dict) -> str:
 
 def _vg_random_float_range_plus(details: Dict, current_vars: Dict) -> float:
     base = float(current_vars[details["base_var"]])
-    add_val = random.uniform(details["min_add"], details["max_add"])
+    add_val = _random().uniform(details["min_add"], details["max_add"])
     return round(base + add_val, details.get("decimals", 2))
 
 def _vg_conditional_text(details: Dict, current_vars: Dict) -> str:
@@ -311,11 +326,11 @@ def _vg_generate_p2_for_diff_prop_scenario(details: Dict, current_vars: Dict) ->
     p1_base_percent = int(current_vars[details["p1_var"]])
     scenario = current_vars[details["scenario_var"]]
     if scenario == "increase":
-        return random.randint(min(99, p1_base_percent + 3), min(100,p1_base_percent + 10))
+        return _random().randint(min(99, p1_base_percent + 3), min(100,p1_base_percent + 10))
     elif scenario == "decrease":
-        return random.randint(max(1, p1_base_percent - 10), max(0, p1_base_percent - 3))
+        return _random().randint(max(1, p1_base_percent - 10), max(0, p1_base_percent - 3))
     else: # no_change
-        return random.randint(max(1, p1_base_percent - 2), min(99,p1_base_percent + 2))
+        return _random().randint(max(1, p1_base_percent - 2), min(99,p1_base_percent + 2))
 
 def _vg_generate_ci_diff_prop_lower(details: Dict, current_vars: Dict) -> str:
     p1 = current_vars[details["p1_perc_var"]] / 100.0
@@ -354,9 +369,9 @@ def _vg_generate_mu_null_for_ci_test(details: Dict, current_vars: Dict) -> float
     upper = float(current_vars[details["upper_var"]])
     center = float(current_vars[details["center_var"]])
     if scenario == "inside_ci":
-        return round(random.uniform(lower + 0.1*(upper-lower), upper - 0.1*(upper-lower)), 2)
+        return round(_random().uniform(lower + 0.1*(upper-lower), upper - 0.1*(upper-lower)), 2)
     else: # outside_ci
-        return round(center + random.choice([-1,1]) * (upper-lower), 2) # Outside by about the width of CI
+        return round(center + _random().choice([-1,1]) * (upper-lower), 2) # Outside by about the width of CI
 
 def _vg_conditional_prop_scenario(details: Dict, current_vars: Dict) -> float:
     scenario = current_vars[details["scenario_var"]] # e.g. "A_higher"
@@ -390,7 +405,7 @@ def _vg_calculate_x_bar_for_test_stat(details: Dict, current_vars: Dict) -> floa
              target_t_or_z = _vg_multiply_vars_float(target_t_or_z_details.get("params", target_t_or_z_details), current_vars)
         else:
             print(f"Warning: Nested generator type '{gen_type}' for target_t_or_z not fully supported in this simplified _vg_calculate_x_bar_for_test_stat.")
-            target_t_or_z = float(target_t_or_z_details.get("value", random.uniform(-2.5, 2.5)))
+            target_t_or_z = float(target_t_or_z_details.get("value", _random().uniform(-2.5, 2.5)))
     else:
         target_t_or_z = float(target_t_or_z_details)
 
@@ -407,14 +422,14 @@ def _vg_calculate_cov_from_vars_corr(details, current_vars):
 def _vg_generate_p_value_for_scenario(details, current_vars):
     scenario = current_vars[details["scenario_var"]]
     if scenario == "significant":
-        return round(random.uniform(0.001, 0.04), 3)
-    return round(random.uniform(0.06, 0.2), 3)
+        return round(_random().uniform(0.001, 0.04), 3)
+    return round(_random().uniform(0.06, 0.2), 3)
 
 def _vg_generate_sorted_int_array(details, current_vars):
     size = details["size"]
     min_val = details["min_val"]
     max_val = details["max_val"]
-    arr = [random.randint(min_val, max_val) for _ in range(size)]
+    arr = [_random().randint(min_val, max_val) for _ in range(size)]
     arr.sort()
     return arr
 
@@ -436,32 +451,32 @@ def _vg_multiply_vars(details, current_vars):
 def _vg_random_int_range_dependent(details, current_vars):
     min_val = details.get("min", 0)
     max_val = current_vars[details["max_var"]]
-    return random.randint(min_val, max_val)
+    return _random().randint(min_val, max_val)
 
 def _vg_generate_ci_diff_lower(details, current_vars):
     scenario = current_vars[details["scenario_var"]]
     if scenario == "mu1_greater":
-        return round(random.uniform(0.1, 2.0), 2)
+        return round(_random().uniform(0.1, 2.0), 2)
     elif scenario == "mu2_greater":
-        return round(random.uniform(-5.0, -1.0), 2)
+        return round(_random().uniform(-5.0, -1.0), 2)
     else:
-        return round(random.uniform(-2.0, -0.1), 2)
+        return round(_random().uniform(-2.0, -0.1), 2)
 
 def _vg_generate_ci_diff_upper(details, current_vars):
     scenario = current_vars[details["scenario_var"]]
     lower = float(current_vars[details["lower_bound_var"]])
     if scenario == "mu1_greater":
-        return round(lower + random.uniform(1.0, 4.0), 2)
+        return round(lower + _random().uniform(1.0, 4.0), 2)
     elif scenario == "mu2_greater":
-        return round(lower + random.uniform(1.0, 4.0), 2)
+        return round(lower + _random().uniform(1.0, 4.0), 2)
     else:
-        return round(random.uniform(0.1, 2.0), 2)
+        return round(_random().uniform(0.1, 2.0), 2)
 
 def _vg_generate_dataset_for_percentile(details: Dict, current_vars: Dict) -> List[int]:
     size = details.get("size", 10)
     min_val = details.get("min", 1)
     max_val = details.get("max", 100)
-    return sorted(random.choices(range(min_val, max_val + 1), k=size))
+    return sorted(_random().choices(range(min_val, max_val + 1), k=size))
 
 def _vg_generate_array_with_mode_val(details: Dict, current_vars: Dict) -> List[Union[int, float]]:
     size = int(details.get("size", 10))
@@ -472,7 +487,7 @@ def _vg_generate_array_with_mode_val(details: Dict, current_vars: Dict) -> List[
     if "mode_val_var" in details and details["mode_val_var"] in current_vars:
         mode_val = current_vars[details["mode_val_var"]]
     else:
-        mode_val = random.randint(min_val, max_val)
+        mode_val = _random().randint(min_val, max_val)
     
     # Get mode_freq: either from current_vars or generate/use default
     if "mode_freq_var" in details and details["mode_freq_var"] in current_vars:
@@ -485,7 +500,7 @@ def _vg_generate_array_with_mode_val(details: Dict, current_vars: Dict) -> List[
         max_freq_possible = min(max_freq_possible, size -1 if size > 1 else 1) # Cannot be full size unless size is 1
         if min_freq > max_freq_possible : min_freq = max_freq_possible # Adjust if min_freq is too high for current size
 
-        mode_freq = random.randint(min_freq, max_freq_possible) if min_freq <= max_freq_possible else min_freq
+        mode_freq = _random().randint(min_freq, max_freq_possible) if min_freq <= max_freq_possible else min_freq
 
 
     arr = [mode_val] * mode_freq
@@ -504,7 +519,7 @@ def _vg_generate_array_with_mode_val(details: Dict, current_vars: Dict) -> List[
         # and try to avoid creating a new mode or matching mode_freq
         attempts = 0
         while attempts < 50: # Safety break
-            val = random.randint(min_val, max_val)
+            val = _random().randint(min_val, max_val)
             temp_arr_check = arr + [val]
             counts = Counter(temp_arr_check)
             
@@ -524,10 +539,10 @@ def _vg_generate_array_with_mode_val(details: Dict, current_vars: Dict) -> List[
             attempts += 1
         if attempts == 50: # Could not find a suitable non-mode value easily
             # Fallback: just add a random value (might create multi-modal, less ideal)
-            arr.append(random.randint(min_val, max_val) if val == mode_val else val)
+            arr.append(_random().randint(min_val, max_val) if val == mode_val else val)
 
 
-    random.shuffle(arr)
+    _random().shuffle(arr)
     return arr[:size]
 
 
@@ -563,7 +578,7 @@ def _vg_alpha_bp_test(details: Dict, current_vars: Dict) -> float:
     return float(alpha_percent) / 100.0
 
 def _vg_alpha_pref(details: Dict, current_vars: Dict) -> int:
-    return random.choice([1, 5, 10])
+    return _random().choice([1, 5, 10])
 
 def _vg_dataset_arr_mode_unshuffled(details: Dict, current_vars: Dict) -> int:
     arr = current_vars[details["source_var"]]
@@ -588,13 +603,13 @@ def _vg_dataset_arr_range(details: Dict, current_vars: Dict) -> int:
     return max(arr) - min(arr)
 
 def _vg_claim_description(details: Dict, current_vars: Dict) -> str:
-    return random.choice([
+    return _random().choice([
         "The new method is faster", "The new treatment is more effective",
         "The new curriculum improves scores", "The device is more energy efficient"
     ])
 
 def _vg_claim_type_idx(details: Dict, current_vars: Dict) -> int:
-    return random.randint(0, details.get("num_types", 3))
+    return _random().randint(0, details.get("num_types", 3))
 
 
 def _vg_ci_half_width(details: Dict, current_vars: Dict) -> float:
@@ -613,43 +628,43 @@ def _vg_category_frequency(details: Dict, current_vars: Dict) -> int:
     return arr.count(target)
 
 def _vg_company_a(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["Alpha Inc.", "Beta Corp.", "Gamma LLC", "Delta Ltd."])
+    return _random().choice(["Alpha Inc.", "Beta Corp.", "Gamma LLC", "Delta Ltd."])
 
 def _vg_company_b(details: Dict, current_vars: Dict) -> str:
     options = ["Omega Inc.", "Zeta Corp.", "Theta LLC", "Lambda Ltd."]
     a = current_vars.get("company_a", "")
-    return random.choice([c for c in options if c != a]) if a else random.choice(options)
+    return _random().choice([c for c in options if c != a]) if a else _random().choice(options)
 
 def _vg_competition_type(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["tournament", "open contest", "ranked challenge", "team event"])
+    return _random().choice(["tournament", "open contest", "ranked challenge", "team event"])
 
 def _vg_conf_level_ci_find_mean(details: Dict, current_vars: Dict) -> int:
-    return random.choice([90, 95, 99])
+    return _random().choice([90, 95, 99])
 
 def _vg_conf_level_prop_ci(details: Dict, current_vars: Dict) -> int:
-    return random.choice([90, 95, 99])
+    return _random().choice([90, 95, 99])
 
 def _vg_confidence_level_percent(details: Dict, current_vars: Dict) -> int:
-    return random.choice([80, 85, 90, 95, 99])
+    return _random().choice([80, 85, 90, 95, 99])
 
 def _vg_corr_AB_temp(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(-1.0, 1.0), 2)
+    return round(_random().uniform(-1.0, 1.0), 2)
 
 
 def _vg_corr_coeff(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(-1.0, 1.0), 2)
+    return round(_random().uniform(-1.0, 1.0), 2)
 
 def _vg_corr_coeff_target(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(-0.9, 0.9), 2)
+    return round(_random().uniform(-0.9, 0.9), 2)
 
 def _vg_cov_AB(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(-50, 50), 2)
+    return round(_random().uniform(-50, 50), 2)
 
 def _vg_cov_xy(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(-100, 100), 2)
+    return round(_random().uniform(-100, 100), 2)
 
 def _vg_covariance_value(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1, 30), 2)
+    return round(_random().uniform(1, 30), 2)
 
 def _vg_critical_mean_val(details: Dict, current_vars: Dict) -> float:
     mean = float(current_vars[details["mean_var"]])
@@ -669,12 +684,12 @@ def _vg_random_int_range_between(details: Dict, current_vars: Dict) -> int:
     if min_val > max_val:
         min_val, max_val = max_val, min_val
 
-    return random.randint(min_val, max_val)
+    return _random().randint(min_val, max_val)
 
 
 def _vg_dataset_arr(details: Dict, current_vars: Dict) -> List[int]:
     size = details.get("size", 10)
-    return [random.randint(10, 100) for _ in range(size)]
+    return [_random().randint(10, 100) for _ in range(size)]
 
 def _vg_dataset_arr_mean(details: Dict, current_vars: Dict) -> float:
     arr = current_vars[details["arr_var"]]
@@ -690,14 +705,14 @@ def _vg_dataset_base(details: Dict, current_vars: Dict) -> List[int]:
 def _vg_dataset_known_values_arr(details: Dict, current_vars: Dict) -> List[int]:
     values = details["values"]
     count = details.get("count", len(values))
-    return random.sample(values * ((count // len(values)) + 1), count)
+    return _random().sample(values * ((count // len(values)) + 1), count)
 
 def _vg_dataset_known_values_str(details: Dict, current_vars: Dict) -> str:
     arr = current_vars[details["arr_var"]]
     return ", ".join(str(x) for x in arr)
 
 def _vg_dataset_size(details: Dict, current_vars: Dict) -> int:
-    return random.randint(details.get("min", 5), details.get("max", 50))
+    return _random().randint(details.get("min", 5), details.get("max", 50))
 
 def _vg_dataset_size_mean(details: Dict, current_vars: Dict) -> float:
     size = current_vars[details["size_var"]]
@@ -717,7 +732,7 @@ def _vg_dataset_size_range(details: Dict, current_vars: Dict) -> Tuple[int, int]
 def _vg_dataset_str(details: Dict, current_vars: Dict) -> List[str]:
     size = details.get("size", 10)
     pool = details.get("pool", ["A", "B", "C", "D", "E"])
-    return [random.choice(pool) for _ in range(size)]
+    return [_random().choice(pool) for _ in range(size)]
 
 def _vg_dataset_str_mean(details: Dict, current_vars: Dict) -> float:
     arr = current_vars[details["arr_var"]]
@@ -744,38 +759,38 @@ def _vg_dataset_str_range(details: Dict, current_vars: Dict) -> float:
     return max(arr) - min(arr) if arr else 0.0
 
 def _vg_defect_rate_decimal(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.01, 0.10), 4)
+    return round(_random().uniform(0.01, 0.10), 4)
 
 def _vg_defect_rate_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["decimal_var"]] * 100, 2)
 
 def _vg_diff_scenario(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["A", "B"])
+    return _random().choice(["A", "B"])
 
 def _vg_effect_direction(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["increase", "decrease"])
+    return _random().choice(["increase", "decrease"])
 
 def _vg_effect_size_bp(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.2, 0.8), 2)
+    return round(_random().uniform(0.2, 0.8), 2)
 
 def _vg_effect_size_brew(details: Dict, current_vars: Dict) -> float:
     return round(abs(current_vars[details["mean1"]] - current_vars[details["mean2"]]), 2)
 
 def _vg_event_correlated(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["sunshine", "rainfall", "temperature"])
+    return _random().choice(["sunshine", "rainfall", "temperature"])
 
 def _vg_event_correlated_plural(details: Dict, current_vars: Dict) -> str:
     singular = current_vars[details["singular_var"]]
     return get_plural(singular)
 
 def _vg_event_type_poisson(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["call", "accident", "hit", "breakdown"])
+    return _random().choice(["call", "accident", "hit", "breakdown"])
 
 def _vg_event_type_poisson_plural(details: Dict, current_vars: Dict) -> str:
     return get_plural(current_vars[details["singular_var"]])
 
 def _vg_example_scores_arr(details: Dict, current_vars: Dict) -> List[int]:
-    return [random.randint(60, 100) for _ in range(details.get("size", 10))]
+    return [_random().randint(60, 100) for _ in range(details.get("size", 10))]
 
 def _vg_example_scores_str(details: Dict, current_vars: Dict) -> str:
     return ", ".join(str(score) for score in current_vars[details["source_var"]])
@@ -784,23 +799,23 @@ def _vg_ey_val(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["mu"]] + current_vars[details["cov"]], 2)
 
 def _vg_group1_desc(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["Group A", "Control Group", "Treatment A"])
+    return _random().choice(["Group A", "Control Group", "Treatment A"])
 
 def _vg_group2_desc(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["Group B", "Placebo", "Treatment B"])
+    return _random().choice(["Group B", "Placebo", "Treatment B"])
 
 def _vg_income_range_high(details: Dict, current_vars: Dict) -> int:
-    return current_vars[details["low"]] + random.randint(10000, 50000)
+    return current_vars[details["low"]] + _random().randint(10000, 50000)
 
 def _vg_income_range_low(details: Dict, current_vars: Dict) -> int:
-    return random.randint(10000, 30000)
+    return _random().randint(10000, 30000)
 
 
 def _vg_k_successes_binomial(details: Dict, current_vars: Dict) -> int:
-    return random.randint(0, current_vars[details["n_var"]])
+    return _random().randint(0, current_vars[details["n_var"]])
 
 def _vg_k_val_poisson(details: Dict, current_vars: Dict) -> int:
-    return random.randint(1, 20)
+    return _random().randint(1, 20)
 
 def _vg_lambda_approx_check(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["mean"]], 2)
@@ -816,13 +831,13 @@ def _vg_lambda_poisson_var_sq(details: Dict, current_vars: Dict) -> float:
     return round(val * val, 2)
 
 def _vg_lambda_val_poisson(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.5, 10.0), 2)
+    return round(_random().uniform(1.5, 10.0), 2)
 
 def _vg_last_year_avg_score(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(60.0, 95.0), 2)
+    return round(_random().uniform(60.0, 95.0), 2)
 
 def _vg_location_poisson(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["factory", "intersection", "hospital", "office"])
+    return _random().choice(["factory", "intersection", "hospital", "office"])
 
 def _vg_lower_bound_ci_find_mean(details: Dict, current_vars: Dict) -> float:
     mean_key = details.get("mean", "mean_val")
@@ -867,7 +882,7 @@ def _vg_margin_error_fm(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["critical"]] * current_vars[details["sd"]] / (current_vars[details["n"]]**0.5), 2)
 
 def _vg_max_defects(details: Dict, current_vars: Dict) -> int:
-    return random.randint(1, 10)
+    return _random().randint(1, 10)
 
 def _vg_mean_score_test(details: Dict, current_vars: Dict) -> float:
     return round(sum(current_vars[details["scores"]]) / len(current_vars[details["scores"]]), 2)
@@ -886,34 +901,34 @@ def _vg_mode_val(details: Dict, current_vars: Dict) -> Any:
     return max(set(current_vars[details["arr"]]), key=current_vars[details["arr"]].count)
 
 def _vg_mu0_brew_time(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(2.5, 5.0), 2)
+    return round(_random().uniform(2.5, 5.0), 2)
 
 def _vg_mu_alt(details: Dict, current_vars: Dict) -> float:
-    return round(current_vars[details["mu_null"]] + random.uniform(1, 5), 2)
+    return round(current_vars[details["mu_null"]] + _random().uniform(1, 5), 2)
 
 def _vg_mu_alt_diff(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["mu_alt"]] - current_vars[details["mu_null"]], 2)
 
 def _vg_mu_null(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(20, 100), 2)
+    return round(_random().uniform(20, 100), 2)
 
 def _vg_mu_null_val(details: Dict, current_vars: Dict) -> float:
     return current_vars[details["source_var"]]
 
 def _vg_multiplier(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.5, 2.0), 2)
+    return round(_random().uniform(0.5, 2.0), 2)
 
 def _vg_n_binomial_test(details: Dict, current_vars: Dict) -> int:
-    return random.randint(30, 200)
+    return _random().randint(30, 200)
 
 def _vg_n_brew_sample(details: Dict, current_vars: Dict) -> int:
-    return random.randint(5, 25)
+    return _random().randint(5, 25)
 
 def _vg_n_prop_ci(details: Dict, current_vars: Dict) -> int:
-    return random.randint(30, 500)
+    return _random().randint(30, 500)
 
 def _vg_n_sample_fpc(details: Dict, current_vars: Dict) -> int:
-    return random.randint(50, 200)
+    return _random().randint(50, 200)
 
 def _vg_n_sample_fpc_ratio(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["n_sample"]] / current_vars[details["pop_size"]], 2)
@@ -922,7 +937,7 @@ def _vg_n_sys_sample(details: Dict, current_vars: Dict) -> int:
     return current_vars[details["pop_size"]] // current_vars[details["interval"]]
 
 def _vg_n_town_sample(details: Dict, current_vars: Dict) -> int:
-    return random.randint(10, 100)
+    return _random().randint(10, 100)
 
 def _vg_n_town_sample_ratio(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["n_sample"]] / current_vars[details["pop_total"]], 2)
@@ -934,7 +949,7 @@ def _vg_n_trials_binom_var(details: Dict, current_vars: Dict) -> int:
     return int(current_vars[details["variance"]] / (current_vars[details["p"]] * (1 - current_vars[details["p"]])))
 
 def _vg_num_attempts_ft(details: Dict, current_vars: Dict) -> int:
-    return random.randint(3, 10)
+    return _random().randint(3, 10)
 
 def _vg_num_known_values(details: Dict, current_vars: Dict) -> int:
     return len([x for x in current_vars[details["arr_var"]] if isinstance(x, (int, float))])
@@ -943,34 +958,34 @@ def _vg_num_mode_val(details: Dict, current_vars: Dict) -> int:
     return Counter(current_vars[details["arr_var"]])[current_vars[details["mode_val"]]]
 
 def _vg_num_students_sd(details: Dict, current_vars: Dict) -> int:
-    return random.randint(25, 100)
+    return _random().randint(25, 100)
 
 def _vg_num_successes(details: Dict, current_vars: Dict) -> int:
     return int(current_vars[details["n"]] * current_vars[details["p"]])
 
 def _vg_num_trials(details: Dict, current_vars: Dict) -> int:
-    return random.randint(10, 100)
+    return _random().randint(10, 100)
 
 def _vg_original_mean(details: Dict, current_vars: Dict) -> float:
     return round(sum(current_vars[details["arr_var"]]) / len(current_vars[details["arr_var"]]), 2)
 
 def _vg_outlier_score(details: Dict, current_vars: Dict) -> float:
-    return random.uniform(100, 150)
+    return _random().uniform(100, 150)
 
 def _vg_p1_percent(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(40, 60), 1)
+    return round(_random().uniform(40, 60), 1)
 
 def _vg_p1_percent_base(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["p1_percent"]] / 100, 4)
 
 def _vg_p1_true_scenario(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["A", "B"])
+    return _random().choice(["A", "B"])
 
 def _vg_p2_percent(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(40, 60), 1)
+    return round(_random().uniform(40, 60), 1)
 
 def _vg_p2_true_scenario(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["A", "B"])
+    return _random().choice(["A", "B"])
 
 def _vg_p_binom_mean(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["n_var"]] * current_vars[details["p_var"]], 2)
@@ -981,73 +996,73 @@ def _vg_p_binom_var(details: Dict, current_vars: Dict) -> float:
     return round(n * p * (1 - p), 2)
 
 def _vg_p_hat_target(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.3, 0.7), 2)
+    return round(_random().uniform(0.3, 0.7), 2)
 
 def _vg_p_value_argument(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["greater", "less", "not equal"])
+    return _random().choice(["greater", "less", "not equal"])
 
 def _vg_p_value_gen(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.001, 0.099), 4)
+    return round(_random().uniform(0.001, 0.099), 4)
 
 def _vg_p_value_scenario(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["more effective", "less effective", "no difference"])
+    return _random().choice(["more effective", "less effective", "no difference"])
 
 def _vg_p_value_scenario_arg(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["increased", "decreased", "unchanged"])
+    return _random().choice(["increased", "decreased", "unchanged"])
 
 def _vg_percentile_k(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(10, 90), 1)
+    return round(_random().uniform(10, 90), 1)
 
 def _vg_points_added(details: Dict, current_vars: Dict) -> int:
-    return random.randint(1, 10)
+    return _random().randint(1, 10)
 
 def _vg_pop_mean_clt(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(60, 100), 2)
+    return round(_random().uniform(60, 100), 2)
 
 def _vg_pop_std_clt(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(10, 20), 2)
+    return round(_random().uniform(10, 20), 2)
 
 def _vg_pop_std_dev(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(5, 15), 2)
+    return round(_random().uniform(5, 15), 2)
 
 def _vg_positive_outcome_description(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["passed", "approved", "completed successfully", "achieved target"])
+    return _random().choice(["passed", "approved", "completed successfully", "achieved target"])
 
 def _vg_power_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["decimal_var"]] * 100, 2)
 
 def _vg_prob_success(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.1, 0.9), 2)
+    return round(_random().uniform(0.1, 0.9), 2)
 
 def _vg_prob_success_ft(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.2, 0.6), 2)
+    return round(_random().uniform(0.2, 0.6), 2)
 
 def _vg_product_cat(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["Gadget", "Tool", "Appliance", "Device"])
+    return _random().choice(["Gadget", "Tool", "Appliance", "Device"])
 
 def _vg_product_ci_find_mean(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["smartphone", "refrigerator", "vacuum cleaner", "laptop"])
+    return _random().choice(["smartphone", "refrigerator", "vacuum cleaner", "laptop"])
 
 def _vg_product_name(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["iWidget", "GizmoPro", "TechMate", "UltraClean"])
+    return _random().choice(["iWidget", "GizmoPro", "TechMate", "UltraClean"])
 
 def _vg_product_type(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["electronic", "mechanical", "hybrid"])
+    return _random().choice(["electronic", "mechanical", "hybrid"])
 
 def _vg_prop_A_actual(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.4, 0.7), 2)
+    return round(_random().uniform(0.4, 0.7), 2)
 
 def _vg_prop_A_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["actual_var"]] * 100, 2)
 
 def _vg_prop_B_actual(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.3, 0.6), 2)
+    return round(_random().uniform(0.3, 0.6), 2)
 
 def _vg_prop_B_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["actual_var"]] * 100, 2)
 
 def _vg_proportion_true(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.2, 0.8), 2)
+    return round(_random().uniform(0.2, 0.8), 2)
 
 def _vg_q1_val(details: Dict, current_vars: Dict) -> float:
     arr = sorted(current_vars[details["source_array"]])
@@ -1061,40 +1076,40 @@ def _vg_sample_mean(details: Dict, current_vars: Dict) -> float:
     return round(sum(current_vars[details["array_var"]]) / len(current_vars[details["array_var"]]), 2)
 
 def _vg_sample_size(details: Dict, current_vars: Dict) -> int:
-    return random.randint(30, 300)
+    return _random().randint(30, 300)
 
 def _vg_sample_size_base(details: Dict, current_vars: Dict) -> int:
-    return random.randint(40, 200)
+    return _random().randint(40, 200)
 
 def _vg_sample_size_clt(details: Dict, current_vars: Dict) -> int:
-    return random.choice([30, 50, 100, 200])
+    return _random().choice([30, 50, 100, 200])
 
 def _vg_sample_size_items(details: Dict, current_vars: Dict) -> int:
-    return random.randint(30, 200)
+    return _random().randint(30, 200)
 
 def _vg_sample_size_prop(details: Dict, current_vars: Dict) -> int:
-    return random.randint(50, 300)
+    return _random().randint(50, 300)
 
 def _vg_scenario_higher(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["A", "B"])
+    return _random().choice(["A", "B"])
 
 def _vg_scenario_type(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["one-tailed", "two-tailed"])
+    return _random().choice(["one-tailed", "two-tailed"])
 
 def _vg_score1(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(60, 95), 1)
+    return round(_random().uniform(60, 95), 1)
 
 def _vg_score2(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(60, 95), 1)
+    return round(_random().uniform(60, 95), 1)
 
 def _vg_score_high(details: Dict, current_vars: Dict) -> int:
-    return random.randint(90, 100)
+    return _random().randint(90, 100)
 
 def _vg_score_low(details: Dict, current_vars: Dict) -> int:
-    return random.randint(50, 70)
+    return _random().randint(50, 70)
 
 def _vg_service_place(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["online", "in-store", "phone"])
+    return _random().choice(["online", "in-store", "phone"])
 
 def _vg_sorted_dataset_arr_median(details: Dict, current_vars: Dict) -> float:
     arr = sorted(current_vars[details["arr_var"]])
@@ -1119,158 +1134,158 @@ def _vg_sorted_dataset_str_median(details: Dict, current_vars: Dict) -> float:
         return arr[mid]
 
 def _vg_std_dev1(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(5.0, 15.0), 2)
+    return round(_random().uniform(5.0, 15.0), 2)
 
 def _vg_std_dev2(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(5.0, 15.0), 2)
+    return round(_random().uniform(5.0, 15.0), 2)
 
 def _vg_std_dev_a(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 10.0), 2)
+    return round(_random().uniform(1.0, 10.0), 2)
 
 def _vg_std_dev_b(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 10.0), 2)
+    return round(_random().uniform(1.0, 10.0), 2)
 
 def _vg_std_dev_b_factor(details: Dict, current_vars: Dict) -> float:
-    return round(current_vars[details["std_dev_a"]] * random.uniform(1.1, 2.0), 2)
+    return round(current_vars[details["std_dev_a"]] * _random().uniform(1.1, 2.0), 2)
 
 def _vg_std_dev_base(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 5.0), 2)
+    return round(_random().uniform(1.0, 5.0), 2)
 
 def _vg_std_dev_bp(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.5, 2.0), 2)
+    return round(_random().uniform(0.5, 2.0), 2)
 
 def _vg_std_dev_test(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(2.0, 8.0), 2)
+    return round(_random().uniform(2.0, 8.0), 2)
 
 def _vg_std_dev_val(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 10.0), 2)
+    return round(_random().uniform(1.0, 10.0), 2)
 
 def _vg_std_dev_x_base(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(2.0, 5.0), 2)
+    return round(_random().uniform(2.0, 5.0), 2)
 
 def _vg_std_dev_x_c(details: Dict, current_vars: Dict) -> float:
-    return round(current_vars[details["base_var"]] * random.uniform(1.1, 1.5), 2)
+    return round(current_vars[details["base_var"]] * _random().uniform(1.1, 1.5), 2)
 
 def _vg_std_dev_y_base(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(2.0, 5.0), 2)
+    return round(_random().uniform(2.0, 5.0), 2)
 
 def _vg_std_dev_y_c(details: Dict, current_vars: Dict) -> float:
-    return round(current_vars[details["base_var"]] * random.uniform(1.1, 1.5), 2)
+    return round(current_vars[details["base_var"]] * _random().uniform(1.1, 1.5), 2)
 
 def _vg_success_rate_percent(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(60.0, 99.0), 2)
+    return round(_random().uniform(60.0, 99.0), 2)
 
 def _vg_target_mean(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(30.0, 70.0), 2)
+    return round(_random().uniform(30.0, 70.0), 2)
 
 def _vg_target_proportion_percent(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(40.0, 90.0), 2)
+    return round(_random().uniform(40.0, 90.0), 2)
 
 def _vg_time_unit_poisson(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["minute", "hour", "day"])
+    return _random().choice(["minute", "hour", "day"])
 
 def _vg_total1_pref(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["total number of", "number of", "all"])
+    return _random().choice(["total number of", "number of", "all"])
 
 def _vg_total2_pref(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["total number of", "number of", "all"])
+    return _random().choice(["total number of", "number of", "all"])
 
 def _vg_total_observations(details: Dict, current_vars: Dict) -> int:
-    return random.randint(30, 300)
+    return _random().randint(30, 300)
 
 def _vg_upper_bound_ci_find_mean(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["mean"]] + current_vars[details["margin"]], 2)
 
 def _vg_upper_bound_diff(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(2.0, 5.0), 2)
+    return round(_random().uniform(2.0, 5.0), 2)
 
 def _vg_upper_diff_prop(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.01, 0.1), 3)
+    return round(_random().uniform(0.01, 0.1), 3)
 
 def _vg_upper_height_ci(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["mean"]] + current_vars[details["ci_half"]], 2)
 
 def _vg_var1(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(3.0, 7.0), 2)
+    return round(_random().uniform(3.0, 7.0), 2)
 
 def _vg_var1_name(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["height", "weight", "score"])
+    return _random().choice(["height", "weight", "score"])
 
 def _vg_var2(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(3.0, 7.0), 2)
+    return round(_random().uniform(3.0, 7.0), 2)
 
 def _vg_var2_name(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["height", "weight", "score"])
+    return _random().choice(["height", "weight", "score"])
 
 def _vg_random_choice_different(details: Dict, current_vars: Dict) -> str:
     choices = details["choices"]
     avoid = current_vars[details["different_from_var"]]
     filtered = [choice for choice in choices if choice != avoid]
-    return random.choice(filtered) if filtered else avoid
+    return _random().choice(filtered) if filtered else avoid
 
 
 def _vg_var_A(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(5.0, 10.0), 2)
+    return round(_random().uniform(5.0, 10.0), 2)
 
 def _vg_var_B(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(2.0, 6.0), 2)
+    return round(_random().uniform(2.0, 6.0), 2)
 
 def _vg_var_x(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 5.0), 2)
+    return round(_random().uniform(1.0, 5.0), 2)
 
 def _vg_var_x_corr(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(-1.0, 1.0), 2)
+    return round(_random().uniform(-1.0, 1.0), 2)
 
 def _vg_var_x_val(details: Dict, current_vars: Dict) -> float:
-    return round(current_vars[details["var"]] + random.uniform(-1.0, 1.0), 2)
+    return round(current_vars[details["var"]] + _random().uniform(-1.0, 1.0), 2)
 
 def _vg_var_y(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 5.0), 2)
+    return round(_random().uniform(1.0, 5.0), 2)
 
 def _vg_var_y_corr(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(-1.0, 1.0), 2)
+    return round(_random().uniform(-1.0, 1.0), 2)
 
 def _vg_var_y_val(details: Dict, current_vars: Dict) -> float:
-    return round(current_vars[details["var"]] + random.uniform(-1.0, 1.0), 2)
+    return round(current_vars[details["var"]] + _random().uniform(-1.0, 1.0), 2)
 
 def _vg_variance(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 25.0), 2)
+    return round(_random().uniform(1.0, 25.0), 2)
 
 def _vg_variance_base(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 10.0), 2)
+    return round(_random().uniform(1.0, 10.0), 2)
 
 def _vg_variance_val(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["std_dev"]] ** 2, 2)
 
 def _vg_weight1_decimal(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.1, 0.5), 2)
+    return round(_random().uniform(0.1, 0.5), 2)
 
 def _vg_weight1_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["decimal_var"]] * 100, 2)
 
 def _vg_weight2_decimal(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.1, 0.5), 2)
+    return round(_random().uniform(0.1, 0.5), 2)
 
 def _vg_weight2_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["decimal_var"]] * 100, 2)
 
 def _vg_weight2_percent_calc(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.1, 0.5) * 100, 2)
+    return round(_random().uniform(0.1, 0.5) * 100, 2)
 
 def _vg_weight_A_decimal(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.1, 0.5), 2)
+    return round(_random().uniform(0.1, 0.5), 2)
 
 def _vg_weight_A_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["decimal_var"]] * 100, 2)
 
 def _vg_weight_B_decimal(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(0.1, 0.5), 2)
+    return round(_random().uniform(0.1, 0.5), 2)
 
 def _vg_weight_B_percent(details: Dict, current_vars: Dict) -> float:
     return round(current_vars[details["decimal_var"]] * 100, 2)
 
 def _vg_x_bar_brew_time(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(2.0, 5.0), 2)
+    return round(_random().uniform(2.0, 5.0), 2)
 
 def _vg_x_success_prop_ci(details: Dict, current_vars: Dict) -> int:
     return int(round(current_vars[details["sample_size_var"]] * current_vars[details["p_hat_var"]]))
@@ -1279,7 +1294,7 @@ def _vg_x_val(details: Dict, current_vars: Dict) -> float:
     return round(float(current_vars[details["value_var"]]), 2)
 
 def _vg_z_score_target(details: Dict, current_vars: Dict) -> float:
-    return round(random.uniform(1.0, 3.0), 2)
+    return round(_random().uniform(1.0, 3.0), 2)
 
 def _vg_z_score_val(details: Dict, current_vars: Dict) -> float:
     mean = float(current_vars[details["mean_var"]])
@@ -1301,29 +1316,29 @@ def _vg_z_value_prop(details: Dict, current_vars: Dict) -> float:
     return round(numerator / denominator, 3) if denominator != 0 else 0.0
 
 def _vg_person2_name(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["John", "Nick", "Aanya", "Sara"])
+    return _random().choice(["John", "Nick", "Aanya", "Sara"])
 
 def _vg_score_type(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["test score", "math score", "reading score", "performance rating"])
+    return _random().choice(["test score", "math score", "reading score", "performance rating"])
 
 def _vg_score_type_plural(details: Dict, current_vars: Dict) -> str:
     singular = current_vars[details["singular_var"]]
     return get_plural(singular)
 
 def _vg_group_type(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["Control Group", "Treatment Group", "Experimental Group", "Placebo Group"])
+    return _random().choice(["Control Group", "Treatment Group", "Experimental Group", "Placebo Group"])
 
 def _vg_service_type(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["internet service", "mobile service", "subscription service", "cloud storage"])
+    return _random().choice(["internet service", "mobile service", "subscription service", "cloud storage"])
 
 def _vg_test_stat_scenario(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["z-test", "t-test", "chi-square test", "ANOVA"])
+    return _random().choice(["z-test", "t-test", "chi-square test", "ANOVA"])
 
 def _vg_statistical_test(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["z-test", "t-test", "chi-squared test", "F-test"])
+    return _random().choice(["z-test", "t-test", "chi-squared test", "F-test"])
 
 def _vg_outlier_description(details: Dict, current_vars: Dict) -> str:
-    return random.choice(["exceptionally high score", "very low result", "unusual reading", "anomalous value"])
+    return _random().choice(["exceptionally high score", "very low result", "unusual reading", "anomalous value"])
 
 def _vg_conf_level_text(details: Dict, current_vars: Dict) -> str:
     level = current_vars[details["conf_level_var"]]
@@ -1347,10 +1362,12 @@ def _vg_item_qc_property(details: Dict, current_vars: Dict) -> str:
 
 
     
-# Global temporary store for variable_generators of the current template being processed.
-# This is a workaround for _vg_lookup_from_options needing access to the original list of choices.
-# A cleaner way would be to pass the template's variable_generators dict into each _vg function.
-template_variable_generators_store = {}
+# Keys in a generator's details that name other variables of the same template.
+# Any key ending in "_var" is treated as a dependency too (see _collect_generator_dependencies).
+VARIABLE_DEPENDENCY_KEYS = {
+    "source_var", "vars_to_sum", "vars_to_multiply", "vars", "var1", "var2",
+    "ensure_different_from", "dataset_arr_percentile"
+}
 
 
 VARIABLE_GENERATOR_FUNCTIONS: Dict[str, Callable] = {
@@ -1632,6 +1649,39 @@ VARIABLE_GENERATOR_FUNCTIONS: Dict[str, Callable] = {
 
 
 
+# --- Batch (vectorized) Variable Generators ---
+# Used by QuestionEngine.generate_instances. Each takes `details`, the list of per-instance
+# variable dicts (already holding every earlier variable of the plan) and a NumPy Generator,
+# and returns one value per instance, drawn in a single NumPy call. Values are converted back
+# to Python types so formatting behaves exactly as with the scalar generators.
+
+def _vgb_random_int_range(details: Dict, vars_list: List[Dict], rng: np.random.Generator) -> List[int]:
+    return rng.integers(details["min"], details["max"], size=len(vars_list), endpoint=True).tolist()
+
+def _vgb_random_float_range(details: Dict, vars_list: List[Dict], rng: np.random.Generator) -> List[float]:
+    decimals = details.get("decimals", 2)
+    return [round(val, decimals) for val in rng.uniform(details["min"], details["max"], size=len(vars_list)).tolist()]
+
+def _vgb_generate_int_array(details: Dict, vars_list: List[Dict], rng: np.random.Generator) -> List[List[int]]:
+    if details.get("size_var"):
+        sizes = [int(current_vars.get(details["size_var"])) for current_vars in vars_list]
+    else:
+        sizes = [details["size"]] * len(vars_list)
+    flat_values = rng.integers(details["min_val"], details["max_val"], size=sum(sizes), endpoint=True).tolist()
+    arrays, start = [], 0
+    for size in sizes:
+        arrays.append(flat_values[start:start + size])
+        start += size
+    return arrays
+
+
+BATCH_VARIABLE_GENERATOR_FUNCTIONS: Dict[str, Callable] = {
+    "random_int_range": _vgb_random_int_range,
+    "random_float_range": _vgb_random_float_range,
+    "generate_int_array": _vgb_generate_int_array,
+}
+
+
 # --- Answer Logic Helper: Generate Distractors ---
 def _generate_numerical_distractors(
     correct_ans: float, 
@@ -1646,7 +1696,7 @@ def _generate_numerical_distractors(
     try:
         correct_ans_float = float(correct_ans)
     except (ValueError, TypeError):
-        return [round(random.uniform(1, 100), decimals) for _ in range(num_distractors)] # Fallback non-numeric correct_ans
+        return [round(_random().uniform(1, 100), decimals) for _ in range(num_distractors)] # Fallback non-numeric correct_ans
 
     if correct_ans_float == 0: 
         typical_offset = 1.0 * (10**(-decimals)) # Scale offset based on decimals
@@ -1661,20 +1711,20 @@ def _generate_numerical_distractors(
     while len(distractors) < num_distractors and attempts < num_distractors * 15: # Increased attempts for better variety
         attempts += 1
         
-        strategy_choice = random.random()
+        strategy_choice = _random().random()
         distractor_val: float
 
         if strategy_choice < 0.4: 
-            offset_factor = random.uniform(0.5, 2.0) 
-            distractor_val = correct_ans_float + random.choice([-1, 1]) * offset_factor * typical_offset
+            offset_factor = _random().uniform(0.5, 2.0) 
+            distractor_val = correct_ans_float + _random().choice([-1, 1]) * offset_factor * typical_offset
         elif strategy_choice < 0.7: 
-            distractor_val = correct_ans_float + random.choice([-1, 1]) * random.uniform(effective_min_diff, effective_min_diff * 5)
+            distractor_val = correct_ans_float + _random().choice([-1, 1]) * _random().uniform(effective_min_diff, effective_min_diff * 5)
         else: 
             if correct_ans_float != 0:
-                factor = random.choice([0.5, 0.75, 1.25, 1.5, 1.75, 0.25])
+                factor = _random().choice([0.5, 0.75, 1.25, 1.5, 1.75, 0.25])
                 distractor_val = correct_ans_float * factor
             else: 
-                distractor_val = random.choice([-1, 1]) * random.uniform(effective_min_diff, effective_min_diff * 5)
+                distractor_val = _random().choice([-1, 1]) * _random().uniform(effective_min_diff, effective_min_diff * 5)
         
         # Round the potential distractor to the specified number of decimals *before* checking uniqueness
         rounded_distractor = round(distractor_val, decimals)
@@ -1687,7 +1737,7 @@ def _generate_numerical_distractors(
     list_dist = list(distractors)
     current_distractor_idx = 1
     while len(list_dist) < num_distractors:
-        fallback_offset = (abs(correct_ans_float * 0.1) + effective_min_diff) * (current_distractor_idx + random.random())
+        fallback_offset = (abs(correct_ans_float * 0.1) + effective_min_diff) * (current_distractor_idx + _random().random())
         new_d_val = correct_ans_float + (fallback_offset if current_distractor_idx % 2 == 0 else -fallback_offset)
         rounded_new_d = round(new_d_val, decimals)
         
@@ -1756,19 +1806,19 @@ def _format_options(
     while len(options_display_strings) < 4:
         # Generate a fallback distractor that is unlikely to match others
         # This logic for fallback can be improved to be more context-aware
-        fallback_val_num = random.uniform(100, 200) + idx_pad
+        fallback_val_num = _random().uniform(100, 200) + idx_pad
         fallback_str = f"{fallback_val_num:.{decimals}f}" if not is_string_based and isinstance(correct_answer_raw_value, float) else str(int(fallback_val_num))
         if is_string_based: fallback_str = f"AltOpt_{idx_pad}"
         
         if fallback_str not in options_display_strings:
             options_display_strings.append(fallback_str)
         else: # if somehow it still clashes, just make it very unique
-             options_display_strings.append(f"Fallback_Unique_{random.randint(1000,9999)}")
+             options_display_strings.append(f"Fallback_Unique_{_random().randint(1000,9999)}")
         idx_pad += 1
         if idx_pad > 10 : break # safety break
 
     final_shuffled_options = options_display_strings[:4] # Ensure exactly 4
-    random.shuffle(final_shuffled_options)
+    _random().shuffle(final_shuffled_options)
     
     correct_idx_in_shuffled_list = 0 # Default
     try:
@@ -1779,9 +1829,9 @@ def _format_options(
         # For robustness in testing, ensure it's added and re-shuffle or log error.
         print(f"CRITICAL WARNING in _format_options: Correct answer string '{correct_option_str}' was not found in final options: {final_shuffled_options}. This indicates a problem with distractor generation or formatting. Forcing correct answer into options.")
         if correct_option_str not in final_shuffled_options: # If truly missing
-            if len(final_shuffled_options) == 4: final_shuffled_options[random.randint(0,3)] = correct_option_str # Replace one
+            if len(final_shuffled_options) == 4: final_shuffled_options[_random().randint(0,3)] = correct_option_str # Replace one
             else: final_shuffled_options.append(correct_option_str) # Add if less than 4
-            random.shuffle(final_shuffled_options) # Re-shuffle
+            _random().shuffle(final_shuffled_options) # Re-shuffle
             final_shuffled_options = final_shuffled_options[:4] # Ensure 4
             try:
                 correct_idx_in_shuffled_list = final_shuffled_options.index(correct_option_str)
@@ -1927,7 +1977,7 @@ def _al_p_value_decision(generated_vars: Dict, details: Dict, options_template:
     # The options are fixed strings, so we don't need to generate distractors.
     # We just need to shuffle them.
     final_shuffled_options = list(options_template)
-    random.shuffle(final_shuffled_options)
+    _random().shuffle(final_shuffled_options)
     
     # Find the new index of our correct answer after the shuffle
     try:
@@ -2036,7 +2086,7 @@ def _al_find_mode_simple(generated_vars: Dict, details: Dict, options_template:
         correct_ans_val = "No mode" 
         
         distractors = []
-        if dataset: distractors.append(str(random.choice(dataset)))
+        if dataset: distractors.append(str(_random().choice(dataset)))
         else: distractors.append("5") # Fallback if dataset was truly empty
         if dataset: distractors.append(str(round(sum(dataset)/len(dataset),1) if len(dataset)>0 else "10"))
         else: distractors.append("10")
@@ -2063,7 +2113,7 @@ def _al_find_mode_simple(generated_vars: Dict, details: Dict, options_template:
     # Add a non-mode value from the dataset if possible
     non_modes = [val for val in dataset if val not in modes]
     if non_modes:
-        distractors_vals.append(random.choice(non_modes))
+        distractors_vals.append(_random().choice(non_modes))
     
     # Generate some numerical distractors if the mode is numerical
     if isinstance(correct_ans, (int, float)):
@@ -2079,7 +2129,7 @@ def _al_find_mode_simple(generated_vars: Dict, details: Dict, options_template:
             if len(distractors_vals) < 3 and str(val) != correct_ans_display and str(val) not in distractors_vals:
                 distractors_vals.append(str(val))
         while len(distractors_vals) < 3:
-            distractors_vals.append(f"Option {random.randint(100,200)}") # Generic string distractors
+            distractors_vals.append(f"Option {_random().randint(100,200)}") # Generic string distractors
 
     return _format_options(correct_ans_display, distractors_vals, is_string_based=True)
 
@@ -2113,11 +2163,11 @@ def _al_calculate_binomial_probability(generated_vars: Dict, details: Dict, opti
     if not (0 <= k <= n and 0 <= p <= 1):
         return 0.0, ["Invalid params"]*4, 0
         
-    correct_ans = binom.pmf(k, n, p)
+    correct_ans = binom_pmf(k, n, p)
     
     distractors = _generate_numerical_distractors(correct_ans, typical_range_factor=0.8, min_diff=0.001, decimals=4)
     # Common error: P(X<k) or P(X>k) or using k/n
-    if k > 0: distractors.append(binom.pmf(k-1, n, p))
+    if k > 0: distractors.append(binom_pmf(k-1, n, p))
     distractors.append(k/n if n > 0 else 0.0)
         
     return _format_options(correct_ans, distractors, decimals=4)
@@ -2131,11 +2181,11 @@ def _al_calculate_binomial_cumulative_probability_le(generated_vars: Dict, detai
     if not (0 <= k_le <= n and 0 <= p <= 1):
         return 0.0, ["Invalid params"]*4, 0
 
-    correct_ans = binom.cdf(k_le, n, p)
+    correct_ans = binom_cdf(k_le, n, p)
     
     distractors = _generate_numerical_distractors(correct_ans, typical_range_factor=0.5, min_diff=0.01, decimals=4)
-    distractors.append(binom.pmf(k_le, n, p)) # P(X=k) instead of P(X<=k)
-    if k_le < n : distractors.append(1 - binom.cdf(k_le, n, p)) # P(X > k)
+    distractors.append(binom_pmf(k_le, n, p)) # P(X=k) instead of P(X<=k)
+    if k_le < n : distractors.append(1 - binom_cdf(k_le, n, p)) # P(X > k)
 
     return _format_options(correct_ans, distractors, decimals=4)
 
@@ -2148,11 +2198,11 @@ def _al_calculate_poisson_probability(generated_vars: Dict, details: Dict, optio
         print(f"Warning: Invalid lambda ({lambda_val}) for Poisson probability. Template: {details.get('id')}")
         return 0.0, ["Invalid Params"]*4, 0
     
-    correct_ans = poisson.pmf(k_target, lambda_val)
+    correct_ans = poisson_pmf(k_target, lambda_val)
     
     distractors = _generate_numerical_distractors(correct_ans, typical_range_factor=0.8, min_diff=0.0001, decimals=4)
-    if k_target > 0 : distractors.append(poisson.pmf(k_target -1, lambda_val))
-    distractors.append(poisson.cdf(k_target, lambda_val))
+    if k_target > 0 : distractors.append(poisson_pmf(k_target -1, lambda_val))
+    distractors.append(poisson_cdf(k_target, lambda_val))
 
     return _format_options(correct_ans, distractors, decimals=4)
 
@@ -2163,13 +2213,13 @@ def _al_calculate_binomial_at_least_one(generated_vars: Dict, details: Dict, opt
     if not (n > 0 and 0 <= p <= 1):
          return 0.0, ["Invalid params"]*4, 0
 
-    prob_zero_successes = binom.pmf(0, n, p)
+    prob_zero_successes = binom_pmf(0, n, p)
     correct_ans = 1.0 - prob_zero_successes
     generated_vars["prob_zero_successes"] = round(prob_zero_successes, 4) # For explanation
 
     distractors = _generate_numerical_distractors(correct_ans, typical_range_factor=0.4, min_diff=0.01, decimals=4)
     distractors.append(prob_zero_successes) # P(X=0)
-    distractors.append(binom.pmf(1,n,p)) # P(X=1)
+    distractors.append(binom_pmf(1,n,p)) # P(X=1)
 
     return _format_options(correct_ans, distractors, decimals=4)
 
@@ -2183,15 +2233,15 @@ def _al_normal_approx_poisson_gt(generated_vars: Dict, details: Dict, options_te
     mu = lambda_val
     sigma = math.sqrt(lambda_val)
     z_score = (k_val + 0.5 - mu) / sigma
-    correct_ans = 1 - norm.cdf(z_score) # This is P(Z > z_score)
+    correct_ans = norm_sf(z_score) # This is P(Z > z_score)
 
     generated_vars["z_score_calc"] = round(z_score, 3) # For explanation
 
     distractors = _generate_numerical_distractors(correct_ans, typical_range_factor=0.6, min_diff=0.001, decimals=4)
-    distractors.append(norm.cdf(z_score)) # P(Z <= z_score) common error
+    distractors.append(norm_cdf(z_score)) # P(Z <= z_score) common error
     # Without continuity correction
     z_no_cc = (k_val - mu) / sigma
-    distractors.append(1 - norm.cdf(z_no_cc))
+    distractors.append(norm_sf(z_no_cc))
 
     return _format_options(correct_ans, distractors, decimals=4)
 
@@ -2371,7 +2421,7 @@ def _al_calculate_mean(generated_vars: Dict, details: Dict, options_template: Li
         if len(distractors) < 3:
             distractors.append(common_error_distractor)
         else:
-            distractors[random.randint(0,2)] = common_error_distractor 
+            distractors[_random().randint(0,2)] = common_error_distractor 
             # Be careful this doesn't make it same as correct_ans if correct_ans was also an error
 
     # Ensure distractors are unique and different from correct_ans after formatting
@@ -2444,9 +2494,8 @@ def _al_calculate_margin_of_error(generated_vars: Dict, details: Dict, options_t
     return _format_options(correct_ans, distractors, decimals=2)
 
 def _al_calculate_p_value_z_test(generated_vars: Dict, details: Dict, options_template: List[str]) -> Tuple:
-    from scipy.stats import norm
     z = generated_vars["z_stat"]
-    p_value = 2 * (1 - norm.cdf(abs(z)))  # two-tailed
+    p_value = 2 * norm_sf(abs(z))  # two-tailed
     correct_ans = round(p_value, 3)
     distractors = _generate_numerical_distractors(correct_ans, decimals=3)
     return _format_options(correct_ans, distractors, decimals=3)
@@ -2593,8 +2642,8 @@ def _al_sample_size_two_means(generated_vars: Dict, details: Dict, options_templ
     beta = 1 - power
 
     # Z-values (two-tailed for alpha, one-tailed for beta)
-    z_alpha_div_2 = norm.ppf(1 - (alpha / 2))
-    z_beta = norm.ppf(1 - beta) # or norm.ppf(power)
+    z_alpha_div_2 = norm_ppf(1 - (alpha / 2))
+    z_beta = norm_ppf(1 - beta) # or norm_ppf(power)
 
     if effect_size == 0: return 9999, ["Error: Effect=0"]*4,0 # Avoid division by zero
     
@@ -2607,7 +2656,7 @@ def _al_sample_size_two_means(generated_vars: Dict, details: Dict, options_templ
 
     distractors = _generate_numerical_distractors(float(correct_ans), num_distractors=3, decimals=0)
     # Error: using Z_alpha instead of Z_alpha/2
-    z_alpha_one_sided = norm.ppf(1 - alpha)
+    z_alpha_one_sided = norm_ppf(1 - alpha)
     distractors.append(math.ceil(2 * (((z_alpha_one_sided + z_beta) * std_dev) / effect_size)**2))
     # Error: Forgetting the '2 *' at the beginning
     distractors.append(math.ceil((((z_alpha_div_2 + z_beta) * std_dev) / effect_size)**2))
@@ -2653,7 +2702,7 @@ def _al_calculate_ci_proportion(generated_vars: Dict, details: Dict, options_tem
     me_se_err = z_value * se_error
     distractors_str.append(f"({p_hat - me_se_err:.3f}, {p_hat + me_se_err:.3f})")
     # 3. Shifted interval
-    shift = random.uniform(0.02, 0.05)
+    shift = _random().uniform(0.02, 0.05)
     distractors_str.append(f"({lower_bound + shift:.3f}, {upper_bound + shift:.3f})")
     
     return _format_options(correct_ans_str, distractors_str, is_string_based=True)
@@ -2791,7 +2840,7 @@ def _al_test_two_proportions_one_tailed(generated_vars: Dict, details: Dict, opt
     se = math.sqrt(p_pool * (1 - p_pool) * ((1/n1) + (1/n2)))
 
     z_score = (p1_hat - p2_hat) / se
-    p_value = 1 - stats.norm.cdf(z_score)
+    p_value = norm_sf(z_score)
 
     generated_vars["z_score_two_prop"] = round(z_score, 3)
     generated_vars["p_value_two_prop"] = round(p_value, 4)
@@ -2877,46 +2926,99 @@ ANSWER_LOGIC_FUNCTIONS: Dict[str, Callable] = {
 
 
 
+PLACEHOLDER_PATTERN = re.compile(r"\{([\w_]+)\}")
+
+# text template -> list of (text, is_variable) segments, filled at template load (see QuestionEngine._compile_template)
+_compiled_text_templates: Dict[str, List[Tuple[str, bool]]] = {}
+
+def compile_text_template(text_template: str) -> List[Tuple[str, bool]]:
+    """Splits a string with {var_name} placeholders into literal and variable segments (cached per string)."""
+    segments = _compiled_text_templates.get(text_template)
+    if segments is None:
+        segments = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text_template):
+            if match.start() > position:
+                segments.append((text_template[position:match.start()], False))
+            segments.append((match.group(1), True))
+            position = match.end()
+        if position < len(text_template):
+            segments.append((text_template[position:], False))
+        _compiled_text_templates[text_template] = segments
+    return segments
+
+def format_placeholder_value(value: Any) -> str:
+    # Smart formatting for floats
+    if isinstance(value, float):
+        # If it's essentially an integer (e.g., 5.0)
+        if value == int(value):
+            return str(int(value))
+        # If it's a very small decimal or needs precision
+        elif abs(value) < 0.0001 and value != 0:
+            return f"{value:.4e}" # scientific notation
+        elif abs(value) < 1: # Small decimals
+            return f"{value:.3f}".rstrip('0').rstrip('.') # up to 3, remove trailing .0
+        else: # Other floats
+            return f"{value:.2f}".rstrip('0').rstrip('.') # up to 2, remove trailing .0
+    return str(value)
+
+def render_text_template(segments: List[Tuple[str, bool]], variables: Dict) -> str:
+    """Renders compiled segments in a single join. Placeholders without a variable are kept as {var_name}."""
+    parts = []
+    for text, is_variable in segments:
+        if not is_variable:
+            parts.append(text)
+        elif text in variables:
+            parts.append(format_placeholder_value(variables[text]))
+        else:
+            parts.append("{" + text + "}")
+    return "".join(parts)
+
 def substitute_placeholders(text_template: str, variables: Dict) -> str:
     """Substitutes placeholders like {var_name} in a string with values from the variables dict."""
-    # Find all placeholders like {var_name}
-    placeholders = re.findall(r"\{([\w_]+)\}", text_template)
-    
-    formatted_text = text_template
-    for placeholder in placeholders:
-        if placeholder in variables:
-            value = variables[placeholder]
-            # Smart formatting for floats
-            if isinstance(value, float):
-                # If it's essentially an integer (e.g., 5.0)
-                if value == int(value):
-                    display_value = str(int(value))
-                # If it's a very small decimal or needs precision
-                elif abs(value) < 0.0001 and value != 0:
-                    display_value = f"{value:.4e}" # scientific notation
-                elif abs(value) < 1: # Small decimals
-                    display_value = f"{value:.3f}".rstrip('0').rstrip('.') # up to 3, remove trailing .0
-                else: # Other floats
-                    display_value = f"{value:.2f}".rstrip('0').rstrip('.') # up to 2, remove trailing .0
-            else:
-                display_value = str(value)
-            formatted_text = formatted_text.replace(f"{{{placeholder}}}", display_value)
-        # else:
-            # print(f"Warning: Placeholder {{{placeholder}}} not found in generated variables for template: {text_template[:50]}...")
-    return formatted_text
+    return render_text_template(compile_text_template(text_template), variables)
+
+
+def _collect_generator_dependencies(gen_details: Dict) -> List[str]:
+    """Returns the variable names a generator instruction reads, including those of nested generators."""
+    dependencies = []
+    for key, value in gen_details.items():
+        if key == "type":
+            continue
+        if isinstance(value, dict) and "type" in value:
+            # Nested generator, e.g. 'target_t_or_z' of calculate_x_bar_for_test_stat
+            dependencies.extend(_collect_generator_dependencies(value))
+        elif key in VARIABLE_DEPENDENCY_KEYS or key.endswith("_var"):
+            names = value if isinstance(value, list) else [value]
+            dependencies.extend(name for name in names if isinstance(name, str))
+    return dependencies
 
 
 class QuestionEngine:
-    def __init__(self, templates_file_path: str):
-        self.question_templates: List[Dict] = self._load_templates(templates_file_path)
+    def __init__(self, templates_file_path: str, pool_depth: int = 0):
         # Store a reference to the actual generator functions for variable generation
         self.variable_generator_functions: Dict[str, Callable] = VARIABLE_GENERATOR_FUNCTIONS
+        self.batch_variable_generator_functions: Dict[str, Callable] = BATCH_VARIABLE_GENERATOR_FUNCTIONS
         # Store a reference to the actual answer logic functions
         self.answer_logic_functions: Dict[str, Callable] = ANSWER_LOGIC_FUNCTIONS
-        
-        # For _vg_lookup_from_options dependency, not ideal but works for now
-        global template_variable_generators_store 
-        self.current_template_var_gens_for_lookup = {}
+
+        self.question_templates: List[Dict] = self._load_templates(templates_file_path)
+        # unit -> difficulty_type -> difficulty_level -> templates, plus id -> template
+        self.template_index = TemplateIndex(self.question_templates)
+        # Variable generation plans, compiled once per template id (see _compile_template)
+        self.compiled_plans: Dict[str, Dict] = {}
+        for template in self.question_templates:
+            if template.get("id"):
+                self.compiled_plans[template["id"]] = self._compile_template(template)
+
+        # Optional stock of pre-generated instances per template, refilled in the background
+        self.instance_pool: Optional[QuestionInstancePool] = None
+        if pool_depth > 0 and self.question_templates:
+            self.instance_pool = QuestionInstancePool(
+                self.question_templates, self.generate_single_question_instance, default_depth=pool_depth,
+                generate_batch_fn=self.generate_instances
+            )
+            self.instance_pool.start()
 
 
     def _load_templates(self, file_path: str) -> List[Dict]:
@@ -2932,118 +3034,161 @@ class QuestionEngine:
             print(f"ERROR: Could not decode JSON from {file_path}. Error: {e}")
             return []
 
-    def _generate_variables_for_template(self, template: Dict) -> Dict:
-        generated_vars = {}
-        
-        # Make template's variable_generators accessible for _vg_lookup_from_options
-        # This is a hack and should ideally be refactored if _vg_lookup_from_options is frequently used
-        # or if dependencies become very complex. A better way is to pass necessary context.
-        global template_variable_generators_store 
-        template_variable_generators_store = template.get("variable_generators", {})
-
-        to_generate = list(template.get("variable_generators", {}).items())
-        max_passes = len(to_generate) + 3 # Allow a few extra passes for dependencies
-
-        for _pass_num in range(max_passes):
-            if not to_generate: 
-                break 
-            
-            processed_in_this_pass_count = 0
-            still_needs_generation = []
-
-            for var_name, gen_config_or_literal in to_generate:
-                if var_name in generated_vars: 
+    def _compile_template(self, template: Dict) -> Dict:
+        """
+        Resolves a template's variable_generators into a plan that can be executed in one pass:
+        generator callables are looked up, dependency edges are resolved and the variables are
+        topologically sorted. Unknown generator types, missing dependencies and cycles are
+        reported here once instead of on every generated instance.
+
+        Each step is a (var_name, generator_function, details) tuple. Steps with no generator
+        function carry a value (a literal, or an error marker) that is assigned as-is.
+        """
+        template_id = template.get("id")
+        var_gens = template.get("variable_generators", {})
+
+        dependencies: Dict[str, List[str]] = {}
+        for var_name, gen_config_or_literal in var_gens.items():
+            # Anything that is not a dict with a 'type' is a literal value (e.g. a list like 'claim_options')
+            if isinstance(gen_config_or_literal, dict) and "type" in gen_config_or_literal:
+                dependencies[var_name] = _collect_generator_dependencies(gen_config_or_literal)
+            else:
+                dependencies[var_name] = []
+
+        ordered_vars: List[str] = []
+        unresolved = set()
+        state: Dict[str, str] = {} # var_name -> "visiting" | "done"
+
+        def visit(var_name: str) -> None:
+            if state.get(var_name) == "done":
+                return
+            if state.get(var_name) == "visiting":
+                print(f"Warning: Dependency cycle through variable '{var_name}' in template ID '{template_id}'.")
+                unresolved.add(var_name)
+                return
+            state[var_name] = "visiting"
+            for dep in dependencies[var_name]:
+                if dep not in var_gens:
+                    print(f"Warning: Variable '{var_name}' in template ID '{template_id}' depends on undefined variable '{dep}'.")
+                    unresolved.add(var_name)
                     continue
+                visit(dep)
+                if dep in unresolved:
+                    unresolved.add(var_name)
+            state[var_name] = "done"
+            ordered_vars.append(var_name)
+
+        for var_name in var_gens:
+            visit(var_name)
+
+        steps: List[Tuple[str, Any, Any]] = []
+        for var_name in ordered_vars:
+            gen_config_or_literal = var_gens[var_name]
+            if var_name in unresolved:
+                steps.append((var_name, None, f"ERROR_DEP_UNRESOLVED_{var_name}"))
+            elif not (isinstance(gen_config_or_literal, dict) and "type" in gen_config_or_literal):
+                steps.append((var_name, None, gen_config_or_literal))
+            elif gen_config_or_literal["type"] in self.variable_generator_functions:
+                steps.append((var_name, self.variable_generator_functions[gen_config_or_literal["type"]], gen_config_or_literal))
+            else:
+                print(f"Warning: Unknown variable generator type '{gen_config_or_literal['type']}' for var '{var_name}' in template ID '{template_id}'.")
+                steps.append((var_name, None, f"UNKNOWN_GEN_TYPE_{var_name}"))
 
-                # Check if gen_config_or_literal is a generator instruction (dict with 'type')
-                # or a literal value (like a list for 'claim_options')
-                if isinstance(gen_config_or_literal, dict) and "type" in gen_config_or_literal:
-                    gen_details = gen_config_or_literal # This is a generator instruction
-                    gen_type = gen_details.get("type")
-                    
-                    dependencies_met = True
-                    # Check 'source_var'
-                    if "source_var" in gen_details and gen_details["source_var"] not in generated_vars:
-                        dependencies_met = False
-                    
-                    # Check other common dependency list keys
-                    # (Consolidated the list of potential dependency keys)
-                    dep_keys_to_check = [
-                        "vars_to_sum", "vars_to_multiply", "known_values_var", "missing_value_var", 
-                        "mean_var", "std_dev_var", "z_score_var", "max_var", "alpha_var", 
-                        "scenario_var", "lambda_var", "N_var", "n_var", "base_var", "target_corr_var",
-                        "std_dev_x_var", "std_dev_y_var", "lower_var", "upper_var", "center_var",
-                        "p1_var", "p1_perc_var", "p2_perc_var", "prop_A_var", "prop_B_var", 
-                        "mode_val_var", "mode_freq_var", "other_vals_count_var", "conf_level_var",
-                        "dataset_arr_percentile", "sample_size_var", "proportion_var",
-                        "var1", "var2" # For multiply_vars, subtract_vars etc.
-                    ]
-                    for dep_list_key in dep_keys_to_check:
-                        if dep_list_key in gen_details:
-                            dep_value_or_list = gen_details[dep_list_key]
-                            if isinstance(dep_value_or_list, str): # Single dependency variable name
-                                if dep_value_or_list not in generated_vars:
-                                    dependencies_met = False; break
-                            
-                            # --- vvv THIS IS THE CORRECTED BLOCK vvv ---
-                            elif isinstance(dep_value_or_list, list): # List of dependency variable names
-                                for dep_var in dep_value_or_list:
-                                    # ONLY check dependency if the item is a string (a variable name)
-                                    if isinstance(dep_var, str) and dep_var not in generated_vars:
-                                        dependencies_met = False
-                                        break
-                            # --- ^^^ THIS IS THE CORRECTED BLOCK ^^^ ---
-
-                        if not dependencies_met: break
-                    
-                    # Dependency check for nested generator in target_t_or_z
-                    if dependencies_met and "target_t_or_z" in gen_details and isinstance(gen_details["target_t_or_z"], dict):
-                        nested_details = gen_details["target_t_or_z"]
-                        if "source_var" in nested_details and nested_details["source_var"] not in generated_vars:
-                            dependencies_met = False
-                        for dep_key in ["var1", "var2"]: # Common for multiply_vars_float
-                            if dep_key in nested_details and nested_details[dep_key] not in generated_vars:
-                                dependencies_met = False; break
-                        if not dependencies_met: break
-
-                    if dependencies_met:
-                        if gen_type in self.variable_generator_functions:
-                            try:
-                                generated_vars[var_name] = self.variable_generator_functions[gen_type](gen_details, generated_vars)
-                                processed_in_this_pass_count += 1
-                            except Exception as e:
-                                print(f"ERROR generating variable '{var_name}' (type: {gen_type}) for template ID '{template.get('id')}': {e}")
-                                generated_vars[var_name] = f"ERROR_IN_GENERATION_{var_name}"
-                                processed_in_this_pass_count += 1 # Mark as processed to avoid infinite loop
-                        else:
-                            print(f"Warning: Unknown variable generator type '{gen_type}' for var '{var_name}' in template ID '{template.get('id')}'.")
-                            generated_vars[var_name] = f"UNKNOWN_GEN_TYPE_{var_name}"
-                            processed_in_this_pass_count += 1
-                    else:
-                        still_needs_generation.append((var_name, gen_details))
-                
-                # If it's NOT a dict with a 'type', assume it's a literal value (e.g., a list like 'claim_options')
-                # These literals are directly assigned to generated_vars to be used by other generators.
-                else: 
-                    generated_vars[var_name] = gen_config_or_literal 
-                    processed_in_this_pass_count += 1
-            
-            to_generate = still_needs_generation # Update the list of vars still needing generation
-            if processed_in_this_pass_count == 0 and to_generate:
-                # print(f"Warning: Could not resolve all variables for template {template.get('id')}. Unresolved: {[item[0] for item in to_generate]}")
-                for var_name_unresolved, _ in to_generate: 
-                    generated_vars[var_name_unresolved] = f"ERROR_DEP_UNRESOLVED_{var_name_unresolved}"
-                break 
-        
-        template_variable_generators_store = {} # Clear global temporary store
+        return {
+            "template": template,
+            "steps": steps,
+            "question_segments": compile_text_template(template.get("question_template", "")),
+            "options_segments": [compile_text_template(opt) for opt in template.get("options_template", [])],
+            "explanation_segments": compile_text_template(template["explanation_template"]) if "explanation_template" in template else None,
+        }
+
+    def _get_compiled_plan(self, template: Dict) -> Dict:
+        plan = self.compiled_plans.get(template.get("id"))
+        if plan is None or plan["template"] is not template:
+            # Template was not part of the loaded bank (or was replaced); compile it on demand
+            plan = self._compile_template(template)
+            if template.get("id"):
+                self.compiled_plans[template["id"]] = plan
+        return plan
+
+    def _generate_variables_for_template(self, template: Dict) -> Dict:
+        generated_vars = {}
+        for var_name, generator_function, details in self._get_compiled_plan(template)["steps"]:
+            if generator_function is None:
+                generated_vars[var_name] = details
+                continue
+            try:
+                generated_vars[var_name] = generator_function(details, generated_vars)
+            except Exception as e:
+                print(f"ERROR generating variable '{var_name}' (type: {details.get('type')}) for template ID '{template.get('id')}': {e}")
+                generated_vars[var_name] = f"ERROR_IN_GENERATION_{var_name}"
         return generated_vars
 
+    def _generate_variables_batch(self, template: Dict, n: int, rng: np.random.Generator) -> List[Dict]:
+        """
+        Runs the compiled plan for n instances at once, one variable (column) at a time, so that
+        generators with a batch version draw all n values in a single NumPy call.
+        """
+        vars_list: List[Dict] = [{} for _ in range(n)]
+        for var_name, generator_function, details in self._get_compiled_plan(template)["steps"]:
+            if generator_function is None:
+                for generated_vars in vars_list:
+                    generated_vars[var_name] = details
+                continue
+
+            batch_function = self.batch_variable_generator_functions.get(details["type"])
+            if batch_function is not None:
+                try:
+                    for generated_vars, value in zip(vars_list, batch_function(details, vars_list, rng)):
+                        generated_vars[var_name] = value
+                    continue
+                except Exception:
+                    pass # Fall back to per-instance generation, which reports errors per variable
+
+            for generated_vars in vars_list:
+                try:
+                    generated_vars[var_name] = generator_function(details, generated_vars)
+                except Exception as e:
+                    print(f"ERROR generating variable '{var_name}' (type: {details.get('type')}) for template ID '{template.get('id')}': {e}")
+                    generated_vars[var_name] = f"ERROR_IN_GENERATION_{var_name}"
+        return vars_list
+
+    def generate_instances(self, template: Dict, n: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Generates n instances of one template in a single call (practice mode, pre-generation).
+        The compiled plan is shared across the batch and random_int_range, random_float_range and
+        generate_int_array values are drawn with NumPy for the whole batch.
+
+        `seed` seeds the NumPy draws and a random.Random private to this call (used by the other
+        generators and the answer logic), so a seeded batch is reproducible and leaves the shared
+        `random` module untouched.
+        """
+        if not template: return [{"error": "Empty template provided"}] * max(n, 0)
+        if n <= 0: return []
+
+        rng = np.random.default_rng(seed)
+        plan = self._get_compiled_plan(template)
+        if seed is not None:
+            _thread_random.rng = random.Random(seed)
+        try:
+            return [
+                self._build_question_instance(template, plan, generated_variables)
+                for generated_variables in self._generate_variables_batch(template, n, rng)
+            ]
+        finally:
+            if seed is not None:
+                del _thread_random.rng
+
+    @timed_stage("question_generation")
     def generate_single_question_instance(self, template: Dict) -> Dict[str, Any]:
         if not template: return {"error": "Empty template provided"}
 
+        plan = self._get_compiled_plan(template)
         generated_variables = self._generate_variables_for_template(template)
-        
-        question_text = substitute_placeholders(template["question_template"], generated_variables)
+        return self._build_question_instance(template, plan, generated_variables)
+
+    def _build_question_instance(self, template: Dict, plan: Dict, generated_variables: Dict) -> Dict[str, Any]:
+        question_text = render_text_template(plan["question_segments"], generated_variables)
         
         options_template_raw = template.get("options_template", [])
         answer_logic_details = template.get("answer_logic", {})
@@ -3064,7 +3209,7 @@ class QuestionEngine:
             print(f"Warning: Answer logic type '{logic_type}' not found for template '{template.get('id')}'. Using raw options.")
             # Try to process options template directly if logic is missing (e.g. for simple fixed choice where index is enough)
             if options_template_raw:
-                final_options_str = [substitute_placeholders(opt, generated_variables) for opt in options_template_raw]
+                final_options_str = [render_text_template(segments, generated_variables) for segments in plan["options_segments"]]
                 # If it was a simple fixed_choice and correct_option_index was in template directly
                 if "correct_option_index" in answer_logic_details and len(final_options_str) > answer_logic_details["correct_option_index"]:
                     correct_option_index = answer_logic_details["correct_option_index"]
@@ -3081,7 +3226,7 @@ class QuestionEngine:
              if final_options_str: correct_answer_value = final_options_str[0] # Update correct_answer_value if index changed
 
         explanation = ""
-        if "explanation_template" in template:
+        if plan["explanation_segments"] is not None:
             # For explanation, ensure 'correct_ans' and other dynamic parts are available
             # The answer_logic functions should ideally add computed values to generated_vars if they are used in explanations
             # For simplicity now, we just add the final correct_answer_value
@@ -3089,7 +3234,7 @@ class QuestionEngine:
             vars_for_explanation['correct_ans'] = str(correct_answer_value) # The actual value
             # If answer logic added more keys to generated_vars (like intermediate steps), they can be used too.
             # Example: if _al_calculate_mean adds 'sum_of_values', 'sample_size_mean' to generated_vars
-            explanation = substitute_placeholders(template["explanation_template"], vars_for_explanation)
+            explanation = render_text_template(plan["explanation_segments"], vars_for_explanation)
 
         return {
             "id": template.get("id"),
@@ -3106,6 +3251,17 @@ class QuestionEngine:
             "_debug_generated_vars": generated_variables 
         }
 
+    def get_question_instance(self, template: Dict) -> Dict[str, Any]:
+        """Like generate_single_question_instance, but serves from the instance pool when one is configured."""
+        if self.instance_pool is None:
+            return self.generate_single_question_instance(template)
+        return self.instance_pool.take(template)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        if self.instance_pool is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.instance_pool.get_stats()}
+
     def get_all_templates(self) -> List[Dict]:
         return self.question_templates
 
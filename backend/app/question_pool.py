@@ -0,0 +1,135 @@
+# backend/app/question_pool.py
+import threading
+import queue
+from collections import deque
+from typing import List, Dict, Any, Callable, Optional
+
+
+class QuestionInstancePool:
+    """
+    Keeps a small stock of ready-made question instances per template so that quiz
+    requests can pop instances instead of generating them on the request path.
+    A background worker thread tops each template's stock back up after instances
+    are handed out.
+
+    The depth of every template's stock is `default_depth`, unless the template itself
+    sets a "pool_depth" value in question_templates.json.
+    """
+
+    def __init__(self, templates: List[Dict], generate_fn: Callable[[Dict], Dict[str, Any]], default_depth: int = 5,
+                 generate_batch_fn: Optional[Callable[[Dict, int], List[Dict[str, Any]]]] = None):
+        self.generate_fn = generate_fn
+        # Used for refills when given, so a whole top-up is generated in one call
+        self.generate_batch_fn = generate_batch_fn
+        self.default_depth = default_depth
+        self.templates_by_id: Dict[str, Dict] = {tpl["id"]: tpl for tpl in templates if tpl.get("id")}
+        self.depths: Dict[str, int] = {
+            template_id: int(tpl.get("pool_depth", default_depth))
+            for template_id, tpl in self.templates_by_id.items()
+        }
+        self.instances: Dict[str, deque] = {template_id: deque() for template_id in self.templates_by_id}
+
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+
+        self._lock = threading.Lock()
+        self._refill_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pending_refills = set()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Starts the refill worker and queues an initial fill of every template."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._run_worker, name="question-pool-refill", daemon=True)
+        self._worker.start()
+        for template_id in self.templates_by_id:
+            self._request_refill(template_id)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        if self._worker is None:
+            return
+        self._refill_queue.put(None)
+        self._worker.join(timeout)
+        self._worker = None
+
+    def set_depth(self, template_id: str, depth: int) -> None:
+        if template_id not in self.templates_by_id:
+            raise KeyError(f"Unknown template id '{template_id}'")
+        self.depths[template_id] = max(0, int(depth))
+        self._request_refill(template_id)
+
+    def take(self, template: Dict) -> Dict[str, Any]:
+        """Returns a pooled instance for the template, generating one synchronously on a miss."""
+        template_id = template.get("id")
+        if template_id not in self.templates_by_id or self.templates_by_id[template_id] is not template:
+            # Not a template from the pooled bank, nothing to pop from
+            return self.generate_fn(template)
+
+        instance = None
+        with self._lock:
+            stock = self.instances[template_id]
+            if stock:
+                instance = stock.popleft()
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._request_refill(template_id)
+
+        if instance is None:
+            instance = self.generate_fn(template)
+        return instance
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total_requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refills": self.refills,
+                "hit_rate": round(self.hits / total_requests, 4) if total_requests else 0.0,
+                "pooled_instances": sum(len(stock) for stock in self.instances.values()),
+                "target_instances": sum(self.depths.values()),
+                "empty_templates": [tid for tid, stock in self.instances.items() if not stock and self.depths[tid] > 0],
+                "pending_refills": len(self._pending_refills),
+            }
+
+    def _request_refill(self, template_id: str) -> None:
+        with self._lock:
+            if template_id in self._pending_refills:
+                return
+            self._pending_refills.add(template_id)
+        self._refill_queue.put(template_id)
+
+    def _run_worker(self) -> None:
+        while True:
+            template_id = self._refill_queue.get()
+            if template_id is None:
+                break
+            # Cleared before refilling so that instances taken during the refill queue another one
+            with self._lock:
+                self._pending_refills.discard(template_id)
+            try:
+                self._refill(template_id)
+            except Exception as e:
+                print(f"ERROR refilling question pool for template '{template_id}': {e}")
+
+    def _refill(self, template_id: str) -> None:
+        template = self.templates_by_id[template_id]
+        while True:
+            with self._lock:
+                missing = self.depths[template_id] - len(self.instances[template_id])
+            if missing <= 0:
+                return
+            # Generate outside the lock so request threads can keep popping meanwhile
+            if self.generate_batch_fn is not None:
+                new_instances = self.generate_batch_fn(template, missing)
+            else:
+                new_instances = [self.generate_fn(template)]
+            new_instances = [instance for instance in new_instances if "error" not in instance]
+            if not new_instances:
+                return
+            with self._lock:
+                self.instances[template_id].extend(new_instances)
+                self.refills += len(new_instances)
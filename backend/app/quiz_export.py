@@ -0,0 +1,74 @@
+# backend/app/quiz_export.py
+# Encoders for the quiz result export endpoint. The database services hand out quiz
+# results in batches (lists of documents) straight from a MongoDB cursor; each batch is
+# encoded into one chunk of the response body, so an export holds at most one batch in
+# memory however many results it covers.
+#
+#   ndjson  one quiz result document per line
+#   csv     one row per question of performance_breakdown, with the quiz's identifying fields
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Union
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_QUIZ_FIELDS = ["student_id", "subject", "quiz_type", "quiz_name", "timestamp", "time_taken_seconds"]
+# The fields of a stored performance_breakdown row (quiz_scoring.score_quiz); answers are not stored
+CSV_QUESTION_FIELDS = [
+    "template_id", "topic_name", "subtopic_name", "difficulty_level", "difficulty_type",
+    "is_correct", "marks_obtained", "marks_possible",
+]
+CSV_COLUMNS = CSV_QUIZ_FIELDS + CSV_QUESTION_FIELDS
+
+# Only the fields the CSV export writes
+CSV_PROJECTION = {"_id": 0, **{field: 1 for field in CSV_QUIZ_FIELDS},
+                  **{f"performance_breakdown.{field}": 1 for field in CSV_QUESTION_FIELDS}}
+
+
+def encode_ndjson_batch(documents: List[Dict]) -> bytes:
+    return "".join(json.dumps(document, default=str) + "\n" for document in documents).encode("utf-8")
+
+
+def csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue().encode("utf-8")
+
+
+def encode_csv_batch(documents: List[Dict]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for document in documents:
+        quiz_values = [document.get(field) for field in CSV_QUIZ_FIELDS]
+        for question in document.get("performance_breakdown", []):
+            writer.writerow(quiz_values + [question.get(field) for field in CSV_QUESTION_FIELDS])
+    return buffer.getvalue().encode("utf-8")
+
+
+def export_body(batches: Union[Iterable[List[Dict]], AsyncIterable[List[Dict]]], export_format: str) -> Union[Iterator[bytes], AsyncIterator[bytes]]:
+    """
+    The response body for StreamingResponse: encoded chunks, one per batch. Synchronous
+    batches (pymongo) give a plain iterator, which Starlette iterates in the threadpool;
+    Motor's asynchronous batches give an async iterator.
+    """
+    encode = encode_csv_batch if export_format == "csv" else encode_ndjson_batch
+    header = csv_header() if export_format == "csv" else b""
+
+    if hasattr(batches, "__aiter__"):
+        async def async_body():
+            if header:
+                yield header
+            async for batch in batches:
+                yield encode(batch)
+        return async_body()
+
+    def body():
+        if header:
+            yield header
+        for batch in batches:
+            yield encode(batch)
+    return body()
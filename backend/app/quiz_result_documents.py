@@ -0,0 +1,45 @@
+# backend/app/quiz_result_documents.py
+# Storage-independent helpers for stored quiz result documents, shared by every storage
+# backend (database_service.py, async_database_service.py, sqlite_database_service.py).
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .quiz_scoring import summarize_performance
+
+
+def period_start_timestamp(time_period_days: int) -> Optional[str]:
+    """
+    ISO timestamp of the start (midnight) of the calendar day `time_period_days` days ago,
+    or None for all time (0). Periods are whole days, as in the student rollups' daily
+    buckets, so "1d" covers today and yesterday.
+    """
+    if time_period_days <= 0:
+        return None
+    return (datetime.now() - timedelta(days=time_period_days)).date().isoformat() + "T00:00:00"
+
+def build_quiz_result_document(result_data: dict) -> dict:
+    """Adds the scoring summary (when missing) and the structured path of a quiz result before it is stored."""
+    student_id = result_data.get("student_id")
+    subject = result_data.get("subject")
+    quiz_type = result_data.get("quiz_type")
+    quiz_name = result_data.get("quiz_name")
+    timestamp = result_data.get("timestamp") or datetime.now().isoformat()
+    performance = result_data.get("performance_breakdown")
+    time_taken = result_data.get("time_taken_seconds", None)
+
+    # The submit endpoints send the summary score_quiz built with the breakdown; recompute it otherwise
+    scoring_summary = result_data.get("scoring_summary") or summarize_performance(performance)
+
+    path = f"{student_id}/{subject}/{'Grand-Quiz' if quiz_type == 'Grand-Quiz' else quiz_name}/{timestamp}"
+
+    return {
+        "path": path,
+        "student_id": student_id,
+        "subject": subject,
+        "quiz_type": quiz_type,
+        "quiz_name": quiz_name,
+        "timestamp": timestamp,
+        "performance_breakdown": performance,
+        "time_taken_seconds": time_taken,
+        "scoring_summary": scoring_summary
+    }
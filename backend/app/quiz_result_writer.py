@@ -0,0 +1,342 @@
+# backend/app/quiz_result_writer.py
+# How the submit endpoints persist quiz results (QUIZ_RESULT_WRITE_MODE):
+#
+#   direct        await db_service.save_quiz_result before answering (one insert per submission)
+#   write_behind  append the result to a local journal file, answer, and let a background
+#                 thread store the queued results in batches with save_quiz_result_documents
+#                 (one insert_many per batch), so submit latency does not depend on the database
+#
+# Write-behind journal: one JSON line {"seq", "document"} per queued result, fsynced before
+# the submission is acknowledged (concurrent submissions share one fsync). After every
+# stored batch, the highest stored seq goes to a checkpoint file; once nothing is pending,
+# the journal is truncated. Under sustained load something is always pending, so a journal
+# grown past `journal_compact_bytes` is instead rewritten without the stored prefix the
+# checkpoint covers (the pending entries are its contiguous tail). On start, entries past the checkpoint are queued again, which
+# replays whatever was not stored before a crash or while the database was down. The
+# storage services skip results whose path is already stored, so replays never duplicate.
+#
+# Each API process claims its own journal slot (quiz_results-<n>.journal, held with an
+# exclusive lock), so several workers can share one journal directory. The journal lives
+# on local disk: only use write_behind where the disk outlives the process (not on
+# serverless instances).
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+from .metrics import run_in_threadpool
+from .quiz_result_documents import build_quiz_result_document
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single journal, one API process per journal directory
+    fcntl = None
+
+QUIZ_RESULT_WRITE_MODES = ("direct", "write_behind")
+MAX_JOURNAL_SLOTS = 64
+
+
+class QuizResultWriterFull(Exception):
+    """Raised when max_pending results are already waiting to be stored."""
+
+
+class DirectQuizResultWriter:
+    """Stores each result before the endpoint answers (the original behaviour)."""
+
+    def __init__(self, db_service):
+        self.db_service = db_service
+
+    def start(self) -> None:
+        pass
+
+    async def save(self, result_data: dict) -> Dict:
+        return await self.db_service.save_quiz_result(result_data)
+
+    def close(self, timeout: float = 30.0) -> None:
+        pass
+
+    def get_stats(self) -> Dict:
+        return {"mode": "direct"}
+
+
+class WriteBehindQuizResultWriter:
+    """
+    Journals each result and acknowledges it; a background thread stores the pending
+    results in batches of up to `batch_size`, as soon as that many are queued or every
+    `flush_interval_seconds` otherwise. Failed batches stay queued and are retried with
+    backoff (up to `retry_max_seconds` apart). A stored result can take up to one flush
+    interval to appear in the history and dashboard endpoints.
+    """
+
+    def __init__(self, storage_service, journal_dir: str, batch_size: int = 200, flush_interval_seconds: float = 0.25,
+                 max_pending: int = 10000, retry_max_seconds: float = 30.0, journal_compact_bytes: int = 64 * 1024 * 1024):
+        self.storage_service = storage_service
+        self.journal_dir = journal_dir
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_seconds = max(0.01, flush_interval_seconds)
+        self.max_pending = max(1, max_pending)
+        self.retry_max_seconds = retry_max_seconds
+        self.journal_compact_bytes = max(1, journal_compact_bytes)
+
+        # _lock guards the pending list and journal appends; _sync_lock serializes fsyncs
+        # and journal truncation (always taken before _lock, never while holding it).
+        # Pending entries are (seq, document, offset of the entry in the journal).
+        self._lock = threading.Condition()
+        self._sync_lock = threading.Lock()
+        self._pending: List[Tuple[int, Dict[str, Any], int]] = []
+        self._next_seq = 1
+        self._journal = None
+        self._journal_generation = 0
+        self._written_offset = 0
+        self._synced_offset = 0
+        self._slot_lock_file = None
+        self.journal_path: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._closing_event = threading.Event()
+
+        self._queued = 0
+        self._replayed = 0
+        self._stored = 0
+        self._skipped = 0
+        self._batches = 0
+        self._compactions = 0
+        self._failed_batches = 0
+        self._rejected = 0
+        self._peak_pending = 0
+        self._last_batch_ms: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    # --- Journal ---
+
+    def _claim_journal_slot(self) -> str:
+        os.makedirs(self.journal_dir, exist_ok=True)
+        if fcntl is None:
+            return os.path.join(self.journal_dir, "quiz_results-0.journal")
+        for slot in range(MAX_JOURNAL_SLOTS):
+            lock_file = open(os.path.join(self.journal_dir, f"quiz_results-{slot}.lock"), "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._slot_lock_file = lock_file
+            return os.path.join(self.journal_dir, f"quiz_results-{slot}.journal")
+        raise RuntimeError(f"All {MAX_JOURNAL_SLOTS} quiz result journal slots in '{self.journal_dir}' are in use.")
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self.journal_path + ".checkpoint") as checkpoint_file:
+                return int(checkpoint_file.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_checkpoint(self, seq: int) -> None:
+        temporary_path = self.journal_path + ".checkpoint.tmp"
+        with open(temporary_path, "w") as checkpoint_file:
+            checkpoint_file.write(str(seq))
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.journal_path + ".checkpoint")
+
+    def _load_journal(self) -> None:
+        """Queues the journal entries that were not stored yet; a torn last line (crash mid-append) is dropped."""
+        checkpoint = self._read_checkpoint()
+        self._next_seq = checkpoint + 1
+        if not os.path.exists(self.journal_path):
+            return
+        valid_bytes = 0
+        with open(self.journal_path, "rb") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                self._next_seq = max(self._next_seq, entry["seq"] + 1)
+                if entry["seq"] > checkpoint:
+                    self._pending.append((entry["seq"], entry["document"], valid_bytes))
+                valid_bytes += len(line)
+        if valid_bytes != os.path.getsize(self.journal_path):
+            print(f"Warning: Dropping a torn entry at the end of quiz result journal '{self.journal_path}'.")
+            os.truncate(self.journal_path, valid_bytes)
+        self._replayed = len(self._pending)
+        if self._pending:
+            print(f"Replaying {len(self._pending)} quiz results from journal '{self.journal_path}'.")
+
+    def start(self) -> None:
+        """Opens the journal, queues what it still holds and starts the flush thread. Safe to call repeatedly."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.journal_path = self._claim_journal_slot()
+            self._load_journal()
+            self._journal = open(self.journal_path, "ab")
+            self._written_offset = self._synced_offset = self._journal.tell()
+            self._thread = threading.Thread(target=self._run, name="quiz-result-writer", daemon=True)
+            self._thread.start()
+
+    def _sync_journal(self, generation: int, offset: int) -> None:
+        with self._sync_lock:
+            # A truncated journal means the entry was already stored
+            if generation != self._journal_generation or offset <= self._synced_offset:
+                return
+            # One fsync covers every entry appended so far, not just this one
+            with self._lock:
+                written_offset = self._written_offset
+            os.fsync(self._journal.fileno())
+            self._synced_offset = written_offset
+
+    def _compact_journal(self) -> None:
+        """Rewrites the journal without its stored prefix. Called holding _sync_lock and _lock."""
+        start = self._pending[0][2]
+        temporary_path = self.journal_path + ".tmp"
+        with open(self.journal_path, "rb") as journal, open(temporary_path, "wb") as compacted:
+            journal.seek(start)
+            shutil.copyfileobj(journal, compacted)
+            compacted.flush()
+            os.fsync(compacted.fileno())
+        os.replace(temporary_path, self.journal_path)
+        self._journal.close()
+        self._journal = open(self.journal_path, "ab")
+        self._pending = [(seq, document, offset - start) for seq, document, offset in self._pending]
+        # Every entry in the new journal is synced: submissions waiting for an fsync can return
+        self._journal_generation += 1
+        self._written_offset = self._synced_offset = self._journal.tell()
+        self._compactions += 1
+
+    # --- Queueing ---
+
+    def save_sync(self, result_data: dict) -> Dict:
+        """Journals the result (durably) and queues it. Raises QuizResultWriterFull when max_pending results are waiting."""
+        self.start()
+        document = build_quiz_result_document(result_data)
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._rejected += 1
+                raise QuizResultWriterFull(f"{len(self._pending)} quiz results already waiting to be stored")
+            seq = self._next_seq
+            self._next_seq += 1
+            entry_offset = self._written_offset
+            self._journal.write(json.dumps({"seq": seq, "document": document}).encode("utf-8") + b"\n")
+            self._journal.flush()
+            self._written_offset = self._journal.tell()
+            generation, offset = self._journal_generation, self._written_offset
+            self._pending.append((seq, document, entry_offset))
+            self._queued += 1
+            self._peak_pending = max(self._peak_pending, len(self._pending))
+            if len(self._pending) >= self.batch_size:
+                self._lock.notify()
+        self._sync_journal(generation, offset)
+        return {"status": "success", "message": "Quiz result queued."}
+
+    async def save(self, result_data: dict) -> Dict:
+        return await run_in_threadpool(self.save_sync, result_data)
+
+    # --- Flushing ---
+
+    def _run(self) -> None:
+        retry_delay = self.flush_interval_seconds
+        while True:
+            with self._lock:
+                if not self._closing and len(self._pending) < self.batch_size:
+                    self._lock.wait(timeout=self.flush_interval_seconds)
+                if self._closing and not self._pending:
+                    return
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = self.storage_service.save_quiz_result_documents([document for _, document, _ in batch])
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            if result.get("status") != "success":
+                with self._lock:
+                    self._failed_batches += 1
+                    self._last_error = result.get("message")
+                    if self._closing:
+                        # Left in the journal; stored by the next process that claims this slot
+                        print(f"Warning: {len(self._pending)} quiz results not stored at shutdown; they stay in '{self.journal_path}'.")
+                        return
+                print(f"Error storing a batch of {len(batch)} quiz results: {result.get('message')}. Retrying in {retry_delay:.2f}s.")
+                self._closing_event.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, self.retry_max_seconds)
+                continue
+            retry_delay = self.flush_interval_seconds
+
+            self._write_checkpoint(batch[-1][0])
+            with self._sync_lock, self._lock:
+                del self._pending[:len(batch)]
+                self._stored += result.get("inserted", len(batch))
+                self._skipped += result.get("skipped", 0)
+                self._batches += 1
+                self._last_batch_ms = round((time.perf_counter() - start) * 1000, 1)
+                self._last_error = None
+                if not self._pending:
+                    # Everything journaled is stored: start the journal over
+                    self._journal.truncate(0)
+                    self._journal_generation += 1
+                    self._written_offset = self._synced_offset = 0
+                elif self._written_offset >= self.journal_compact_bytes:
+                    self._compact_journal()
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Stores what is still pending (waiting up to `timeout` seconds) and closes the journal."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._closing = True
+            self._closing_event.set()
+            self._lock.notify()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"Warning: Quiz result writer did not drain within {timeout}s; pending results stay in '{self.journal_path}'.")
+            return
+        with self._sync_lock, self._lock:
+            self._journal.close()
+            if self._slot_lock_file is not None:
+                self._slot_lock_file.close()
+            self._thread = None
+            self._closing = False
+            self._closing_event.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": "write_behind",
+                "journal_path": self.journal_path,
+                "batch_size": self.batch_size,
+                "flush_interval_seconds": self.flush_interval_seconds,
+                "max_pending": self.max_pending,
+                "pending": len(self._pending),
+                "peak_pending": self._peak_pending,
+                "queued": self._queued,
+                "replayed": self._replayed,
+                "stored": self._stored,
+                "skipped_already_stored": self._skipped,
+                "batches": self._batches,
+                "journal_bytes": self._written_offset,
+                "journal_compactions": self._compactions,
+                "failed_batches": self._failed_batches,
+                "rejected": self._rejected,
+                "last_batch_ms": self._last_batch_ms,
+                "last_error": self._last_error,
+            }
+
+
+def create_quiz_result_writer(mode: str, db_service, storage_service, journal_dir: str, batch_size: int,
+                              flush_interval_seconds: float, max_pending: int, journal_compact_bytes: int = 64 * 1024 * 1024):
+    """Builds the writer selected by QUIZ_RESULT_WRITE_MODE ("direct" or "write_behind")."""
+    if mode == "write_behind":
+        return WriteBehindQuizResultWriter(storage_service, journal_dir, batch_size=batch_size,
+                                           flush_interval_seconds=flush_interval_seconds, max_pending=max_pending,
+                                           journal_compact_bytes=journal_compact_bytes)
+    if mode != "direct":
+        print(f"Warning: Unknown QUIZ_RESULT_WRITE_MODE '{mode}'. Using 'direct'.")
+    return DirectQuizResultWriter(db_service)
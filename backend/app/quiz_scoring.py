@@ -0,0 +1,191 @@
+# backend/app/quiz_scoring.py
+# Scoring shared by unit and grand quizzes. One pass over the questions produces all three
+# things a submission needs:
+#
+#   result                 the API response (scores and per-question detailed_results)
+#   performance_breakdown  the per-question rows stored with the quiz result
+#   scoring_summary        the stored summary (scores, difficulty/type counts, topics covered)
+#
+# build_quiz_result_document keeps a scoring_summary it is given, so the storage layer does
+# not loop over the breakdown again; summarize_performance covers documents without one.
+# rescore_performance re-marks stored breakdowns (scripts/rescore_quiz_results.py).
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .metrics import timed_stage
+
+# Marks per question by difficulty type, as assigned by TemplateIndex.select_for_quota
+MARKS_BY_DIFFICULTY_TYPE = {"direct": 1, "aptitude": 2, "logical reasoning": 2}
+# Breakdown fields copied from the question template
+TEMPLATE_FIELDS = ("topic_name", "subtopic_name", "difficulty_level", "difficulty_type")
+
+
+@dataclass
+class ScoredQuiz:
+    result: Dict[str, Any]
+    performance_breakdown: List[Dict[str, Any]] = field(default_factory=list)
+    scoring_summary: Dict[str, Any] = field(default_factory=dict)
+
+
+def _scoring_summary(total_score, max_score, correct_answers, total_questions,
+                     difficulty_counts, type_counts, topics, subtopics) -> Dict[str, Any]:
+    return {
+        "total_score": total_score,
+        "max_score": max_score,
+        "correct_answers_count": correct_answers,
+        "total_questions": total_questions,
+        "difficulty_breakdown": difficulty_counts,
+        "type_breakdown": type_counts,
+        "topics_covered": list(topics),
+        "subtopics_covered": list(subtopics)
+    }
+
+
+@timed_stage("quiz_scoring")
+def score_quiz(quiz_questions: List[Dict], student_answers: List[Optional[int]]) -> ScoredQuiz:
+    """Scores the answers against the quiz and builds the stored breakdown and summary in the same pass."""
+    if not quiz_questions:
+        return ScoredQuiz({
+            "total_score": 0, "max_score": 0, "correct_answers_count": 0,
+            "total_questions": 0, "detailed_results": [], "error": "No questions in the quiz to score."
+        })
+    if len(quiz_questions) != len(student_answers):
+        return ScoredQuiz({"error": "Mismatch between number of questions and answers."})
+
+    total_score = 0
+    max_score = 0
+    correct_answers_count = 0
+    detailed_results = []
+    performance_breakdown = []
+    difficulty_counts = {}
+    type_counts = {}
+    # dicts rather than sets: deduplicated, in the order the topics first appear
+    topics = {}
+    subtopics = {}
+
+    for question, student_answer_index in zip(quiz_questions, student_answers):
+        question_marks = question.get("marks", 1)
+        max_score += question_marks
+        correct_answer_index = question.get("correct_answer_index")
+        options = question.get("options")
+
+        is_correct = student_answer_index is not None and \
+            0 <= student_answer_index < len(options or []) and \
+            student_answer_index == correct_answer_index
+        marks_obtained = question_marks if is_correct else 0
+        if is_correct:
+            correct_answers_count += 1
+            total_score += question_marks
+
+        detailed_results.append({
+            "question_id": question.get("id"),
+            "question_text": question.get("question_text"),
+            "options": options,
+            "student_answer_index": student_answer_index,
+            "correct_answer_index": correct_answer_index,
+            "is_correct": is_correct,
+            "marks_obtained": marks_obtained,
+            "marks_possible": question_marks,
+            "explanation": question.get("explanation")
+        })
+
+        topic_name = question.get("topic_name")
+        subtopic_name = question.get("subtopic_name")
+        difficulty_level = question.get("difficulty_level")
+        difficulty_type = question.get("difficulty_type")
+        performance_breakdown.append({
+            "template_id": question.get("id"),
+            "topic_name": topic_name,
+            "subtopic_name": subtopic_name,
+            "difficulty_level": difficulty_level,
+            "difficulty_type": difficulty_type,
+            "is_correct": is_correct,
+            "marks_obtained": marks_obtained,
+            "marks_possible": question_marks
+        })
+        difficulty_counts[difficulty_level] = difficulty_counts.get(difficulty_level, 0) + 1
+        type_counts[difficulty_type] = type_counts.get(difficulty_type, 0) + 1
+        if topic_name: topics[topic_name] = None
+        if subtopic_name: subtopics[subtopic_name] = None
+
+    result = {
+        "total_score": total_score,
+        "max_score": max_score,
+        "correct_answers_count": correct_answers_count,
+        "total_questions": len(quiz_questions),
+        "detailed_results": detailed_results
+    }
+    summary = _scoring_summary(total_score, max_score, correct_answers_count, len(quiz_questions),
+                               difficulty_counts, type_counts, topics, subtopics)
+    return ScoredQuiz(result, performance_breakdown, summary)
+
+
+def summarize_performance(performance: List[Dict]) -> Dict[str, Any]:
+    """The scoring_summary of an already scored performance_breakdown, in one pass."""
+    total_score = 0
+    max_score = 0
+    correct_answers = 0
+    difficulty_counts = {}
+    type_counts = {}
+    topics = {}
+    subtopics = {}
+
+    for q in performance:
+        total_score += q.get("marks_obtained", 0)
+        max_score += q.get("marks_possible", 0)
+        if q.get("is_correct"): correct_answers += 1
+        difficulty = q.get("difficulty_level", "unknown")
+        dtype = q.get("difficulty_type", "unknown")
+        difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + 1
+        type_counts[dtype] = type_counts.get(dtype, 0) + 1
+        if q.get("topic_name"): topics[q["topic_name"]] = None
+        if q.get("subtopic_name"): subtopics[q["subtopic_name"]] = None
+
+    return _scoring_summary(total_score, max_score, correct_answers, len(performance),
+                            difficulty_counts, type_counts, topics, subtopics)
+
+
+def rescore_performance(performance: List[Dict], templates_by_id: Optional[Dict[str, Dict]] = None,
+                        marks_by_type: Optional[Dict[str, int]] = None) -> List[Dict]:
+    """
+    A stored performance_breakdown re-marked under the current rules: template fields taken
+    from `templates_by_id` (rows whose template is gone keep theirs), marks_possible from
+    `marks_by_type` (other types keep theirs) and marks_obtained from is_correct. Answers are
+    not stored, so is_correct itself cannot be re-evaluated.
+    """
+    rescored = []
+    for row in performance:
+        row = dict(row)
+        template = templates_by_id.get(row.get("template_id") or row.get("question_id")) if templates_by_id else None
+        if template is not None:
+            for field_name in TEMPLATE_FIELDS:
+                row[field_name] = template.get(field_name)
+        if marks_by_type and row.get("difficulty_type") in marks_by_type:
+            row["marks_possible"] = marks_by_type[row["difficulty_type"]]
+        row["marks_obtained"] = row.get("marks_possible", 0) if row.get("is_correct") else 0
+        rescored.append(row)
+    return rescored
+
+
+if __name__ == "__main__":
+    questions = [
+        {"id": "t1", "options": ["a", "b", "c"], "correct_answer_index": 1, "marks": 1, "topic_name": "Mean",
+         "subtopic_name": "Arithmetic", "difficulty_level": "easy", "difficulty_type": "direct"},
+        {"id": "t2", "options": ["a", "b"], "correct_answer_index": 0, "marks": 2, "topic_name": "Mean",
+         "subtopic_name": "Weighted", "difficulty_level": "hard", "difficulty_type": "aptitude"},
+        {"id": "t3", "options": ["a", "b"], "correct_answer_index": 0, "marks": 1, "topic_name": "Median",
+         "subtopic_name": None, "difficulty_level": "easy", "difficulty_type": "direct"},
+    ]
+    scored = score_quiz(questions, [1, 1, None])
+    assert (scored.result["total_score"], scored.result["max_score"], scored.result["correct_answers_count"]) == (1, 4, 1)
+    assert [row["is_correct"] for row in scored.performance_breakdown] == [True, False, False]
+    assert scored.scoring_summary["difficulty_breakdown"] == {"easy": 2, "hard": 1}
+    assert scored.scoring_summary["topics_covered"] == ["Mean", "Median"]
+    assert summarize_performance(scored.performance_breakdown) == scored.scoring_summary
+    remarked = rescore_performance(scored.performance_breakdown, {"t3": {"topic_name": "Mode", "difficulty_level": "medium",
+                                                                         "difficulty_type": "aptitude"}}, MARKS_BY_DIFFICULTY_TYPE)
+    assert [(row["marks_possible"], row["marks_obtained"]) for row in remarked] == [(1, 1), (2, 0), (2, 0)]
+    assert remarked[2]["topic_name"] == "Mode" and scored.performance_breakdown[2]["topic_name"] == "Median"
+    assert "error" in score_quiz(questions, [1]).result
+    assert score_quiz([], []).result["total_questions"] == 0
+    print("✅ quiz_scoring self-check passed")
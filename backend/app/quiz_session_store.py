@@ -0,0 +1,155 @@
+# backend/app/quiz_session_store.py
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+
+class InMemoryQuizSessionStore:
+    """
+    Keeps every generated quiz server-side under a random session id, so a submission
+    only has to carry the session id and the answer indices. Sessions expire after
+    `ttl_seconds`; expired ones are dropped lazily whenever a new session is created.
+
+    Sessions live in this process only. Use MongoQuizSessionStore when the API runs as
+    several workers or serverless instances that do not share memory.
+    """
+
+    def __init__(self, ttl_seconds: int = 10800):
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        # (expires_at, session_id) in creation order; the TTL is fixed, so this is also expiry order
+        self._expiry_order: deque = deque()
+        self._lock = threading.Lock()
+
+    def create(self, student_id: str, quiz_type: str, quiz_name: str, questions: List[Dict[str, Any]]) -> str:
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        record = {
+            "student_id": student_id,
+            "quiz_type": quiz_type,
+            "quiz_name": quiz_name,
+            "questions": questions,
+            "expires_at": now + self.ttl_seconds,
+        }
+        with self._lock:
+            self._purge_expired(now)
+            self._sessions[session_id] = record
+            self._expiry_order.append((record["expires_at"], session_id))
+        return session_id
+
+    def get(self, session_id: str, student_id: str, quiz_type: str) -> Optional[Dict[str, Any]]:
+        """Returns the session if it exists, has not expired and belongs to this student and quiz type."""
+        with self._lock:
+            record = self._sessions.get(session_id)
+        if not self._matches(record, student_id, quiz_type):
+            return None
+        return record
+
+    def pop(self, session_id: str, student_id: str, quiz_type: str) -> Optional[Dict[str, Any]]:
+        """Like get(), but also removes the session so that a quiz can only be submitted once."""
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if not self._matches(record, student_id, quiz_type):
+                return None
+            del self._sessions[session_id]
+        return record
+
+    def count(self) -> int:
+        with self._lock:
+            self._purge_expired(time.time())
+            return len(self._sessions)
+
+    @staticmethod
+    def _matches(record: Optional[Dict[str, Any]], student_id: str, quiz_type: str) -> bool:
+        return (record is not None
+                and record["expires_at"] > time.time()
+                and record["student_id"] == student_id
+                and record["quiz_type"] == quiz_type)
+
+    def _purge_expired(self, now: float) -> None:
+        while self._expiry_order and self._expiry_order[0][0] <= now:
+            _, session_id = self._expiry_order.popleft()
+            record = self._sessions.get(session_id)
+            if record is not None and record["expires_at"] <= now:
+                del self._sessions[session_id]
+
+
+class MongoQuizSessionStore:
+    """
+    Same interface as InMemoryQuizSessionStore, backed by the `quiz_sessions` collection
+    so that every API instance sees the same sessions. MongoDB's TTL monitor deletes
+    expired documents; reads also filter on expires_at since that monitor only runs
+    about once a minute.
+    """
+
+    def __init__(self, database, ttl_seconds: int = 10800):
+        self.ttl_seconds = ttl_seconds
+        self.collection = database.quiz_sessions
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def create(self, student_id: str, quiz_type: str, quiz_name: str, questions: List[Dict[str, Any]]) -> str:
+        session_id = uuid.uuid4().hex
+        self.collection.insert_one({
+            "_id": session_id,
+            "student_id": student_id,
+            "quiz_type": quiz_type,
+            "quiz_name": quiz_name,
+            "questions": questions,
+            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+        })
+        return session_id
+
+    def _query(self, session_id: str, student_id: str, quiz_type: str) -> Dict[str, Any]:
+        return {"_id": session_id, "student_id": student_id, "quiz_type": quiz_type,
+                "expires_at": {"$gt": datetime.utcnow()}}
+
+    def get(self, session_id: str, student_id: str, quiz_type: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one(self._query(session_id, student_id, quiz_type))
+
+    def pop(self, session_id: str, student_id: str, quiz_type: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one_and_delete(self._query(session_id, student_id, quiz_type))
+
+    def count(self) -> int:
+        return self.collection.count_documents({"expires_at": {"$gt": datetime.utcnow()}})
+
+
+def create_quiz_session_store(backend: str, ttl_seconds: int, database_service=None):
+    """
+    Builds the store selected by QUIZ_SESSION_BACKEND ("auto", "mongo" or "memory"). "auto"
+    keeps sessions in MongoDB whenever it is the storage backend, so a quiz can be submitted
+    to any instance (serverless deployments route each request to whichever is free); the
+    in-memory store, valid only within one process, must be asked for explicitly, and is the
+    fallback when MongoDB is not connected.
+    """
+    mongo_connected = database_service is not None and database_service.storage_backend == "mongo" \
+        and database_service.client is not None
+    if backend in ("auto", "mongo"):
+        if mongo_connected:
+            return MongoQuizSessionStore(database_service.db, ttl_seconds=ttl_seconds)
+        if backend == "mongo" or (database_service is not None and database_service.storage_backend == "mongo"):
+            print("Warning: MongoDB is not connected. Using the in-memory quiz session store; "
+                  "quizzes can only be submitted to the process that generated them.")
+    elif backend != "memory":
+        print(f"Warning: Unknown QUIZ_SESSION_BACKEND '{backend}'. Using the in-memory quiz session store.")
+    return InMemoryQuizSessionStore(ttl_seconds=ttl_seconds)
+
+
+# --- Example Usage (for testing this file directly) ---
+if __name__ == "__main__":
+    store = InMemoryQuizSessionStore(ttl_seconds=1)
+    questions = [{"id": "Q1", "correct_answer_index": 2}]
+    sid = store.create("alice", "Unit-Quizzes", "Unit 1", questions)
+    assert store.get(sid, "alice", "Unit-Quizzes")["questions"] == questions
+    assert store.get(sid, "bob", "Unit-Quizzes") is None, "Sessions must be bound to their student"
+    assert store.get(sid, "alice", "Grand-Quiz") is None, "Sessions must be bound to their quiz type"
+    assert store.pop(sid, "alice", "Unit-Quizzes") is not None
+    assert store.pop(sid, "alice", "Unit-Quizzes") is None, "A session can only be submitted once"
+
+    expiring = store.create("alice", "Grand-Quiz", "Grand Quiz", questions)
+    time.sleep(1.1)
+    assert store.get(expiring, "alice", "Grand-Quiz") is None, "Expired sessions must not be returned"
+    assert store.count() == 0
+    print("In-memory quiz session store checks passed.")
@@ -0,0 +1,547 @@
+# backend/app/sqlite_database_service.py
+# Embedded storage backend: the same methods and return values as DatabaseService, on a
+# local SQLite file (STORAGE_BACKEND=sqlite, file taken from DATABASE_URL). Meant for
+# small single-node deployments and for running the API or benchmarks without MongoDB.
+#
+#   quiz_results     one row per quiz result; the fields queried on are columns (indexed
+#                    like the MongoDB collection), scoring_summary and performance_breakdown
+#                    are JSON text
+#   users            unique username / email
+#   student_rollups  the student_rollup.py document of each student, as JSON text, updated
+#                    in the same transaction as the quiz result it counts
+#
+# The database runs in WAL mode, so readers never wait for the single writer. Each thread
+# has its own connection, and every statement is a constant SQL string with ? parameters,
+# which sqlite3 keeps prepared in the connection's statement cache.
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .auth_cache import auth_cache
+from .metrics import instrument_storage_methods
+from .password_hasher import password_hasher
+from .dashboard_engine import compute_learner_performance_averages
+from .quiz_result_documents import build_quiz_result_document, period_start_timestamp
+from .student_rollup import (
+    build_rollup_increments_by_student,
+    build_rollup_document,
+    apply_rollup_increments,
+    rollup_dashboard_grid,
+    rollup_history_summary,
+)
+
+# Columns of quiz_results, in the field order of build_quiz_result_document
+RESULT_COLUMNS = (
+    "path", "student_id", "subject", "quiz_type", "quiz_name", "timestamp",
+    "performance_breakdown", "time_taken_seconds", "scoring_summary",
+)
+JSON_COLUMNS = ("performance_breakdown", "scoring_summary")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_results (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    subject TEXT,
+    quiz_type TEXT,
+    quiz_name TEXT,
+    timestamp TEXT NOT NULL,
+    performance_breakdown TEXT NOT NULL,
+    time_taken_seconds NUMERIC,
+    scoring_summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS student_rollups (
+    student_id TEXT PRIMARY KEY,
+    rollup TEXT NOT NULL
+);
+"""
+
+# The same query shapes as QUIZ_RESULTS_INDEXES in database_service.py
+SQLITE_INDEXES = {
+    "quiz_results_path": "CREATE INDEX IF NOT EXISTS quiz_results_path ON quiz_results (path)",
+    "quiz_results_student_timestamp":
+        "CREATE INDEX IF NOT EXISTS quiz_results_student_timestamp ON quiz_results (student_id, timestamp DESC)",
+    "quiz_results_student_quiz_timestamp":
+        "CREATE INDEX IF NOT EXISTS quiz_results_student_quiz_timestamp ON quiz_results (student_id, quiz_name, timestamp DESC)",
+    "quiz_results_student_type_quiz":
+        "CREATE INDEX IF NOT EXISTS quiz_results_student_type_quiz ON quiz_results (student_id, quiz_type, quiz_name)",
+}
+
+INSERT_RESULT_SQL = f"INSERT INTO quiz_results ({', '.join(RESULT_COLUMNS)}) VALUES ({', '.join('?' * len(RESULT_COLUMNS))})"
+INSERT_USER_SQL = "INSERT INTO users (username, email, password_hash, created_at) VALUES (?, ?, ?, ?)"
+SELECT_USER_SQL = "SELECT username, email, password_hash, created_at FROM users WHERE username = ?"
+SELECT_ROLLUP_SQL = "SELECT rollup FROM student_rollups WHERE student_id = ?"
+REPLACE_ROLLUP_SQL = "INSERT OR REPLACE INTO student_rollups (student_id, rollup) VALUES (?, ?)"
+LEARNER_FEATURE_SQL = """
+SELECT student_id, time_taken_seconds,
+       json_extract(scoring_summary, '$.correct_answers_count'), json_extract(scoring_summary, '$.total_questions')
+FROM quiz_results"""
+
+
+def sqlite_path_from_url(database_url: str) -> str:
+    """The file of a SQLAlchemy-style URL: sqlite:///relative/app.db or sqlite:////absolute/app.db."""
+    if not database_url.startswith("sqlite:///"):
+        raise ValueError(f"Not a SQLite DATABASE_URL: '{database_url}'")
+    path = database_url[len("sqlite:///"):]
+    if not path or path == ":memory:":
+        raise ValueError("SQLite storage needs a database file; in-memory databases are not shared between threads.")
+    return path
+
+
+def duplicate_sqlite_user_error(error: sqlite3.IntegrityError) -> Dict:
+    """Maps a UNIQUE constraint violation on users to create_user's error message."""
+    if "users.email" in str(error):
+        return {"status": "error", "message": "Email already registered."}
+    return {"status": "error", "message": "Username already exists."}
+
+
+def _projection_tree(fields: Dict[str, Any]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+            if node is True:
+                break
+        else:
+            node[leaf] = True
+    return tree
+
+_OMIT = object()
+
+def _include(value: Any, tree: Any) -> Any:
+    if tree is True:
+        return value
+    if isinstance(value, dict):
+        included = {key: _include(item, tree[key]) for key, item in value.items() if key in tree}
+        return {key: item for key, item in included.items() if item is not _OMIT}
+    if isinstance(value, list):
+        # Like MongoDB, sub-field projections keep only the embedded documents of an array
+        return [_include(item, tree) for item in value if isinstance(item, (dict, list))]
+    return _OMIT
+
+def _exclude(value: Any, tree: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: (item if key not in tree else _exclude(item, tree[key])) for key, item in value.items() if tree.get(key) is not True}
+    if isinstance(value, list):
+        return [_exclude(item, tree) for item in value]
+    return value
+
+def apply_projection(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Applies a MongoDB find() projection (inclusion or exclusion, dotted paths, "_id": 0)
+    to a stored quiz result, so callers can pass the same projections to every backend.
+    """
+    fields = {path: value for path, value in (projection or {}).items() if path != "_id"}
+    if not fields:
+        return document
+    if any(fields.values()):
+        return _include(document, _projection_tree(fields))
+    return _exclude(document, _projection_tree(fields))
+
+def projection_columns(projection: Optional[Dict[str, Any]]) -> Tuple[str, ...]:
+    """The quiz_results columns a projection reads, so unneeded JSON columns are neither fetched nor decoded."""
+    fields = {path: value for path, value in (projection or {}).items() if path != "_id"}
+    if not fields:
+        return RESULT_COLUMNS
+    top_level = {path.split(".")[0] for path in fields}
+    if any(fields.values()):
+        return tuple(column for column in RESULT_COLUMNS if column in top_level)
+    # Exclusion: only whole top-level fields can be skipped
+    excluded = {path for path, value in fields.items() if "." not in path}
+    return tuple(column for column in RESULT_COLUMNS if column not in excluded)
+
+
+def select_results_sql(columns: Tuple[str, ...]) -> str:
+    return f"SELECT {', '.join(columns)} FROM quiz_results"
+
+
+@instrument_storage_methods("sqlite")
+class SQLiteDatabaseService:
+    storage_backend = "sqlite"
+
+    def __init__(self, database_url: str):
+        self.database_path = sqlite_path_from_url(database_url)
+        self._local = threading.local()
+        self._connections_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        # The UNIQUE constraints are part of the schema; see DatabaseService.unique_user_indexes
+        self.unique_user_indexes = True
+
+        try:
+            print(f"Opening SQLite database '{self.database_path}'...")
+            directory = os.path.dirname(os.path.abspath(self.database_path))
+            os.makedirs(directory, exist_ok=True)
+            # `client` follows DatabaseService: None means storage is unavailable
+            self.client = self._connection()
+            self.client.execute("PRAGMA journal_mode=WAL")
+            self.ensure_indexes()
+            print("✅ SQLite database ready.")
+        except (sqlite3.Error, OSError) as e:
+            print(f"❌ SQLite database could not be opened: {e}")
+            self.client = None
+
+    def _open_connection(self) -> sqlite3.Connection:
+        # Autocommit mode: writes open their transaction explicitly with BEGIN IMMEDIATE
+        connection = sqlite3.connect(self.database_path, timeout=5.0, isolation_level=None,
+                                     check_same_thread=False, cached_statements=256)
+        connection.execute("PRAGMA synchronous=NORMAL")  # durable in WAL mode up to the last checkpoint
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection; opened on first use by each threadpool thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._open_connection()
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def ensure_indexes(self) -> bool:
+        """Creates the tables and indexes if needed and verifies that every index exists."""
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        for statement in SQLITE_INDEXES.values():
+            connection.execute(statement)
+        existing = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        missing = [name for name in SQLITE_INDEXES if name not in existing]
+        if missing:
+            print(f"Warning: Missing SQLite indexes: {', '.join(missing)}")
+        else:
+            print("✅ SQLite indexes verified.")
+        return not missing
+
+    # --- Users ---
+
+    def create_user(self, username: str, email: str, password: str):
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        return self.insert_user(username, email, password_hasher.hash_sync(password))
+
+    def find_duplicate_user(self, username: str, email: str) -> Optional[Dict]:
+        # The UNIQUE constraints report duplicates on insert
+        return None
+
+    def insert_user(self, username: str, email: str, hashed_password: str):
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        try:
+            self._connection().execute(INSERT_USER_SQL, (username, email, hashed_password, datetime.now().isoformat()))
+            return {"status": "success", "message": "User created successfully."}
+        except sqlite3.IntegrityError as e:
+            return duplicate_sqlite_user_error(e)
+        except sqlite3.Error:
+            return {"status": "error", "message": "Could not create user."}
+
+    def authenticate_user(self, username: str, password: str):
+        user = self.get_user(username)
+        if not user or not password_hasher.verify_sync(password, user["password_hash"]):
+            return False
+        return user
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        if self.client is None:
+            return None
+        row = self._connection().execute(SELECT_USER_SQL, (username,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("username", "email", "password_hash", "created_at"), row))
+
+    def check_username_exists(self, username: str) -> bool:
+        if self.client is None:
+            return False
+        return self._connection().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def delete_user(self, username: str) -> bool:
+        if self.client is None:
+            return False
+        deleted = self._connection().execute("DELETE FROM users WHERE username = ?", (username,)).rowcount
+        auth_cache.invalidate_user(username)
+        return deleted > 0
+
+    def check_email_exists(self, email: str) -> bool:
+        if self.client is None:
+            return False
+        return self._connection().execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone() is not None
+
+    # --- Quiz results and rollups ---
+
+    def _result_documents(self, sql: str, parameters: Tuple, columns: Tuple[str, ...] = RESULT_COLUMNS,
+                          projection: Optional[Dict] = None, connection: Optional[sqlite3.Connection] = None) -> Iterator[Dict]:
+        """Runs a `SELECT <columns> FROM quiz_results ...` statement and yields the rows as quiz result documents."""
+        json_positions = [i for i, column in enumerate(columns) if column in JSON_COLUMNS]
+        for row in (connection or self._connection()).execute(sql, parameters):
+            row = list(row)
+            for i in json_positions:
+                row[i] = json.loads(row[i])
+            document = dict(zip(columns, row))
+            yield apply_projection(document, projection) if projection else document
+
+    def get_user_quiz_history_summary(self, username: str) -> dict:
+        if self.client is None:
+            return {'unique_unit_quizzes_attempted': 0}
+        rollup = self.get_student_rollup(username)
+        if rollup is not None:
+            return rollup_history_summary(rollup)
+        row = self._connection().execute(
+            "SELECT COUNT(DISTINCT quiz_name) FROM quiz_results WHERE student_id = ? AND quiz_type = 'Unit-Quizzes'", (username,)
+        ).fetchone()
+        return {'unique_unit_quizzes_attempted': row[0]}
+
+    def save_quiz_result(self, result_data: dict):
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        if self.save_quiz_result_documents([build_quiz_result_document(result_data)])["status"] != "success":
+            return {"status": "error", "message": "Could not save quiz result."}
+        return {"status": "success", "message": "Quiz result saved with structured path."}
+
+    def save_quiz_result_documents(self, documents: List[Dict]) -> Dict:
+        """
+        Same as DatabaseService.save_quiz_result_documents. The results and their rollup
+        increments are committed in one transaction, so skipping already stored paths is
+        enough to make a replayed batch harmless.
+        """
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        try:
+            with self._transaction() as connection:
+                paths = [document["path"] for document in documents]
+                stored_paths = set()
+                for start in range(0, len(paths), 500):
+                    chunk = paths[start:start + 500]
+                    stored_paths.update(row[0] for row in connection.execute(
+                        f"SELECT path FROM quiz_results WHERE path IN ({', '.join('?' * len(chunk))})", chunk))
+                new_documents = [document for document in documents if document["path"] not in stored_paths]
+                connection.executemany(INSERT_RESULT_SQL, (
+                    tuple(json.dumps(document[column]) if column in JSON_COLUMNS else document[column] for column in RESULT_COLUMNS)
+                    for document in new_documents
+                ))
+                for student_id, increments in build_rollup_increments_by_student(new_documents).items():
+                    row = connection.execute(SELECT_ROLLUP_SQL, (student_id,)).fetchone()
+                    if row is not None:
+                        rollup = apply_rollup_increments(json.loads(row[0]), increments)
+                    else:
+                        # First rollup of this student: count any older results as well
+                        rollup = build_rollup_document(student_id, self._result_documents(
+                            select_results_sql(RESULT_COLUMNS) + " WHERE student_id = ?", (student_id,)))
+                    connection.execute(REPLACE_ROLLUP_SQL, (student_id, json.dumps(rollup)))
+        except sqlite3.Error as e:
+            print(f"Error saving {len(documents)} quiz results: {e}")
+            return {"status": "error", "message": "Could not save quiz results."}
+        return {"status": "success", "message": f"{len(new_documents)} quiz results saved.",
+                "inserted": len(new_documents), "skipped": len(documents) - len(new_documents)}
+
+    def get_student_rollup(self, username: str) -> Optional[Dict]:
+        if self.client is None:
+            return None
+        row = self._connection().execute(SELECT_ROLLUP_SQL, (username,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def rebuild_student_rollup(self, username: str) -> Dict:
+        with self._transaction() as connection:
+            rollup = build_rollup_document(username, self._result_documents(
+                select_results_sql(RESULT_COLUMNS) + " WHERE student_id = ?", (username,)))
+            connection.execute(REPLACE_ROLLUP_SQL, (username, json.dumps(rollup)))
+        return rollup
+
+    def get_full_quiz_history(self, username: str = None) -> List[Dict]:
+        if self.client is None:
+            return []
+        if username:
+            return list(self._result_documents(
+                select_results_sql(RESULT_COLUMNS) + " WHERE student_id = ? ORDER BY timestamp DESC", (username,)))
+        return list(self._result_documents(select_results_sql(RESULT_COLUMNS) + " ORDER BY timestamp DESC", ()))
+
+    def get_full_quiz_history_for_unit(self, username: str, unit_name: str) -> List[Dict]:
+        if self.client is None:
+            return []
+        return list(self._result_documents(
+            select_results_sql(RESULT_COLUMNS) + " WHERE student_id = ? AND quiz_name = ? ORDER BY timestamp DESC",
+            (username, unit_name)))
+
+    def get_quiz_history_page(self, username: str, unit_name: Optional[str] = None, before: Optional[str] = None,
+                              limit: Optional[int] = None, summary: bool = False) -> List[Dict]:
+        """Same as DatabaseService.get_quiz_history_page; summary pages never read the breakdown column."""
+        if self.client is None:
+            return []
+        columns = tuple(column for column in RESULT_COLUMNS if not (summary and column == "performance_breakdown"))
+        sql, parameters = select_results_sql(columns) + " WHERE student_id = ?", [username]
+        if unit_name is not None:
+            sql += " AND quiz_name = ?"
+            parameters.append(unit_name)
+        if before:
+            sql += " AND timestamp < ?"
+            parameters.append(before)
+        sql += " ORDER BY timestamp DESC"
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return list(self._result_documents(sql, tuple(parameters), columns))
+
+    def get_quiz_result(self, username: str, path: str) -> Optional[Dict]:
+        if self.client is None:
+            return None
+        return next(self._result_documents(
+            select_results_sql(RESULT_COLUMNS) + " WHERE path = ? AND student_id = ? LIMIT 1", (path, username)), None)
+
+    def iter_quiz_result_batches(self, username: Optional[str] = None, projection: Optional[Dict] = None,
+                                 batch_size: int = 500) -> Iterator[List[Dict]]:
+        """Same as DatabaseService.iter_quiz_result_batches."""
+        if self.client is None:
+            return
+        columns = projection_columns(projection)
+        if username:
+            sql, parameters = select_results_sql(columns) + " WHERE student_id = ? ORDER BY timestamp DESC", (username,)
+        else:
+            sql, parameters = select_results_sql(columns) + " ORDER BY id", ()
+        # StreamingResponse resumes the generator on whichever threadpool thread is free, so the
+        # open cursor gets a connection of its own rather than the first thread's
+        connection = self._open_connection()
+        try:
+            batch = []
+            for document in self._result_documents(sql, parameters, columns, projection, connection):
+                batch.append(document)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            connection.close()
+
+    def iter_quiz_results_by_id(self, after_id=None, student_ids: Optional[List[str]] = None,
+                                projection: Optional[Dict] = None, batch_size: int = 500) -> Iterator[List[Dict]]:
+        """Same as DatabaseService.iter_quiz_results_by_id; the row id is the "_id"."""
+        if self.client is None:
+            return
+        columns = ("id",) + projection_columns(projection)
+        student_filter = f" AND student_id IN ({', '.join('?' * len(student_ids))})" if student_ids else ""
+        sql = select_results_sql(columns) + f" WHERE id > ?{student_filter} ORDER BY id LIMIT ?"
+        after_id = int(after_id) if after_id is not None else 0
+        while True:
+            batch = []
+            for document in self._result_documents(sql, (after_id, *(student_ids or ()), batch_size), columns):
+                row_id = document.pop("id")
+                document = apply_projection(document, projection) if projection else document
+                document["_id"] = row_id
+                batch.append(document)
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1]["_id"]
+
+    def update_quiz_result_scores(self, updates: List[Dict]) -> Dict:
+        """Same as DatabaseService.update_quiz_result_scores, in one transaction."""
+        if self.client is None:
+            return {"status": "error", "message": "Database not connected."}
+        try:
+            with self._transaction() as connection:
+                cursor = connection.executemany(
+                    "UPDATE quiz_results SET scoring_summary = ?, performance_breakdown = COALESCE(?, performance_breakdown) WHERE id = ?",
+                    ((json.dumps(update["scoring_summary"]),
+                      json.dumps(update["performance_breakdown"]) if "performance_breakdown" in update else None,
+                      update["_id"]) for update in updates))
+                modified = cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Error updating quiz result scores: {e}")
+            return {"status": "error", "message": "Could not update quiz result scores.", "modified": 0}
+        return {"status": "success", "modified": modified}
+
+    def get_dashboard_analytics(self, username: str, time_period_days: int) -> Dict:
+        if self.client is None:
+            return {}
+        rollup = self.get_student_rollup(username)
+        if rollup is None:
+            # Rollups are written with every result, so a student without one has no results
+            return rollup_dashboard_grid({}, 0)
+        return rollup_dashboard_grid(rollup, time_period_days)
+
+    def get_learner_performance_averages(self, username: Optional[str] = None) -> Dict[str, float]:
+        """
+        Same as DatabaseService.get_learner_performance_averages. json_extract reads the two
+        scoring_summary fields inside SQLite; the rows are folded into running sums as they
+        are read.
+        """
+        if self.client is None:
+            return {}
+        sql, parameters = (LEARNER_FEATURE_SQL + " WHERE student_id = ?", (username,)) if username else (LEARNER_FEATURE_SQL, ())
+        rows = self._connection().execute(sql, parameters)
+        return compute_learner_performance_averages(
+            {"student_id": student_id, "time_taken_seconds": time_taken,
+             "scoring_summary": {"correct_answers_count": correct, "total_questions": total}}
+            for student_id, time_taken, correct, total in rows
+        )
+
+    def get_performance_data_for_dashboard(self, username: str, time_period_days: int, projection: Optional[Dict] = None) -> List[Dict]:
+        if self.client is None:
+            return []
+        since = period_start_timestamp(time_period_days)
+        columns = projection_columns(projection)
+        sql, parameters = select_results_sql(columns) + " WHERE student_id = ?", (username,)
+        if since is not None:
+            sql, parameters = sql + " AND timestamp >= ?", (username, since)
+        return list(self._result_documents(sql, parameters, columns, projection))
+
+
+# --- Example Usage (for testing this file directly) ---
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        service = SQLiteDatabaseService(f"sqlite:///{directory}/check.db")
+        assert service.insert_user("alice", "alice@example.com", "hash")["status"] == "success"
+        assert service.insert_user("alice", "other@example.com", "hash")["message"] == "Username already exists."
+        assert service.insert_user("bob", "alice@example.com", "hash")["message"] == "Email already registered."
+
+        breakdown = [{"topic_name": "Mean", "subtopic_name": "Mean", "difficulty_level": "easy", "difficulty_type": "direct",
+                      "is_correct": True, "marks_obtained": 1, "marks_possible": 1}]
+        for i in range(3):
+            service.save_quiz_result({"student_id": "alice", "subject": "Statistics", "quiz_type": "Unit-Quizzes",
+                                      "quiz_name": "Unit-I", "timestamp": f"2024-01-0{i + 1}T10:00:00",
+                                      "time_taken_seconds": 60, "performance_breakdown": breakdown})
+        history = service.get_full_quiz_history("alice")
+        assert [quiz["timestamp"][:10] for quiz in history] == ["2024-01-03", "2024-01-02", "2024-01-01"]
+        assert history[0] == service.get_quiz_result("alice", history[0]["path"])
+        assert "performance_breakdown" not in service.get_quiz_history_page("alice", limit=1, summary=True)[0]
+        assert service.get_student_rollup("alice") == build_rollup_document("alice", history)
+        assert service.get_dashboard_analytics("alice", 0)["easy"]["direct"] == {"total": 3, "correct": 3}
+        assert apply_projection(history[0], {"_id": 0, "scoring_summary.total_score": 1, "performance_breakdown.is_correct": 1}) == \
+            {"performance_breakdown": [{"is_correct": True}], "scoring_summary": {"total_score": 1}}
+        assert [len(batch) for batch in service.iter_quiz_result_batches(batch_size=2)] == [2, 1]
+        first, second = service.iter_quiz_results_by_id(projection={"scoring_summary": 1}, batch_size=2)
+        assert [len(first), len(second)] == [2, 1] and list(second[0]) == ["scoring_summary", "_id"]
+        assert [len(batch) for batch in service.iter_quiz_results_by_id(after_id=first[-1]["_id"])] == [1]
+        assert service.update_quiz_result_scores([{"_id": second[0]["_id"], "scoring_summary": {"total_score": 0}}])["modified"] == 1
+        assert service.get_full_quiz_history("alice")[0]["scoring_summary"] == {"total_score": 0}
+        service.close()
+    print("SQLite database service checks passed.")
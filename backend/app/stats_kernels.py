@@ -0,0 +1,97 @@
+# backend/app/stats_kernels.py
+# Scalar distribution functions for the answer-logic code in question_engine.
+# scipy.stats works on arrays and builds a frozen distribution on every call, which is
+# pure overhead for the single values a question needs; these use the closed forms via
+# `math` instead. benchmarks/stats_kernels_check.py checks them against scipy.
+import math
+from functools import lru_cache
+
+_SQRT2 = math.sqrt(2.0)
+
+
+# --- Normal distribution ---
+
+def norm_cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / _SQRT2)
+
+def norm_sf(x: float) -> float:
+    """P(Z > x), computed directly so small tail probabilities keep their precision."""
+    return 0.5 * math.erfc(x / _SQRT2)
+
+# Coefficients of Acklam's rational approximation of the inverse normal CDF
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+_PPF_P_LOW = 0.02425
+
+@lru_cache(maxsize=256)
+def norm_ppf(q: float) -> float:
+    """
+    Inverse of norm_cdf. Acklam's approximation followed by one Halley refinement step,
+    accurate to better than 1e-10. Memoized: the answer-logic code asks for the same handful
+    of alpha / power values over and over.
+    """
+    if q <= 0.0:
+        return -math.inf
+    if q >= 1.0:
+        return math.inf
+
+    if q < _PPF_P_LOW:
+        r = math.sqrt(-2.0 * math.log(q))
+        x = (((((_PPF_C[0]*r + _PPF_C[1])*r + _PPF_C[2])*r + _PPF_C[3])*r + _PPF_C[4])*r + _PPF_C[5]) / \
+            ((((_PPF_D[0]*r + _PPF_D[1])*r + _PPF_D[2])*r + _PPF_D[3])*r + 1.0)
+    elif q <= 1.0 - _PPF_P_LOW:
+        r = q - 0.5
+        s = r * r
+        x = (((((_PPF_A[0]*s + _PPF_A[1])*s + _PPF_A[2])*s + _PPF_A[3])*s + _PPF_A[4])*s + _PPF_A[5]) * r / \
+            (((((_PPF_B[0]*s + _PPF_B[1])*s + _PPF_B[2])*s + _PPF_B[3])*s + _PPF_B[4])*s + 1.0)
+    else:
+        r = math.sqrt(-2.0 * math.log(1.0 - q))
+        x = -(((((_PPF_C[0]*r + _PPF_C[1])*r + _PPF_C[2])*r + _PPF_C[3])*r + _PPF_C[4])*r + _PPF_C[5]) / \
+             ((((_PPF_D[0]*r + _PPF_D[1])*r + _PPF_D[2])*r + _PPF_D[3])*r + 1.0)
+
+    # Halley step on f(x) = cdf(x) - q
+    error = norm_cdf(x) - q
+    u = error * math.sqrt(2.0 * math.pi) * math.exp(x * x / 2.0)
+    return x - u / (1.0 + x * u / 2.0)
+
+
+# --- Binomial distribution ---
+
+def binom_pmf(k: int, n: int, p: float) -> float:
+    if k < 0 or k > n:
+        return 0.0
+    if p <= 0.0:
+        return 1.0 if k == 0 else 0.0
+    if p >= 1.0:
+        return 1.0 if k == n else 0.0
+    log_pmf = (math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+               + k * math.log(p) + (n - k) * math.log1p(-p))
+    return math.exp(log_pmf)
+
+def binom_cdf(k: int, n: int, p: float) -> float:
+    if k < 0:
+        return 0.0
+    if k >= n:
+        return 1.0
+    return min(1.0, sum(binom_pmf(i, n, p) for i in range(k + 1)))
+
+
+# --- Poisson distribution ---
+
+def poisson_pmf(k: int, lam: float) -> float:
+    if k < 0:
+        return 0.0
+    if lam <= 0.0:
+        return 1.0 if k == 0 else 0.0
+    return math.exp(k * math.log(lam) - lam - math.lgamma(k + 1))
+
+def poisson_cdf(k: int, lam: float) -> float:
+    if k < 0:
+        return 0.0
+    return min(1.0, sum(poisson_pmf(i, lam) for i in range(k + 1)))
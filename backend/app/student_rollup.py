@@ -0,0 +1,251 @@
+# backend/app/student_rollup.py
+# Per-student statistics rollup, kept in the `student_rollups` collection (one document
+# per student, _id = student_id). save_quiz_result folds every new quiz result into it
+# with a single atomic $inc, so the dashboard, graph, pathway and availability reads
+# fetch one document instead of the student's whole history.
+#
+# Document layout (names used as field names go through encode_key, since MongoDB
+# field names cannot contain "." or start with "$"):
+#   version                                                        bumped by every write (see below)
+#   quizzes_taken
+#   totals.correct_answers / totals.questions                      overall accuracy (pathway)
+#   grid.<level>.<type>.total / .correct                           all-time dashboard grid
+#   daily.<YYYY-MM-DD>.grid.<level>.<type>.total / .correct        dashboard grid for a period
+#   daily.<YYYY-MM-DD>.accuracy_sum / accuracy_count / efficiency_sum / efficiency_count
+#   unit_quizzes.<quiz_name>                                       unit quizzes taken, per unit
+#   units.<unit>.<topic>.<subtopic>.total / .correct               pathway statistics
+#   folded_paths                                                   paths of the quiz results counted above
+#
+# Each increment is conditional on its results' paths not being in folded_paths yet, and
+# pushes them there, so a result is counted at most once. A rollup created by the first
+# increment of a student who already had results (saved before rollups, or before a failed
+# increment) is rebuilt from those results. The rebuild reads the version first, then the
+# results, and replaces the rollup (folded_paths included) only if the version is unchanged,
+# so an increment landing in between is not lost (the rebuild retries). An increment arriving
+# after the rebuild, for a result the rebuild already read, finds its path in folded_paths
+# and is skipped: it fails as a duplicate-key upsert, which the callers treat as "rebuild".
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .dashboard_engine import quiz_accuracy_and_efficiency
+from .quiz_result_documents import period_start_timestamp
+
+ROLLUP_COLLECTION = "student_rollups"
+DASHBOARD_LEVELS = ["easy", "medium", "hard"]
+DASHBOARD_TYPES = ["direct", "logical reasoning", "aptitude"]
+# Rebuilds losing the version check this many times in a row give up (the rollup stays as it is)
+ROLLUP_REBUILD_ATTEMPTS = 5
+
+# Rollup fields returned by get_student_rollup: all but the (ever-growing) folded paths
+ROLLUP_READ_PROJECTION = {"folded_paths": 0}
+# Rollup fields rollup_history_summary reads
+ROLLUP_HISTORY_PROJECTION = {"unit_quizzes": 1}
+
+# Fields of a quiz result needed to build its rollup increments
+ROLLUP_SOURCE_PROJECTION = {
+    "_id": 0, "path": 1, "student_id": 1, "quiz_type": 1, "quiz_name": 1, "timestamp": 1, "time_taken_seconds": 1,
+    "scoring_summary.correct_answers_count": 1, "scoring_summary.total_questions": 1,
+    "scoring_summary.total_score": 1, "scoring_summary.max_score": 1,
+    "performance_breakdown.topic_name": 1, "performance_breakdown.subtopic_name": 1,
+    "performance_breakdown.difficulty_level": 1, "performance_breakdown.difficulty_type": 1,
+    "performance_breakdown.is_correct": 1,
+}
+
+
+def encode_key(name: str) -> str:
+    # Full-width lookalikes; syllabus names such as "Empirical Rule (68-95-99.7)" contain dots
+    return name.replace(".", "．").replace("$", "＄")
+
+def decode_key(key: str) -> str:
+    return key.replace("．", ".").replace("＄", "$")
+
+
+def build_rollup_increments(quiz_result: Dict[str, Any]) -> Dict[str, float]:
+    """Dotted-path -> amount map for the $inc that folds one stored quiz result into its student's rollup."""
+    increments: Dict[str, float] = defaultdict(int)
+    summary = quiz_result.get("scoring_summary", {})
+    day = f"daily.{(quiz_result.get('timestamp') or datetime.now().isoformat())[:10]}"
+
+    increments["quizzes_taken"] += 1
+    increments["totals.correct_answers"] += summary.get("correct_answers_count", 0)
+    increments["totals.questions"] += summary.get("total_questions", 0)
+
+    accuracy, efficiency = quiz_accuracy_and_efficiency(quiz_result)
+    if accuracy is not None:
+        increments[f"{day}.accuracy_sum"] += accuracy
+        increments[f"{day}.accuracy_count"] += 1
+    if efficiency is not None:
+        increments[f"{day}.efficiency_sum"] += efficiency
+        increments[f"{day}.efficiency_count"] += 1
+
+    unit = quiz_result.get("quiz_name")
+    if quiz_result.get("quiz_type") == "Unit-Quizzes" and unit:
+        increments[f"unit_quizzes.{encode_key(unit)}"] += 1
+
+    for question in quiz_result.get("performance_breakdown", []):
+        correct = 1 if question.get("is_correct") else 0
+        level = question.get("difficulty_level", "unknown")
+        type_ = question.get("difficulty_type", "unknown")
+        if level in DASHBOARD_LEVELS and type_ in DASHBOARD_TYPES:
+            for prefix in ("grid", f"{day}.grid"):
+                increments[f"{prefix}.{level}.{type_}.total"] += 1
+                increments[f"{prefix}.{level}.{type_}.correct"] += correct
+
+        topic = question.get("topic_name")
+        subtopic = question.get("subtopic_name")
+        if unit and topic and subtopic:
+            path = f"units.{encode_key(unit)}.{encode_key(topic)}.{encode_key(subtopic)}"
+            increments[f"{path}.total"] += 1
+            increments[f"{path}.correct"] += correct
+
+    return dict(increments)
+
+
+def build_rollup_folds(quiz_results: Iterable[Dict[str, Any]]) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    The (filter, update) pair, for an upserting update, that folds a batch of stored quiz
+    results into their students' rollups, one per student. The filter matches nothing if
+    one of the student's results is already folded in, and the upsert then fails with a
+    duplicate _id: the caller rebuilds that student's rollup instead.
+    """
+    quiz_results = list(quiz_results)
+    paths: Dict[str, List[str]] = defaultdict(list)
+    for quiz_result in quiz_results:
+        paths[quiz_result.get("student_id")].append(quiz_result.get("path"))
+    return {
+        student_id: (
+            {"_id": student_id, "folded_paths": {"$nin": paths[student_id]}},
+            {
+                "$inc": {**increments, "version": 1},
+                "$push": {"folded_paths": {"$each": paths[student_id]}},
+                "$setOnInsert": {"student_id": student_id},
+            },
+        )
+        for student_id, increments in build_rollup_increments_by_student(quiz_results).items()
+    }
+
+
+def next_rollup_version(current: Optional[Dict[str, Any]]) -> int:
+    # Rollups written before versioning have none; {"version": None} also matches a missing field
+    return ((current or {}).get("version") or 0) + 1
+
+
+def build_rollup_increments_by_student(quiz_results: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """The combined rollup increments of a batch of stored quiz results, one $inc map per student."""
+    by_student: Dict[str, Dict[str, float]] = {}
+    for quiz_result in quiz_results:
+        totals = by_student.setdefault(quiz_result.get("student_id"), defaultdict(int))
+        for path, amount in build_rollup_increments(quiz_result).items():
+            totals[path] += amount
+    return {student_id: dict(totals) for student_id, totals in by_student.items()}
+
+
+def build_rollup_document(student_id: str, quiz_results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """A complete rollup document built from a student's stored quiz results (used for rebuilds and backfill)."""
+    document: Dict[str, Any] = {"_id": student_id, "student_id": student_id}
+    totals: Dict[str, float] = defaultdict(int)
+    for quiz_result in quiz_results:
+        for path, amount in build_rollup_increments(quiz_result).items():
+            totals[path] += amount
+    return apply_rollup_increments(document, totals)
+
+
+def rollup_version_filter(student_id: str, current: Dict[str, Any]) -> Dict[str, Any]:
+    """Matches the rollup only while it still has the version a rebuild read (see the header)."""
+    return {"_id": student_id, "version": current.get("version")}
+
+
+def build_rebuilt_rollup(student_id: str, quiz_results: Iterable[Dict[str, Any]], current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The rollup replacing `current` (its version only, or None) in a rebuild, with the folded paths and the next version."""
+    quiz_results = list(quiz_results)
+    rollup = build_rollup_document(student_id, quiz_results)
+    rollup["folded_paths"] = [quiz_result.get("path") for quiz_result in quiz_results]
+    rollup["version"] = next_rollup_version(current)
+    return rollup
+
+
+def apply_rollup_increments(rollup: Dict[str, Any], increments: Dict[str, float]) -> Dict[str, Any]:
+    """Applies dotted-path increments to a rollup document in place, like MongoDB's $inc (storage without $inc uses this)."""
+    for path, amount in increments.items():
+        node = rollup
+        *parents, leaf = path.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = node.get(leaf, 0) + amount
+    return rollup
+
+
+# --- Reads ---
+
+def _period_start_day(time_period_days: int) -> Optional[str]:
+    # Day granularity: a period of N days covers every quiz from the calendar day N days ago
+    # onwards, the same start as the query fallback (quiz_result_documents.period_start_timestamp)
+    start_timestamp = period_start_timestamp(time_period_days)
+    return start_timestamp[:10] if start_timestamp is not None else None
+
+def rollup_dashboard_projection(time_period_days: int) -> Dict[str, int]:
+    """The rollup fields rollup_dashboard_grid reads for a period."""
+    return {"grid": 1} if time_period_days <= 0 else {"daily": 1}
+
+def _days_in_period(rollup: Dict[str, Any], time_period_days: int) -> List[str]:
+    start_day = _period_start_day(time_period_days)
+    return sorted(day for day in rollup.get("daily", {}) if start_day is None or day >= start_day)
+
+def rollup_dashboard_grid(rollup: Dict[str, Any], time_period_days: int) -> Dict:
+    grid = {level: {type_: {"total": 0, "correct": 0} for type_ in DASHBOARD_TYPES} for level in DASHBOARD_LEVELS}
+    if time_period_days <= 0:
+        sources = [rollup.get("grid", {})]
+    else:
+        sources = [rollup["daily"][day].get("grid", {}) for day in _days_in_period(rollup, time_period_days)]
+    for source in sources:
+        for level, types in source.items():
+            for type_, counts in types.items():
+                if level in grid and type_ in grid[level]:
+                    grid[level][type_]["total"] += counts.get("total", 0)
+                    grid[level][type_]["correct"] += counts.get("correct", 0)
+    return grid
+
+def rollup_history_summary(rollup: Dict[str, Any]) -> Dict:
+    return {'unique_unit_quizzes_attempted': sum(1 for count in rollup.get("unit_quizzes", {}).values() if count > 0)}
+
+def rollup_daily_sums(rollup: Dict[str, Any], time_period_days: int = 0) -> Dict[str, Dict]:
+    """Per-day accuracy / efficiency sums and counts, oldest day first."""
+    return {day: rollup["daily"][day] for day in _days_in_period(rollup, time_period_days)}
+
+def rollup_performance_map(rollup: Dict[str, Any]) -> Dict:
+    """unit -> topic -> subtopic -> {'correct', 'total'}, with the original names."""
+    return {
+        decode_key(unit): {
+            decode_key(topic): {decode_key(subtopic): dict(stats) for subtopic, stats in subtopics.items()}
+            for topic, subtopics in topics.items()
+        }
+        for unit, topics in rollup.get("units", {}).items()
+    }
+
+
+# --- Example Usage (for testing this file directly) ---
+if __name__ == "__main__":
+    from .dashboard_engine import get_daily_performance_indices, daily_performance_indices_from_sums
+
+    for name in ("Empirical Rule (68-95-99.7)", "$weird.name", "plain"):
+        assert decode_key(encode_key(name)) == name, name
+        assert "." not in encode_key(name) and not encode_key(name).startswith("$")
+
+    today = datetime.now().date().isoformat()
+    history = [
+        {"student_id": "alice", "quiz_type": "Unit-Quizzes", "quiz_name": "Unit-I", "timestamp": f"{today}T10:00:00",
+         "time_taken_seconds": 300, "scoring_summary": {"total_score": 14, "max_score": 20, "correct_answers_count": 9, "total_questions": 15},
+         "performance_breakdown": [{"topic_name": "Mean", "subtopic_name": "Rule 99.7", "difficulty_level": "easy", "difficulty_type": "direct", "is_correct": True},
+                                   {"topic_name": "Mean", "subtopic_name": "Rule 99.7", "difficulty_level": "hard", "difficulty_type": "aptitude", "is_correct": False}]},
+        {"student_id": "alice", "quiz_type": "Grand-Quiz", "quiz_name": "Grand Quiz", "timestamp": "2020-01-01T09:00:00",
+         "time_taken_seconds": None, "scoring_summary": {"total_score": 50, "max_score": 100, "correct_answers_count": 40, "total_questions": 75},
+         "performance_breakdown": [{"topic_name": "Mean", "subtopic_name": "Median", "difficulty_level": "easy", "difficulty_type": "direct", "is_correct": False}]},
+    ]
+    rollup = build_rollup_document("alice", history)
+    assert rollup_dashboard_grid(rollup, 0)["easy"]["direct"] == {"total": 2, "correct": 1}
+    assert rollup_dashboard_grid(rollup, 7)["easy"]["direct"] == {"total": 1, "correct": 1}
+    assert rollup_history_summary(rollup) == {"unique_unit_quizzes_attempted": 1}
+    assert rollup_performance_map(rollup)["Unit-I"]["Mean"]["Rule 99.7"] == {"total": 2, "correct": 1}
+    assert daily_performance_indices_from_sums(rollup_daily_sums(rollup)) == get_daily_performance_indices(history)
+    print("Student rollup checks passed.")
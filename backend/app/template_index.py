@@ -0,0 +1,133 @@
+# backend/app/template_index.py
+import random
+from bisect import bisect_right
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from .metrics import timed_stage
+
+
+class TemplateIndex:
+    """
+    Lookup structure over the question template bank, built once at load:
+    unit_name -> difficulty_type -> difficulty_level -> [templates], plus id -> template.
+
+    Sampling works on the bucket sizes only, so selecting k templates costs O(k)
+    regardless of how many templates the bank holds.
+    """
+
+    def __init__(self, templates: List[Dict]):
+        self.by_id: Dict[str, Dict] = {}
+        self.by_unit: Dict[str, Dict[str, Dict[str, List[Dict]]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        for tpl in templates:
+            if tpl.get("id"):
+                self.by_id[tpl["id"]] = tpl
+            self.by_unit[tpl.get("unit_name")][tpl.get("difficulty_type")][tpl.get("difficulty_level")].append(tpl)
+        # (unit_name, difficulty_types) -> (buckets, cumulative bucket sizes)
+        self._bucket_cache: Dict[Tuple, Tuple[List[List[Dict]], List[int]]] = {}
+
+    def get(self, template_id: str) -> Optional[Dict]:
+        return self.by_id.get(template_id)
+
+    def unit_names(self) -> List[str]:
+        return [unit for unit in self.by_unit if unit is not None]
+
+    def _buckets(self, unit_name: Optional[str], difficulty_types: Optional[Iterable[str]]) -> Tuple[List[List[Dict]], List[int]]:
+        types_key = tuple(difficulty_types) if difficulty_types is not None else None
+        cache_key = (unit_name, types_key)
+        if cache_key not in self._bucket_cache:
+            units = [unit_name] if unit_name is not None else list(self.by_unit)
+            buckets, cumulative, total = [], [], 0
+            for unit in units:
+                if unit not in self.by_unit:
+                    continue
+                type_map = self.by_unit[unit]
+                for difficulty_type in (types_key if types_key is not None else list(type_map)):
+                    for bucket in type_map.get(difficulty_type, {}).values():
+                        if bucket:
+                            buckets.append(bucket)
+                            total += len(bucket)
+                            cumulative.append(total)
+            self._bucket_cache[cache_key] = (buckets, cumulative)
+        return self._bucket_cache[cache_key]
+
+    def count(self, unit_name: Optional[str] = None, difficulty_types: Optional[Iterable[str]] = None) -> int:
+        _, cumulative = self._buckets(unit_name, difficulty_types)
+        return cumulative[-1] if cumulative else 0
+
+    def get_templates(self, unit_name: Optional[str] = None, difficulty_types: Optional[Iterable[str]] = None) -> List[Dict]:
+        buckets, _ = self._buckets(unit_name, difficulty_types)
+        return [tpl for bucket in buckets for tpl in bucket]
+
+    def _template_at(self, buckets: List[List[Dict]], cumulative: List[int], position: int) -> Dict:
+        bucket_idx = bisect_right(cumulative, position)
+        offset = position - (cumulative[bucket_idx - 1] if bucket_idx > 0 else 0)
+        return buckets[bucket_idx][offset]
+
+    def sample(self, k: int, unit_name: Optional[str] = None, difficulty_types: Optional[Iterable[str]] = None,
+               exclude_ids: Optional[set] = None) -> List[Dict]:
+        """Returns up to k distinct templates, uniformly at random, skipping any id in exclude_ids."""
+        buckets, cumulative = self._buckets(unit_name, difficulty_types)
+        total = cumulative[-1] if cumulative else 0
+        exclude_ids = exclude_ids or set()
+        if k <= 0 or total == 0:
+            return []
+        # Template ids are unique, so drawing len(exclude_ids) extra positions always leaves k usable ones
+        positions = random.sample(range(total), min(total, k + len(exclude_ids)))
+        chosen = []
+        for position in positions:
+            tpl = self._template_at(buckets, cumulative, position)
+            if tpl.get("id") in exclude_ids:
+                continue
+            chosen.append(tpl)
+            if len(chosen) == k:
+                break
+        return chosen
+
+    def choices(self, k: int, unit_name: Optional[str] = None, difficulty_types: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Returns k templates drawn with replacement."""
+        buckets, cumulative = self._buckets(unit_name, difficulty_types)
+        total = cumulative[-1] if cumulative else 0
+        if k <= 0 or total == 0:
+            return []
+        return [self._template_at(buckets, cumulative, random.randrange(total)) for _ in range(k)]
+
+    @timed_stage("template_selection")
+    def select_for_quota(self, one_mark_count: int, two_mark_count: int, unit_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Picks `one_mark_count` direct templates (1 mark) and `two_mark_count` aptitude /
+        logical reasoning templates (2 marks), preferring distinct templates and
+        repeating only when a category has too few. If a category is empty the quota
+        is filled from the remaining templates of the unit (or the whole bank when
+        unit_name is None). Returns a shuffled list of {"template", "marks"} items.
+        """
+        selected_template_objects = []
+        selected_ids = set()
+
+        for difficulty_types, quota, marks in (
+            (("direct",), one_mark_count, 1),
+            (("aptitude", "logical reasoning"), two_mark_count, 2),
+        ):
+            picked = self.sample(quota, unit_name, difficulty_types)
+            for tpl in picked:
+                selected_template_objects.append({"template": tpl, "marks": marks})
+                selected_ids.add(tpl.get("id"))
+            # Not enough distinct templates of this kind: allow repeats within the same kind
+            for tpl in self.choices(quota - len(picked), unit_name, difficulty_types):
+                selected_template_objects.append({"template": tpl, "marks": marks})
+
+        target_count = one_mark_count + two_mark_count
+        missing = target_count - len(selected_template_objects)
+        if missing > 0:
+            print(f"Warning: Selected {len(selected_template_objects)}/{target_count} templates for '{unit_name or 'Grand Quiz'}'. Filling from the remaining templates, repeats possible.")
+            fillers = self.sample(missing, unit_name, None, exclude_ids=selected_ids)
+            fillers += self.choices(missing - len(fillers), unit_name, None)
+            one_mark_selected = sum(1 for item in selected_template_objects if item["marks"] == 1)
+            for tpl in fillers:
+                mark_to_assign = 1 if one_mark_selected < one_mark_count else 2
+                if mark_to_assign == 1:
+                    one_mark_selected += 1
+                selected_template_objects.append({"template": tpl, "marks": mark_to_assign})
+
+        random.shuffle(selected_template_objects) # Shuffle the final list for presentation order
+        return selected_template_objects[:target_count]
@@ -0,0 +1,96 @@
+# backend/benchmarks/daily_indices_benchmark.py
+"""
+Benchmarks dashboard_engine.get_daily_performance_indices, which is built on columnar
+arrays (load_quiz_columns + np.bincount per day), against the per-quiz Python loop it
+replaced. It uses one student's synthetic history at growing sizes, spread over a year.
+
+For each size the table shows the loop, the loader on its own, and the full vectorized
+call, with and without 7-day smoothing. Both implementations must return identical
+graph data, otherwise the script exits non-zero.
+
+Needs no database. Run from the backend directory:
+    python benchmarks/daily_indices_benchmark.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.dashboard_engine import (
+    DAILY_INDEX_COLUMNS,
+    daily_performance_indices_from_sums,
+    get_daily_performance_indices,
+    load_quiz_columns,
+    quiz_accuracy_and_efficiency,
+)
+
+
+def loop_daily_performance_indices(quiz_history):
+    """The previous implementation: one Python dict update per quiz."""
+    daily_sums = defaultdict(lambda: {"accuracy_sum": 0.0, "accuracy_count": 0, "efficiency_sum": 0.0, "efficiency_count": 0})
+    for quiz in quiz_history:
+        date_str = quiz.get("timestamp", "")[:10]
+        accuracy, efficiency = quiz_accuracy_and_efficiency(quiz)
+        if accuracy is not None:
+            daily_sums[date_str]["accuracy_sum"] += accuracy
+            daily_sums[date_str]["accuracy_count"] += 1
+            if efficiency is not None:
+                daily_sums[date_str]["efficiency_sum"] += efficiency
+                daily_sums[date_str]["efficiency_count"] += 1
+    return daily_performance_indices_from_sums({date: daily_sums[date] for date in sorted(daily_sums)})
+
+
+def synthetic_history(quizzes: int, seed: int = 11):
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=365)
+    history = []
+    for _ in range(quizzes):
+        is_grand = rng.random() < 0.1
+        total_questions = 75 if is_grand else 15
+        correct = rng.randint(0, total_questions)
+        history.append({
+            "student_id": "benchmark_student",
+            "quiz_type": "Grand-Quiz" if is_grand else "Unit-Quizzes",
+            "timestamp": (start + timedelta(seconds=rng.randrange(365 * 86400))).isoformat(),
+            "time_taken_seconds": rng.choice([None, rng.randint(total_questions * 15, total_questions * 120)]),
+            "scoring_summary": {"total_score": correct, "max_score": total_questions,
+                                "correct_answers_count": correct, "total_questions": total_questions},
+        })
+    return history
+
+
+def best_time(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 10000, 50000, 100000])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best one is reported")
+    args = parser.parse_args()
+
+    print(f"{'quizzes':>8} {'loop ms':>9} {'loader ms':>10} {'vector ms':>10} {'7d smooth ms':>13} {'speed-up':>9}")
+    for size in args.sizes:
+        history = synthetic_history(size)
+        if loop_daily_performance_indices(history) != get_daily_performance_indices(history):
+            sys.exit(f"Vectorized graph data differs from the loop for {size} quizzes.")
+
+        loop_ms = best_time(lambda: loop_daily_performance_indices(history), args.repeat)
+        loader_ms = best_time(lambda: load_quiz_columns(history, DAILY_INDEX_COLUMNS), args.repeat)
+        vector_ms = best_time(lambda: get_daily_performance_indices(history), args.repeat)
+        smooth_ms = best_time(lambda: get_daily_performance_indices(history, smoothing_window_days=7), args.repeat)
+        print(f"{size:>8} {loop_ms:>9.2f} {loader_ms:>10.2f} {vector_ms:>10.2f} {smooth_ms:>13.2f} {loop_ms / vector_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# backend/benchmarks/db_driver_load_test.py
+"""
+Load test comparing the two database drivers behind the API endpoints:
+    DATABASE_DRIVER=pymongo  synchronous DatabaseService, every call in the Starlette threadpool
+    DATABASE_DRIVER=motor    AsyncDatabaseService, awaited directly on the event loop
+
+For each driver, this starts the API under uvicorn and registers a throwaway user. It
+submits a few quizzes so the history and dashboard queries return data. Then it fires the
+read endpoints at increasing concurrency levels and reports throughput and latency
+percentiles. The threadpool holds 40 threads by default, so the interesting rows are the
+ones with concurrency above 40.
+
+Needs a reachable MongoDB (the data goes to its educonnect_db database) and uvicorn.
+With --database-url sqlite:///<file> the API stores everything in that SQLite file
+instead; both drivers then run the same threadpool-backed service, as a baseline.
+Run from the backend directory:
+    python benchmarks/db_driver_load_test.py --mongo-uri mongodb://localhost:27017 --concurrency 10 50 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READ_ENDPOINTS = (
+    "/api/v1/performance/history",
+    "/api/v1/performance/dashboard",
+    "/api/v1/dashboard/graph-data",
+    "/api/v1/quizzes/availability/Statistics",
+)
+
+
+def start_server(driver: str, args) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_DRIVER=driver, QUESTION_POOL_DEPTH="0")
+    if args.database_url:
+        env.update(STORAGE_BACKEND="sqlite", DATABASE_URL=args.database_url)
+    else:
+        env.update(STORAGE_BACKEND="mongo", MONGO_CONNECTION_STRING=args.mongo_uri)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/api/v1/units")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API server did not become ready in time")
+
+
+async def prepare_user(client: httpx.AsyncClient, quizzes: int) -> dict:
+    """Registers a fresh user, submits `quizzes` unit quizzes and returns the auth header."""
+    username = f"loadtest_{uuid.uuid4().hex[:10]}"
+    response = await client.post("/api/v1/users/register",
+                                 json={"username": username, "email": f"{username}@example.com", "password": "loadtest-password"})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    units = (await client.get("/api/v1/units")).json()
+    for i in range(quizzes):
+        quiz = (await client.get(f"/api/v1/quiz/unit/{units[i % len(units)]}", headers=headers)).json()
+        answers = [i % 4 for _ in quiz["questions"]]
+        submission = {"quiz_session_id": quiz["quiz_session_id"], "student_answers": answers, "time_taken_seconds": 60 + i}
+        (await client.post("/api/v1/quiz/submit/unit", json=submission, headers=headers)).raise_for_status()
+    return headers
+
+
+async def run_level(client: httpx.AsyncClient, headers: dict, concurrency: int, requests_per_worker: int) -> dict:
+    latencies = []
+    errors = 0
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        for i in range(requests_per_worker):
+            path = READ_ENDPOINTS[(worker_id + i) % len(READ_ENDPOINTS)]
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+async def benchmark_driver(driver: str, args) -> list:
+    server = start_server(driver, args)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120.0) as client:
+            await wait_until_ready(client)
+            headers = await prepare_user(client, args.quizzes)
+            await run_level(client, headers, 4, 5)  # warm-up: connection pools, auth cache, first queries
+            return [(concurrency, await run_level(client, headers, concurrency, args.requests_per_worker))
+                    for concurrency in args.concurrency]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_CONNECTION_STRING"))
+    parser.add_argument("--database-url", help="Use SQLite storage at this sqlite:/// URL instead of MongoDB")
+    parser.add_argument("--drivers", nargs="+", default=["pymongo", "motor"], choices=["pymongo", "motor"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[10, 50, 200])
+    parser.add_argument("--requests-per-worker", type=int, default=20)
+    parser.add_argument("--quizzes", type=int, default=20, help="Quizzes submitted for the load-test user before measuring")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    if not args.mongo_uri and not args.database_url:
+        parser.error("a MongoDB connection string (--mongo-uri or MONGO_CONNECTION_STRING) or a --database-url is required")
+
+    print(f"{'driver':<8} {'conc.':>6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for driver in args.drivers:
+        for concurrency, result in asyncio.run(benchmark_driver(driver, args)):
+            print(f"{driver:<8} {concurrency:>6} {result['requests']:>9} {result['errors']:>7} {result['throughput']:>9.1f} "
+                  f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
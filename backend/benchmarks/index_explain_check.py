@@ -0,0 +1,156 @@
+# backend/benchmarks/index_explain_check.py
+"""
+Checks that every per-student query of DatabaseService is served by an index.
+
+The check creates the declared indexes in a scratch database on a local mongod and
+seeds it with a few hundred quiz results. It then runs explain() on the exact query,
+sort and pipeline shapes DatabaseService uses. A query fails if its winning plan
+contains a COLLSCAN stage, or, for the sorted history queries, an in-memory SORT
+stage. The exit status is non-zero if any query fails, so this can run in CI next to a
+mongod service.
+
+get_learner_performance_averages(username=None) groups every student's results for
+clustering and is a collection scan by design; it is not checked.
+
+Run from the backend directory:
+    python benchmarks/index_explain_check.py --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pymongo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCRATCH_DB = "educonnect_explain_check"
+
+
+def winning_plan_stages(explain_output) -> list:
+    """All stage names inside the winning plan(s) of an explain() result, ignoring rejected plans."""
+    stages = []
+
+    def collect(node):
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+            for value in node.values():
+                collect(value)
+        elif isinstance(node, list):
+            for item in node:
+                collect(item)
+
+    def find_plans(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in ("winningPlan", "queryPlan"):
+                    collect(value)
+                elif key != "rejectedPlans":
+                    find_plans(value)
+        elif isinstance(node, list):
+            for item in node:
+                find_plans(item)
+
+    find_plans(explain_output)
+    return stages
+
+
+def seed(db, students: int = 20, quizzes_per_student: int = 30) -> None:
+    units = ["Unit-I Descriptive Statistics", "Unit-II Sampling", "Unit-III Probability"]
+    levels, types = ["easy", "medium", "hard"], ["direct", "logical reasoning", "aptitude"]
+    documents = []
+    for s in range(students):
+        for q in range(quizzes_per_student):
+            is_grand = q % 10 == 0
+            documents.append({
+                "path": f"student{s}/Statistics/{q}",
+                "student_id": f"student{s}",
+                "subject": "Statistics",
+                "quiz_type": "Grand-Quiz" if is_grand else "Unit-Quizzes",
+                "quiz_name": "Grand Quiz" if is_grand else random.choice(units),
+                "timestamp": (datetime.now() - timedelta(days=random.randint(0, 90))).isoformat(),
+                "performance_breakdown": [
+                    {"difficulty_level": random.choice(levels), "difficulty_type": random.choice(types), "is_correct": random.random() < 0.6}
+                    for _ in range(15)
+                ],
+            })
+    db.quiz_results.insert_many(documents)
+    db.users.insert_many([{"username": f"student{s}", "email": f"student{s}@example.com"} for s in range(students)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_CONNECTION_STRING", "mongodb://localhost:27017"))
+    parser.add_argument("--keep", action="store_true", help=f"Keep the '{SCRATCH_DB}' database afterwards")
+    args = parser.parse_args()
+
+    os.environ["MONGO_CONNECTION_STRING"] = args.mongo_uri
+    from app.database_service import (
+        DatabaseService, build_time_period_query, build_dashboard_grid_pipeline, build_learner_performance_pipeline,
+        build_history_page_query, HISTORY_SUMMARY_PROJECTION,
+    )
+
+    service = DatabaseService()
+    if service.client is None:
+        sys.exit("Could not connect to MongoDB.")
+    # Point the service at a scratch database so the check never touches real data
+    service.client.drop_database(SCRATCH_DB)
+    db = service.db = service.client[SCRATCH_DB]
+    service.users_collection, service.quiz_results_collection = db.users, db.quiz_results
+    seed(db)
+    if not service.ensure_indexes():
+        sys.exit("Declared indexes are missing, see the warnings above.")
+
+    student = "student3"
+    history_sort = [("timestamp", pymongo.DESCENDING)]
+    checks = [
+        ("check_username_exists", db.users.find({"username": student}).explain(), False),
+        ("check_email_exists", db.users.find({"email": f"{student}@example.com"}).explain(), False),
+        ("get_user_quiz_history_summary", db.command(
+            "explain", {"distinct": "quiz_results", "key": "quiz_name", "query": {"student_id": student, "quiz_type": "Unit-Quizzes"}},
+            verbosity="queryPlanner"), False),
+        ("get_full_quiz_history", db.quiz_results.find({"student_id": student}, {"_id": 0}).sort(history_sort).explain(), True),
+        ("get_full_quiz_history_for_unit", db.quiz_results.find(
+            {"student_id": student, "quiz_name": "Unit-II Sampling"}, {"_id": 0}).sort(history_sort).explain(), True),
+        ("get_quiz_history_page(before, limit)", db.quiz_results.find(
+            build_history_page_query(student, None, datetime.now().isoformat()), HISTORY_SUMMARY_PROJECTION
+        ).sort(history_sort).limit(20).explain(), True),
+        ("get_quiz_history_page(unit, before, limit)", db.quiz_results.find(
+            build_history_page_query(student, "Unit-II Sampling", datetime.now().isoformat()), HISTORY_SUMMARY_PROJECTION
+        ).sort(history_sort).limit(20).explain(), True),
+        ("get_quiz_result", db.quiz_results.find({"path": f"{student}/Statistics/3", "student_id": student}).explain(), False),
+    ]
+    checks.append(("get_learner_performance_averages(student)", db.command(
+        "explain", {"aggregate": "quiz_results", "pipeline": build_learner_performance_pipeline(student), "cursor": {}},
+        verbosity="queryPlanner"), False))
+    for days in (0, 7):
+        checks.append((f"get_performance_data_for_dashboard({days}d)",
+                       db.quiz_results.find(build_time_period_query(student, days), {"_id": 0}).explain(), False))
+        checks.append((f"get_dashboard_analytics({days}d)", db.command(
+            "explain", {"aggregate": "quiz_results", "pipeline": build_dashboard_grid_pipeline(student, days), "cursor": {}},
+            verbosity="queryPlanner"), False))
+
+    failures = 0
+    for name, explain_output, sorted_query in checks:
+        stages = winning_plan_stages(explain_output)
+        problems = []
+        if not stages:
+            problems.append("no winning plan found in explain output")
+        if "COLLSCAN" in stages:
+            problems.append("collection scan")
+        if sorted_query and "SORT" in stages:
+            problems.append("in-memory sort")
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<5} {name:<45} {' > '.join(stages)}{'  <-- ' + ', '.join(problems) if problems else ''}")
+
+    if not args.keep:
+        service.client.drop_database(SCRATCH_DB)
+    if failures:
+        sys.exit(f"{failures} quer{'y' if failures == 1 else 'ies'} not served by an index.")
+    print("All checked queries use an index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# backend/benchmarks/learner_feature_benchmark.py
+"""
+Benchmarks the three ways of computing the per-student learner-category feature
+(dashboard_engine.learner_performance_scores averaged per student):
+
+    full-history  get_full_quiz_history(None) + compute_learner_performance_averages,
+                  i.e. every quiz document of every student in memory (the old approach)
+    streamed      a find() cursor projected to LEARNER_FEATURE_PROJECTION, folded into
+                  running sums by compute_learner_performance_averages
+    aggregation   DatabaseService.get_learner_performance_averages ($group in MongoDB)
+
+The script seeds a scratch database with synthetic quiz results. The default is 100k
+students and 5M results, each result carrying a 15-question performance breakdown like
+a real unit quiz. Each method then runs in a fresh subprocess, so its peak RSS is
+measured on its own. Seeding 5M results takes a while; pass --reuse to benchmark an
+existing scratch database again. full-history needs several GB of RAM at the default
+size; leave it out with --methods streamed aggregation.
+
+Needs a reachable MongoDB. Run from the backend directory:
+    python benchmarks/learner_feature_benchmark.py --mongo-uri mongodb://localhost:27017 [--users 100000 --results 5000000]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCRATCH_DB = "educonnect_learner_feature_benchmark"
+METHODS = ("full-history", "streamed", "aggregation")
+
+
+def open_scratch_service(mongo_uri: str):
+    """A DatabaseService pointed at the scratch database, so the benchmark never touches real data."""
+    os.environ["MONGO_CONNECTION_STRING"] = mongo_uri
+    from app.database_service import DatabaseService
+
+    service = DatabaseService()
+    if service.client is None:
+        sys.exit("Could not connect to MongoDB.")
+    service.db = service.client[SCRATCH_DB]
+    service.quiz_results_collection = service.db.quiz_results
+    return service
+
+
+def synthetic_results(users: int, results: int, breakdown_size: int, seed: int = 7):
+    rng = random.Random(seed)
+    levels, types = ["easy", "medium", "hard"], ["direct", "logical reasoning", "aptitude"]
+    # Each student gets a skill level, so the clustering has something to find
+    skills = [rng.betavariate(4, 3) for _ in range(users)]
+    start = datetime.now() - timedelta(days=365)
+    for i in range(results):
+        student = i % users if i < users else rng.randrange(users)
+        correct = sum(rng.random() < skills[student] for _ in range(breakdown_size))
+        yield {
+            "path": f"student{student}/Statistics/{i}",
+            "student_id": f"student{student}",
+            "subject": "Statistics",
+            "quiz_type": "Unit-Quizzes",
+            "quiz_name": f"Unit-{rng.randint(1, 5)}",
+            "timestamp": (start + timedelta(seconds=rng.randrange(365 * 86400))).isoformat(),
+            "time_taken_seconds": rng.choice([None, rng.randint(breakdown_size * 15, breakdown_size * 120)]),
+            "scoring_summary": {"total_score": correct, "max_score": breakdown_size,
+                                "correct_answers_count": correct, "total_questions": breakdown_size},
+            "performance_breakdown": [
+                {"question_id": f"q{q}", "topic_name": "Measures of Central Tendency", "subtopic_name": "Mean",
+                 "difficulty_level": rng.choice(levels), "difficulty_type": rng.choice(types),
+                 "student_answer": "A", "correct_answer": "A", "is_correct": q < correct}
+                for q in range(breakdown_size)
+            ],
+        }
+
+
+def seed(service, args) -> None:
+    service.client.drop_database(SCRATCH_DB)
+    start, batch = time.perf_counter(), []
+    for count, document in enumerate(synthetic_results(args.users, args.results, args.breakdown_size), 1):
+        batch.append(document)
+        if len(batch) == 10000:
+            service.quiz_results_collection.insert_many(batch, ordered=False)
+            batch = []
+            if count % 500000 == 0:
+                print(f"  seeded {count} results...")
+    if batch:
+        service.quiz_results_collection.insert_many(batch, ordered=False)
+    service.ensure_indexes()
+    print(f"Seeded {args.results} results for {args.users} students in {time.perf_counter() - start:.1f}s.")
+
+
+def run_method(method: str, mongo_uri: str, queue) -> None:
+    from app import dashboard_engine
+    from app.database_service import LEARNER_FEATURE_PROJECTION
+
+    service = open_scratch_service(mongo_uri)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == "full-history":
+        averages = dashboard_engine.compute_learner_performance_averages(service.get_full_quiz_history(username=None))
+    elif method == "streamed":
+        cursor = service.quiz_results_collection.find({}, LEARNER_FEATURE_PROJECTION, batch_size=10000)
+        averages = dashboard_engine.compute_learner_performance_averages(cursor)
+    else:
+        averages = service.get_learner_performance_averages()
+    elapsed = time.perf_counter() - start
+    fit_start = time.perf_counter()
+    centers = dashboard_engine.fit_learner_category_centers(averages)
+    queue.put({
+        "students": len(averages),
+        "seconds": elapsed,
+        "fit_seconds": time.perf_counter() - fit_start,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+        "centers": centers,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_CONNECTION_STRING", "mongodb://localhost:27017"))
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--results", type=int, default=5000000)
+    parser.add_argument("--breakdown-size", type=int, default=15, help="Questions per synthetic quiz result")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS), choices=METHODS)
+    parser.add_argument("--reuse", action="store_true", help=f"Benchmark the existing '{SCRATCH_DB}' database without reseeding")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the '{SCRATCH_DB}' database afterwards")
+    args = parser.parse_args()
+
+    service = open_scratch_service(args.mongo_uri)
+    if not args.reuse:
+        seed(service, args)
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'method':<13} {'students':>9} {'seconds':>9} {'fit s':>7} {'peak RSS MB':>12} {'RSS growth MB':>14}  centers")
+    for method in args.methods:
+        queue = context.Queue()
+        process = context.Process(target=run_method, args=(method, args.mongo_uri, queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{method:<13} failed (exit code {process.exitcode})")
+            continue
+        result = queue.get()
+        centers = ", ".join(f"{center:.3f}" for center in result["centers"]) if result["centers"] else "-"
+        print(f"{method:<13} {result['students']:>9} {result['seconds']:>9.1f} {result['fit_seconds']:>7.2f} "
+              f"{result['peak_rss_mb']:>12.0f} {result['rss_growth_mb']:>14.0f}  {centers}")
+
+    if not args.keep:
+        service.client.drop_database(SCRATCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# backend/benchmarks/login_storm_benchmark.py
+"""
+Login-storm benchmark: how quiz requests fare while hundreds of students log in at once,
+for each password hasher backend (app/password_hasher.py):
+    shared   bcrypt in Starlette's threadpool (the previous behaviour)
+    thread   bcrypt on its own small thread pool
+    process  bcrypt on its own process pool
+
+For each backend, this starts the API under uvicorn, registers a throwaway student and
+measures quiz and dashboard request latency twice: on an idle server, then while
+--logins concurrent logins are in flight. Logins rejected because the hasher queue
+is full (503) are counted separately; they are the intended back-pressure.
+
+Needs a reachable MongoDB (the throwaway user goes to its educonnect_db database), or
+--database-url sqlite:///<file> for SQLite storage, and uvicorn. Run from the backend directory:
+    python benchmarks/login_storm_benchmark.py --mongo-uri mongodb://localhost:27017 --logins 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(args, hasher_backend: str) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_DRIVER=args.driver, QUESTION_POOL_DEPTH="0",
+               PASSWORD_HASHER_BACKEND=hasher_backend, PASSWORD_HASHER_WORKERS=str(args.hasher_workers),
+               PASSWORD_HASHER_MAX_PENDING=str(args.max_pending))
+    if args.database_url:
+        env.update(STORAGE_BACKEND="sqlite", DATABASE_URL=args.database_url)
+    else:
+        env.update(STORAGE_BACKEND="mongo", MONGO_CONNECTION_STRING=args.mongo_uri)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/api/v1/units")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API server did not become ready in time")
+
+
+def summarize(latencies: list) -> dict:
+    if not latencies:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    latencies = sorted(latencies)
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {"count": len(latencies), "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": percentile(0.95), "p99_ms": percentile(0.99)}
+
+
+async def quiz_traffic(client: httpx.AsyncClient, headers: dict, units: list, workers: int, stop: asyncio.Event) -> list:
+    """Students fetching unit quizzes and their dashboard, back to back, until `stop` is set."""
+    latencies = []
+
+    async def worker(worker_id: int):
+        i = 0
+        while not stop.is_set():
+            path = f"/api/v1/quiz/unit/{units[(worker_id + i) % len(units)]}" if i % 2 == 0 else "/api/v1/performance/dashboard"
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            i += 1
+
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(workers)))
+    return latencies
+
+
+async def login_storm(client: httpx.AsyncClient, username: str, password: str, logins: int) -> dict:
+    latencies, rejected, failed = [], 0, 0
+
+    async def login():
+        nonlocal rejected, failed
+        start = time.perf_counter()
+        response = await client.post("/api/v1/users/login", json={"username": username, "password": password})
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        elif response.status_code == 503:
+            rejected += 1
+        else:
+            failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return {"elapsed": time.perf_counter() - start, "rejected": rejected, "failed": failed, **summarize(latencies)}
+
+
+async def measure_quiz_latency(client, headers, units, workers: int, seconds: float) -> dict:
+    stop = asyncio.Event()
+    traffic = asyncio.create_task(quiz_traffic(client, headers, units, workers, stop))
+    await asyncio.sleep(seconds)
+    stop.set()
+    return summarize(await traffic)
+
+
+async def benchmark_backend(hasher_backend: str, args) -> dict:
+    server = start_server(args, hasher_backend)
+    limits = httpx.Limits(max_connections=args.logins + args.quiz_workers + 10)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=300.0) as client:
+            await wait_until_ready(client)
+            username, password = f"storm_{uuid.uuid4().hex[:10]}", "storm-password"
+            response = await client.post("/api/v1/users/register",
+                                         json={"username": username, "email": f"{username}@example.com", "password": password})
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            units = (await client.get("/api/v1/units")).json()
+
+            await measure_quiz_latency(client, headers, units, 4, 1.0)  # warm-up
+            idle = await measure_quiz_latency(client, headers, units, args.quiz_workers, args.idle_seconds)
+
+            stop = asyncio.Event()
+            traffic = asyncio.create_task(quiz_traffic(client, headers, units, args.quiz_workers, stop))
+            storm = await login_storm(client, username, password, args.logins)
+            stop.set()
+            during = summarize(await traffic)
+            metrics = (await client.get("/metrics")).text.splitlines()
+            stats = {line.split()[0]: float(line.split()[1]) for line in metrics if line.startswith("educonnect_password_hasher_")}
+            return {"idle": idle, "during": during, "storm": storm, "hasher": stats}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_CONNECTION_STRING"))
+    parser.add_argument("--database-url", help="Use SQLite storage at this sqlite:/// URL instead of MongoDB")
+    parser.add_argument("--backends", nargs="+", default=["shared", "thread", "process"], choices=["shared", "thread", "process"])
+    parser.add_argument("--driver", default="pymongo", choices=["pymongo", "motor"])
+    parser.add_argument("--logins", type=int, default=500, help="Concurrent logins in the storm")
+    parser.add_argument("--quiz-workers", type=int, default=10, help="Concurrent students requesting quizzes meanwhile")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--hasher-workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    if not args.mongo_uri and not args.database_url:
+        parser.error("a MongoDB connection string (--mongo-uri or MONGO_CONNECTION_STRING) or a --database-url is required")
+
+    print(f"{'backend':<8} {'phase':<7} {'quiz reqs':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}   logins ok / 503 / failed, login p95 ms, storm s")
+    for hasher_backend in args.backends:
+        result = asyncio.run(benchmark_backend(hasher_backend, args))
+        for phase in ("idle", "during"):
+            q = result[phase]
+            line = f"{hasher_backend:<8} {phase:<7} {q['count']:>9} {q['p50_ms']:>8.1f} {q['p95_ms']:>8.1f} {q['p99_ms']:>8.1f}"
+            if phase == "during":
+                s = result["storm"]
+                line += f"   {s['count']} / {s['rejected']} / {s['failed']}, {s['p95_ms']:.0f}, {s['elapsed']:.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
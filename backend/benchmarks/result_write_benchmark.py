@@ -0,0 +1,167 @@
+# backend/benchmarks/result_write_benchmark.py
+"""
+A whole class submitting at the bell: --submissions quiz results saved from --concurrency
+threads, first with QUIZ_RESULT_WRITE_MODE=direct (save_quiz_result per submission), then
+with write_behind (journal append, then batched save_quiz_result_documents).
+
+Storage is SQLite in a temporary directory, or MongoDB with --mongo-uri (a scratch
+database, dropped afterwards). --db-latency-ms adds that much delay to every storage
+round trip, to stand in for a remote database. The table shows submission latency as
+the student sees it, how long until every result is stored, and the number of
+round trips to storage.
+
+Run from the backend directory:
+    python benchmarks/result_write_benchmark.py [--submissions 500 --concurrency 50] [--db-latency-ms 0 5 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Storage services are built explicitly below, not from the .env settings
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'result_write_benchmark_import.db')}")
+
+SCRATCH_DB = "educonnect_result_write_benchmark"
+
+
+class DelayedStorage:
+    """Adds a fixed delay to each storage call and counts the calls."""
+
+    def __init__(self, service, latency_seconds: float):
+        self.service = service
+        self.latency_seconds = latency_seconds
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args):
+        with self._lock:
+            self.round_trips += 1
+        time.sleep(self.latency_seconds)
+        return method(*args)
+
+    def save_quiz_result(self, result_data):
+        return self._call(self.service.save_quiz_result, result_data)
+
+    def save_quiz_result_documents(self, documents):
+        return self._call(self.service.save_quiz_result_documents, documents)
+
+
+def synthetic_submission(rng: random.Random, i: int) -> dict:
+    return {
+        "student_id": f"student{i}",
+        "subject": "Statistics",
+        "quiz_type": "Unit-Quizzes",
+        "quiz_name": f"Unit-{rng.randint(1, 5)}",
+        "timestamp": (datetime.now() - timedelta(microseconds=i)).isoformat(),
+        "time_taken_seconds": rng.randint(200, 900),
+        "performance_breakdown": [
+            {"template_id": f"q{q}", "topic_name": "Measures of Central Tendency", "subtopic_name": "Mean",
+             "difficulty_level": rng.choice(["easy", "medium", "hard"]), "difficulty_type": "direct",
+             "is_correct": rng.random() < 0.6, "marks_obtained": 1, "marks_possible": 1}
+            for q in range(15)
+        ],
+    }
+
+
+def open_storage(args, directory: str, run: str):
+    if args.mongo_uri:
+        os.environ["MONGO_CONNECTION_STRING"] = args.mongo_uri
+        from app.database_service import DatabaseService
+        from app.student_rollup import ROLLUP_COLLECTION
+
+        service = DatabaseService()
+        if service.client is None:
+            sys.exit("Could not connect to MongoDB.")
+        service.client.drop_database(SCRATCH_DB)
+        service.db = service.client[SCRATCH_DB]
+        service.users_collection = service.db.users
+        service.quiz_results_collection = service.db.quiz_results
+        service.student_rollups_collection = service.db[ROLLUP_COLLECTION]
+        service.ensure_indexes()
+        return service
+    from app.sqlite_database_service import SQLiteDatabaseService
+    return SQLiteDatabaseService(f"sqlite:///{os.path.join(directory, run + '.db')}")
+
+
+def close_storage(args, service) -> None:
+    if args.mongo_uri:
+        service.client.drop_database(SCRATCH_DB)
+    else:
+        service.close()
+
+
+def run_mode(mode: str, latency_ms: float, args, directory: str) -> dict:
+    from app.quiz_result_writer import WriteBehindQuizResultWriter
+
+    run = f"{mode}-{latency_ms:g}"
+    service = open_storage(args, directory, run)
+    storage = DelayedStorage(service, latency_ms / 1000)
+    rng = random.Random(3)
+    submissions = [synthetic_submission(rng, i) for i in range(args.submissions)]
+    if mode == "direct":
+        save = storage.save_quiz_result
+    else:
+        writer = WriteBehindQuizResultWriter(storage, os.path.join(directory, run + "-journal"), batch_size=args.batch_size,
+                                             flush_interval_seconds=args.flush_interval_ms / 1000)
+        writer.start()
+        save = writer.save_sync
+
+    latencies = []
+    def student(chunk):
+        for submission in chunk:
+            start = time.perf_counter()
+            save(submission)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=student, args=(submissions[i::args.concurrency],)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if mode != "direct":
+        writer.close()
+    stored_seconds = time.perf_counter() - start
+
+    stored = len(service.get_full_quiz_history())
+    close_storage(args, service)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+        "stored_seconds": stored_seconds,
+        "round_trips": storage.round_trips,
+        "stored": stored,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50, help="Threads submitting at the same time")
+    parser.add_argument("--db-latency-ms", nargs="+", type=float, default=[0, 5, 20])
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--flush-interval-ms", type=int, default=250)
+    parser.add_argument("--mongo-uri", help="Store in MongoDB (a scratch database) instead of SQLite")
+    args = parser.parse_args()
+
+    print(f"{'mode':<13} {'db ms':>6} {'submit p50 ms':>14} {'submit p99 ms':>14} {'all stored s':>13} {'round trips':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for latency_ms in args.db_latency_ms:
+            for mode in ("direct", "write_behind"):
+                result = run_mode(mode, latency_ms, args, directory)
+                if result["stored"] != args.submissions:
+                    sys.exit(f"{mode}: stored {result['stored']} of {args.submissions} results")
+                print(f"{mode:<13} {latency_ms:>6g} {result['p50_ms']:>14.2f} {result['p99_ms']:>14.2f} "
+                      f"{result['stored_seconds']:>13.2f} {result['round_trips']:>12}")
+
+
+if __name__ == "__main__":
+    main()
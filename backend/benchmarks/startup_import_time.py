@@ -0,0 +1,77 @@
+# backend/benchmarks/startup_import_time.py
+"""
+Measures the cold-start cost of the API: the wall time of `import app.main` in a fresh
+interpreter, plus the heaviest top-level packages from `python -X importtime`.
+
+Run from the backend directory, on each commit you want to compare:
+    python benchmarks/startup_import_time.py --runs 5
+
+MongoDB is given an invalid connection string by default so that the connection
+attempt in DatabaseService fails immediately instead of dominating the measurement; pass
+--keep-mongo-env to use the connection string from the environment / .env instead.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+HEAVY_PACKAGES = ("sklearn", "scipy", "numpy", "pymongo", "fastapi", "pydantic", "passlib", "jose")
+
+
+def build_env(keep_mongo_env: bool) -> dict:
+    env = dict(os.environ)
+    if not keep_mongo_env:
+        # An out-of-range port makes MongoClient reject the URI immediately, no network wait
+        env["MONGO_CONNECTION_STRING"] = "mongodb://benchmark-no-database:99999"
+    # The question pool would start a background thread; keep it out of the import timing
+    env.setdefault("QUESTION_POOL_DEPTH", "0")
+    return env
+
+
+def time_import(env: dict) -> float:
+    result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(env: dict) -> dict:
+    """Cumulative import time in seconds per top-level package, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    per_package = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if not match:
+            continue
+        self_us, _cumulative_us, _indent, module = match.groups()
+        per_package[module.split(".")[0]] += int(self_us) / 1e6
+    return per_package
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep-mongo-env", action="store_true")
+    args = parser.parse_args()
+
+    env = build_env(args.keep_mongo_env)
+    timings = [time_import(env) for _ in range(args.runs)]
+    print(f"import app.main over {args.runs} runs: median {statistics.median(timings):.3f}s, "
+          f"min {min(timings):.3f}s, max {max(timings):.3f}s")
+
+    per_package = import_breakdown(env)
+    print("\nImport time per top-level package (self time summed):")
+    for package, seconds in sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:15]:
+        marker = "  <-- heavy" if package in HEAVY_PACKAGES else ""
+        print(f"  {package:<20} {seconds:7.3f}s{marker}")
+    loaded_heavy = [package for package in ("sklearn", "scipy") if package in per_package]
+    print(f"\nsklearn/scipy loaded at import: {', '.join(loaded_heavy) if loaded_heavy else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
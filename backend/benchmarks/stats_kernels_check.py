@@ -0,0 +1,63 @@
+# backend/benchmarks/stats_kernels_check.py
+"""
+Checks the pure-Python distribution kernels in app/stats_kernels.py against scipy.stats:
+the normal cdf / sf / ppf, the binomial pmf / cdf and the Poisson pmf / cdf,
+each over a grid of points covering the ranges the question templates use and the
+edge cases (p = 0 or 1, k outside the support, far tails). A kernel fails if its largest
+absolute difference from scipy exceeds --tolerance. The exit status is non-zero if any
+kernel fails, so this can run in CI.
+
+scipy is only needed for this check, not by the API: pip install scipy
+
+Run from the backend directory:
+    python benchmarks/stats_kernels_check.py [--tolerance 1e-10]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tolerance", type=float, default=1e-10, help="Largest accepted absolute difference")
+    args = parser.parse_args()
+
+    try:
+        from scipy import stats
+    except ImportError:
+        sys.exit("scipy is not installed (pip install scipy).")
+    from app.stats_kernels import norm_cdf, norm_sf, norm_ppf, binom_pmf, binom_cdf, poisson_pmf, poisson_cdf
+
+    xs = [i / 100.0 for i in range(-800, 801)]
+    qs = [1e-10, 1e-6, 0.001, 0.005, 0.01, 0.02425, 0.025, 0.05, 0.1] + [i / 1000.0 for i in range(1, 1000)] + \
+         [0.95, 0.975, 0.995, 0.999, 1 - 1e-6]
+    binom_points = [(k, n, p) for n in (1, 5, 10, 20, 50, 100) for k in range(-1, n + 2)
+                    for p in (0.0, 0.01, 0.1, 0.25, 0.5, 0.9, 1.0)]
+    poisson_points = [(k, lam) for lam in (0.1, 0.5, 1.0, 2.5, 4.0, 10.0, 30.0) for k in range(-1, 60)]
+
+    checks = [
+        ("norm_cdf", [(norm_cdf(x), stats.norm.cdf(x)) for x in xs]),
+        ("norm_sf", [(norm_sf(x), stats.norm.sf(x)) for x in xs]),
+        ("norm_ppf", [(norm_ppf(q), stats.norm.ppf(q)) for q in qs]),
+        ("binom_pmf", [(binom_pmf(k, n, p), stats.binom.pmf(k, n, p)) for k, n, p in binom_points]),
+        ("binom_cdf", [(binom_cdf(k, n, p), stats.binom.cdf(k, n, p)) for k, n, p in binom_points]),
+        ("poisson_pmf", [(poisson_pmf(k, lam), stats.poisson.pmf(k, lam)) for k, lam in poisson_points]),
+        ("poisson_cdf", [(poisson_cdf(k, lam), stats.poisson.cdf(k, lam)) for k, lam in poisson_points]),
+    ]
+
+    failures = 0
+    for name, pairs in checks:
+        worst = max(abs(ours - theirs) for ours, theirs in pairs)
+        ok = worst <= args.tolerance
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name:<12} max abs error over {len(pairs):>5} points: {worst:.2e}")
+
+    if failures:
+        sys.exit(f"{failures} kernel{'' if failures == 1 else 's'} disagree{'s' if failures == 1 else ''} with scipy.")
+    print("All stats kernels match scipy.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# backend/benchmarks/storage_read_benchmark.py
+"""
+Per-call latency of the storage service reads behind the student-facing endpoints, on
+the embedded SQLite backend (app/sqlite_database_service.py) and, with --mongo-uri,
+on MongoDB for comparison.
+
+The script seeds each backend with the same synthetic quiz results through
+save_quiz_result, so rollups are written exactly as the API writes them. It then calls
+each read for random students and reports p50 / p99 in milliseconds:
+
+    history-page   get_quiz_history_page(limit=20, summary=True)   (history endpoints)
+    attempt        get_quiz_result                                  (one attempt, by path)
+    rollup         get_student_rollup                               (graph data, pathway)
+    dashboard-7d   get_dashboard_analytics(7)                       (dashboard grid)
+    graph-raw-30d  get_performance_data_for_dashboard(30, DAILY_INDEX_PROJECTION)
+
+SQLite needs no running service; the database file goes to a temporary directory
+unless --sqlite-path is given. Run from the backend directory:
+    python benchmarks/storage_read_benchmark.py [--students 200 --results 20000] [--calls 2000] [--mongo-uri mongodb://localhost:27017]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Storage services are built explicitly below, not from the .env settings
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'storage_read_benchmark_import.db')}")
+
+SCRATCH_DB = "educonnect_storage_read_benchmark"
+
+
+def synthetic_results(students: int, results: int, seed: int = 5):
+    rng = random.Random(seed)
+    levels, types = ["easy", "medium", "hard"], ["direct", "logical reasoning", "aptitude"]
+    start = datetime.now() - timedelta(days=90)
+    for i in range(results):
+        is_grand = rng.random() < 0.1
+        questions = 75 if is_grand else 15
+        yield {
+            "student_id": f"student{i % students}",
+            "subject": "Statistics",
+            "quiz_type": "Grand-Quiz" if is_grand else "Unit-Quizzes",
+            "quiz_name": "Grand Quiz" if is_grand else f"Unit-{rng.randint(1, 5)}",
+            "timestamp": (start + timedelta(seconds=rng.randrange(90 * 86400), microseconds=i)).isoformat(),
+            "time_taken_seconds": rng.choice([None, rng.randint(questions * 15, questions * 120)]),
+            "performance_breakdown": [
+                {"question_id": f"q{q}", "topic_name": "Measures of Central Tendency", "subtopic_name": "Mean",
+                 "difficulty_level": rng.choice(levels), "difficulty_type": rng.choice(types),
+                 "student_answer": "A", "correct_answer": "A", "is_correct": rng.random() < 0.6,
+                 "marks_obtained": 1, "marks_possible": 1}
+                for q in range(questions)
+            ],
+        }
+
+
+def open_sqlite_service(path: str):
+    from app.sqlite_database_service import SQLiteDatabaseService
+    return SQLiteDatabaseService(f"sqlite:///{path}")
+
+
+def open_mongo_service(mongo_uri: str):
+    """A DatabaseService pointed at the scratch database, so the benchmark never touches real data."""
+    os.environ["MONGO_CONNECTION_STRING"] = mongo_uri
+    from app.database_service import DatabaseService
+    from app.student_rollup import ROLLUP_COLLECTION
+
+    service = DatabaseService()
+    if service.client is None:
+        sys.exit("Could not connect to MongoDB.")
+    service.client.drop_database(SCRATCH_DB)
+    service.db = service.client[SCRATCH_DB]
+    service.users_collection = service.db.users
+    service.quiz_results_collection = service.db.quiz_results
+    service.student_rollups_collection = service.db[ROLLUP_COLLECTION]
+    service.ensure_indexes()
+    return service
+
+
+def seed(service, args) -> float:
+    start = time.perf_counter()
+    for result in synthetic_results(args.students, args.results):
+        if service.save_quiz_result(result)["status"] != "success":
+            sys.exit("Seeding failed.")
+    return time.perf_counter() - start
+
+
+def measure(service, args) -> dict:
+    from app.dashboard_engine import DAILY_INDEX_PROJECTION
+
+    rng = random.Random(9)
+    students = [f"student{i}" for i in range(args.students)]
+    paths = {student: service.get_quiz_history_page(student, limit=20, summary=True)[0]["path"] for student in students}
+    reads = {
+        "history-page": lambda student: service.get_quiz_history_page(student, limit=20, summary=True),
+        "attempt": lambda student: service.get_quiz_result(student, paths[student]),
+        "rollup": lambda student: service.get_student_rollup(student),
+        "dashboard-7d": lambda student: service.get_dashboard_analytics(student, 7),
+        "graph-raw-30d": lambda student: service.get_performance_data_for_dashboard(student, 30, DAILY_INDEX_PROJECTION),
+    }
+    timings = {}
+    for name, read in reads.items():
+        latencies = []
+        for _ in range(args.calls):
+            student = rng.choice(students)
+            start = time.perf_counter()
+            read(student)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        timings[name] = (statistics.median(latencies) * 1000, latencies[int(0.99 * (len(latencies) - 1))] * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--results", type=int, default=20000)
+    parser.add_argument("--calls", type=int, default=2000, help="Calls per read, for random students")
+    parser.add_argument("--sqlite-path", help="SQLite file to use (default: a temporary file)")
+    parser.add_argument("--mongo-uri", help="Also benchmark MongoDB (a scratch database, dropped afterwards)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        services = [("sqlite", open_sqlite_service(args.sqlite_path or os.path.join(directory, "benchmark.db")))]
+        if args.mongo_uri:
+            services.append(("mongo", open_mongo_service(args.mongo_uri)))
+
+        results = []
+        for backend, service in services:
+            seconds = seed(service, args)
+            print(f"{backend}: seeded {args.results} results for {args.students} students in {seconds:.1f}s "
+                  f"({args.results / seconds:.0f} saves/s)")
+            results.append((backend, measure(service, args)))
+            if backend == "sqlite":
+                service.close()
+            else:
+                service.client.drop_database(SCRATCH_DB)
+
+    print(f"\n{'backend':<8} {'read':<14} {'p50 ms':>8} {'p99 ms':>8}")
+    for backend, timings in results:
+        for name, (p50, p99) in timings.items():
+            print(f"{backend:<8} {name:<14} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
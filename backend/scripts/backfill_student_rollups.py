@@ -0,0 +1,73 @@
+# backend/scripts/backfill_student_rollups.py
+"""
+Builds the per-student statistics rollups (the `student_rollups` collection, see
+app/student_rollup.py) from the existing `quiz_results`.
+
+Run this once after deploying rollups. You can re-run it at any time to rebuild rollups
+from scratch, for example after editing quiz results by hand. Each student's rollup is
+rebuilt with DatabaseService.rebuild_student_rollup, which reads only that student's
+results (served by the (student_id, timestamp) index), so only one student's history is
+held in memory at a time.
+
+The rebuild is safe while quizzes are being saved: it replaces a rollup only if no quiz
+was folded into it since it read the results, and retries otherwise (see
+app/student_rollup.py). The students whose rebuild kept losing that check are listed at
+the end; re-run the script for them with --student.
+
+Run from the backend directory:
+    python scripts/backfill_student_rollups.py [--student alice --student bob] [--dry-run]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pymongo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--student", action="append", help="Only rebuild these students (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Compute rollups without writing them")
+    args = parser.parse_args()
+
+    from app.database_service import database_service
+    from app.student_rollup import ROLLUP_SOURCE_PROJECTION, build_rollup_document
+
+    if database_service.storage_backend != "mongo":
+        sys.exit("Rollups are only backfilled on MongoDB storage; SQLite storage updates them in the same transaction as each result.")
+    if database_service.client is None:
+        sys.exit("Could not connect to MongoDB.")
+
+    if args.student:
+        student_ids = sorted(set(args.student))
+    else:
+        student_ids = (group["_id"] for group in database_service.quiz_results_collection.aggregate(
+            [{"$group": {"_id": "$student_id"}}, {"$sort": {"_id": pymongo.ASCENDING}}], allowDiskUse=True))
+
+    start = time.perf_counter()
+    students, results, failed = 0, 0, []
+    for student_id in student_ids:
+        if args.dry_run:
+            rollup = build_rollup_document(student_id, database_service.quiz_results_collection.find(
+                {"student_id": student_id}, ROLLUP_SOURCE_PROJECTION))
+        else:
+            rollup = database_service.rebuild_student_rollup(student_id)
+        if rollup is None:
+            failed.append(student_id)
+            continue
+        students += 1
+        results += rollup.get("quizzes_taken", 0)
+        if students % 500 == 0:
+            print(f"  {students} students, {results} quiz results...")
+
+    action = "Computed" if args.dry_run else "Wrote"
+    print(f"{action} {students} student rollups from {results} quiz results in {time.perf_counter() - start:.1f}s.")
+    if failed:
+        sys.exit(f"Could not rebuild {len(failed)} rollups; re-run with: {' '.join(f'--student {student_id}' for student_id in failed)}")
+
+
+if __name__ == "__main__":
+    main()
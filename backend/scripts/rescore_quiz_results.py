@@ -0,0 +1,218 @@
+# backend/scripts/rescore_quiz_results.py
+"""
+Recomputes the stored scores of existing quiz results with the shared scoring logic
+(app/quiz_scoring.py), for use after question templates or marking rules change.
+
+For every quiz result, the script:
+  - refreshes each performance_breakdown row's topic, subtopic, difficulty level and
+    difficulty type from the current templates file (--templates);
+  - applies the current marks per difficulty type (--remark);
+  - recomputes marks_obtained and the scoring_summary.
+Student answers are not stored, so whether each answer was correct is kept as it is.
+Without --templates or --remark, only scoring_summary is recomputed from the stored
+breakdown.
+
+quiz_results are streamed in _id order, one range query per --batch-size results, so
+millions of results never need to be in memory together. A process pool (--workers)
+recomputes each batch while the previous batch is written back. The changed results
+are written with one unordered bulk_write per batch (one transaction on SQLite).
+Afterwards, the rollups of every student with a changed result are rebuilt.
+
+After each batch, progress (the last _id written) is saved to a checkpoint file
+(--checkpoint); the students whose results changed are appended to <checkpoint>.students
+before the batch is written. Re-running the same command resumes after the last written
+batch, for example after an interruption or an error. Use --restart to start over.
+
+Run from the backend directory:
+    python scripts/rescore_quiz_results.py [--templates [PATH]] [--remark] [--student alice] [--batch-size 1000] [--workers 4] [--dry-run]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.quiz_scoring import MARKS_BY_DIFFICULTY_TYPE, TEMPLATE_FIELDS, rescore_performance, summarize_performance
+
+DEFAULT_TEMPLATES_PATH = os.path.join(BACKEND_DIR, "data_initial", "question_templates.json")
+SCAN_PROJECTION = {"student_id": 1, "performance_breakdown": 1, "scoring_summary": 1}
+
+# Set in every worker process by init_worker
+_templates_by_id = None
+_marks_by_type = None
+
+
+def init_worker(templates_path, remark: bool) -> None:
+    global _templates_by_id, _marks_by_type
+    if templates_path:
+        with open(templates_path, "r", encoding="utf-8") as templates_file:
+            _templates_by_id = {template["id"]: {field: template.get(field) for field in TEMPLATE_FIELDS}
+                                for template in json.load(templates_file)}
+    _marks_by_type = MARKS_BY_DIFFICULTY_TYPE if remark else None
+
+
+def comparable_summary(summary: dict) -> dict:
+    """The topic lists were built from sets before, so their order carries no meaning."""
+    return {key: sorted(value) if key in ("topics_covered", "subtopics_covered") else value for key, value in summary.items()}
+
+
+def rescore_documents(documents):
+    """(student_id, update) for each document whose breakdown or summary changes."""
+    updates = []
+    for document in documents:
+        performance = document.get("performance_breakdown") or []
+        rescored = rescore_performance(performance, _templates_by_id, _marks_by_type)
+        summary = summarize_performance(rescored)
+        update = {"_id": document["_id"], "scoring_summary": summary}
+        if rescored != performance:
+            update["performance_breakdown"] = rescored
+        elif comparable_summary(summary) == comparable_summary(document.get("scoring_summary") or {}):
+            continue
+        updates.append((document.get("student_id"), update))
+    return updates
+
+
+def load_checkpoint(path: str, options: dict, restart: bool) -> dict:
+    fresh = {"options": options, "after_id": None, "scanned": 0, "updated": 0, "completed": False}
+    if restart or not os.path.exists(path):
+        return fresh
+    with open(path, "r", encoding="utf-8") as checkpoint_file:
+        state = json.load(checkpoint_file)
+    if state.get("options") != options:
+        sys.exit(f"Checkpoint '{path}' was written with other options ({state.get('options')}). "
+                 "Re-run with the same options to resume, or add --restart.")
+    if state.get("completed"):
+        sys.exit(f"Checkpoint '{path}' is from a completed run. Add --restart to rescore again.")
+    print(f"Resuming after {state['scanned']} scanned quiz results ({state['updated']} updated).")
+    return state
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+def load_students(path: str, restart: bool) -> set:
+    """The students recorded by earlier batches of this run (one per line, repeats possible)."""
+    if restart or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as students_file:
+        return {json.loads(line) for line in students_file if line.endswith("\n")}
+
+
+def append_students(path: str, student_ids) -> None:
+    # Written before the batch's updates: a re-run rescoring the batch again finds nothing left to change
+    with open(path, "a", encoding="utf-8") as students_file:
+        students_file.writelines(json.dumps(student_id) + "\n" for student_id in student_ids)
+        students_file.flush()
+        os.fsync(students_file.fileno())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", nargs="?", const=DEFAULT_TEMPLATES_PATH,
+                        help=f"Refresh template fields from this templates file (default: {DEFAULT_TEMPLATES_PATH})")
+    parser.add_argument("--remark", action="store_true", help="Apply the current marks per difficulty type")
+    parser.add_argument("--student", action="append", help="Only rescore these students (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Quiz results read, rescored and written per batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Rescoring processes (0: in this process)")
+    parser.add_argument("--checkpoint", default="rescore_quiz_results.checkpoint.json", help="Progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--dry-run", action="store_true", help="Count the changes without writing them (no checkpoint)")
+    args = parser.parse_args()
+
+    from app.database_service import database_service
+
+    if database_service.client is None:
+        sys.exit("Could not connect to the database.")
+
+    options = {"templates": os.path.abspath(args.templates) if args.templates else None, "remark": args.remark,
+               "students": sorted(args.student) if args.student else None}
+    state = load_checkpoint(args.checkpoint, options, args.restart or args.dry_run)
+    students_path = args.checkpoint + ".students"
+    students = load_students(students_path, args.restart or args.dry_run)
+    if args.restart and os.path.exists(students_path) and not args.dry_run:
+        os.remove(students_path)
+
+    pool = None
+    if args.workers > 0:
+        # spawn: the workers need no copy of this process's database connections
+        pool = ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=init_worker, initargs=(options["templates"], args.remark))
+    else:
+        init_worker(options["templates"], args.remark)
+
+    def submit(batch):
+        if pool is None:
+            future = Future()
+            future.set_result(rescore_documents(batch))
+            return [future]
+        chunk_size = math.ceil(len(batch) / args.workers)
+        return [pool.submit(rescore_documents, batch[i:i + chunk_size]) for i in range(0, len(batch), chunk_size)]
+
+    start = time.perf_counter()
+    last_report = start
+    scanned_before = state["scanned"]
+
+    def finish(batch, futures):
+        nonlocal last_report
+        updates = [update for future in futures for update in future.result()]
+        new_students = {student_id for student_id, _ in updates} - students
+        students.update(new_students)
+        if updates and not args.dry_run:
+            if new_students:
+                append_students(students_path, sorted(new_students))
+            result = database_service.update_quiz_result_scores([update for _, update in updates])
+            if result["status"] != "success":
+                sys.exit(f"{result['message']} Re-run the same command to resume after the last written batch.")
+        last_id = batch[-1]["_id"]
+        state.update(after_id=last_id if isinstance(last_id, int) else str(last_id), scanned=state["scanned"] + len(batch),
+                     updated=state["updated"] + len(updates))
+        if not args.dry_run:
+            save_checkpoint(args.checkpoint, state)
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            last_report = now
+            rate = (state["scanned"] - scanned_before) / (now - start)
+            print(f"  {state['scanned']} quiz results scanned, {state['updated']} updated ({rate:.0f} results/s)...")
+
+    try:
+        in_flight = None
+        # The next batch is read and the previous one written while the workers rescore this one
+        for batch in database_service.iter_quiz_results_by_id(state["after_id"], args.student, SCAN_PROJECTION, args.batch_size):
+            futures = submit(batch)
+            if in_flight is not None:
+                finish(*in_flight)
+            in_flight = (batch, futures)
+        if in_flight is not None:
+            finish(*in_flight)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    action = "Would update" if args.dry_run else "Updated"
+    print(f"{action} {state['updated']} of {state['scanned']} quiz results ({len(students)} students) "
+          f"in {time.perf_counter() - start:.1f}s.")
+    if args.dry_run:
+        return
+
+    print(f"Rebuilding the rollups of {len(students)} students...")
+    for rebuilt, student_id in enumerate(sorted(students), start=1):
+        database_service.rebuild_student_rollup(student_id)
+        if rebuilt % 500 == 0:
+            print(f"  {rebuilt} rollups rebuilt...")
+    state["completed"] = True
+    save_checkpoint(args.checkpoint, state)
+    print("✅ Rescoring complete.")
+
+
+if __name__ == "__main__":
+    main()
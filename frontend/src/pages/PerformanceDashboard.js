@@ -84,7 +84,7 @@ const PerformanceDashboard = () => {
         </div>
 
         <div className={styles.filters}>
-          <button onClick={() => setTimePeriod('1d')} className={timePeriod === '1d' ? styles.active : ''}>Last 24 Hours</button>
+          <button onClick={() => setTimePeriod('1d')} className={timePeriod === '1d' ? styles.active : ''}>Since Yesterday</button>
           <button onClick={() => setTimePeriod('7d')} className={timePeriod === '7d' ? styles.active : ''}>Last 7 Days</button>
           <button onClick={() => setTimePeriod('30d')} className={timePeriod === '30d' ? styles.active : ''}>Last 30 Days</button>
           <button onClick={() => setTimePeriod('all')} className={timePeriod === 'all' ? styles.active : ''}>All Time</button>
@@ -15,6 +15,7 @@ const QuizPage = () => {
   const [isLoading, setIsLoading] = useState(true);
   const [isFinished, setIsFinished] = useState(false);
   const [finalResult, setFinalResult] = useState(null);
+  const [quizSessionId, setQuizSessionId] = useState(null);
   const API_URL = process.env.REACT_APP_API_BASE_URL || '';
   // --- End of untouched original code ---
 
@@ -44,9 +45,11 @@ const QuizPage = () => {
 
         if (response.ok) {
           const data = await response.json();
-          setQuestions(data);
+          // The server keeps the quiz under this session id; submitting only needs the id and the answers
+          setQuizSessionId(data.quiz_session_id);
+          setQuestions(data.questions);
           let initialAnswers = {};
-          data.forEach((q, index) => { initialAnswers[index] = null; });
+          data.questions.forEach((q, index) => { initialAnswers[index] = null; });
           setSelectedAnswers(initialAnswers);
         } else {
           console.error("Failed to fetch questions. Status:", response.status);
@@ -97,7 +100,7 @@ const QuizPage = () => {
       const token = localStorage.getItem('accessToken');
       
       const payload = {
-        quiz_questions: questions,
+        quiz_session_id: quizSessionId,
         student_answers: Object.values(selectedAnswers),
         time_taken_seconds: timeTaken
       };
@@ -121,7 +124,7 @@ const QuizPage = () => {
       } catch (error) {
         console.error("Failed to submit quiz:", error);
       }
-  }, [questions, selectedAnswers, timeTaken, type, API_URL]);
+  }, [quizSessionId, selectedAnswers, timeTaken, type, API_URL]);
   
   const formatTime = (totalSeconds) => {
     const minutes = Math.floor(totalSeconds / 60);
@@ -147,15 +150,15 @@ const QuizPage = () => {
                                 <div key={index} className={styles.resultItem}>
                                     <p><b>Q{index + 1}:</b> {res.question_text}</p>
                                     <p className={res.is_correct ? styles.correct : styles.incorrect}>
-                                      Your Answer: {res.student_answer_index !== null ? questions[index].options[res.student_answer_index] : "Not Answered"}
+                                      Your Answer: {res.student_answer_index !== null ? res.options[res.student_answer_index] : "Not Answered"}
                                     </p>
                                     {!res.is_correct && (
                                       <p className={styles.correct}>
-                                        Correct Answer: {questions[index].options[res.correct_answer_index]}
+                                        Correct Answer: {res.options[res.correct_answer_index]}
                                       </p>
                                     )}
                                     <p className={styles.explanation}>
-                                      <b>Explanation:</b> {questions[index].explanation || "No explanation available."}
+                                      <b>Explanation:</b> {res.explanation || "No explanation available."}
                                     </p>
                                 </div>
                             ))}
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { useParams } from 'react-router-dom';
 import Navbar from '../components/Navbar';
 import AnalysisModal from '../components/AnalysisModal';
@@ -22,26 +22,37 @@ const UnitHistoryPage = () => {
   const [isModalOpen, setModalOpen] = useState(false);
   const [selectedAttempt, setSelectedAttempt] = useState(null);
   // --- End of untouched original code ---
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // --- START OF NEW EDIT: Define the API URL ---
   const API_URL = process.env.REACT_APP_API_BASE_URL || '';
   // --- END OF NEW EDIT ---
 
-  // --- This original code is untouched ---
+  // The list is loaded in pages of attempt summaries (no per-question breakdown);
+  // the full attempt is fetched when a card is opened.
+  const HISTORY_PAGE_SIZE = 20;
+
+  const fetchHistoryPage = useCallback(async (before) => {
+    const token = localStorage.getItem('accessToken');
+    const decodedUnitName = decodeURIComponent(unitName);
+    const params = new URLSearchParams({ summary: 'true', limit: HISTORY_PAGE_SIZE });
+    if (before) params.set('before', before);
+
+    const response = await fetch(`${API_URL}/api/v1/performance/history/${decodedUnitName}?${params}`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+    if (!response.ok) return null;
+    return response.json();
+  }, [unitName, API_URL]);
+
   useEffect(() => {
     const fetchAttempts = async () => {
-      const token = localStorage.getItem('accessToken');
-      const decodedUnitName = decodeURIComponent(unitName);
-
       try {
-        // --- START OF NEW EDIT: Use API_URL ---
-        const response = await fetch(`${API_URL}/api/v1/performance/history/${decodedUnitName}`, {
-        // --- END OF NEW EDIT ---
-          headers: { 'Authorization': `Bearer ${token}` }
-        });
-        if (response.ok) {
-          const data = await response.json();
-          setAttempts(data);
+        const page = await fetchHistoryPage(null);
+        if (page) {
+          setAttempts(page.items);
+          setNextCursor(page.next_cursor);
         }
       } catch (error) {
         console.error("Failed to fetch unit history:", error);
@@ -50,11 +61,36 @@ const UnitHistoryPage = () => {
     };
 
     fetchAttempts();
-  }, [unitName, API_URL]);
+  }, [fetchHistoryPage]);
+
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await fetchHistoryPage(nextCursor);
+      if (page) {
+        setAttempts(previous => [...previous, ...page.items]);
+        setNextCursor(page.next_cursor);
+      }
+    } catch (error) {
+      console.error("Failed to fetch more unit history:", error);
+    }
+    setLoadingMore(false);
+  };
 
-  const handleCardClick = (attemptData) => {
-    setSelectedAttempt(attemptData);
-    setModalOpen(true);
+  const handleCardClick = async (attemptSummary) => {
+    const token = localStorage.getItem('accessToken');
+    try {
+      const params = new URLSearchParams({ path: attemptSummary.path });
+      const response = await fetch(`${API_URL}/api/v1/performance/attempt?${params}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (response.ok) {
+        setSelectedAttempt(await response.json());
+        setModalOpen(true);
+      }
+    } catch (error) {
+      console.error("Failed to fetch quiz attempt:", error);
+    }
   };
 
   return (
@@ -77,6 +113,11 @@ const UnitHistoryPage = () => {
           ) : (
             <p>You have not attempted this quiz yet.</p>
           )}
+          {!loading && nextCursor && (
+            <button className={styles.historyCard} onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load older attempts'}
+            </button>
+          )}
         </div>
       </div>
       <AnalysisModal 